@@ -0,0 +1 @@
+""" Micro-benchmarks of the core code paths, see benchmarks/__main__.py """
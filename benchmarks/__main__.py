@@ -0,0 +1,128 @@
+"""
+Run the benchmarks and compare runs:
+    python -m benchmarks run [--full] [--filter history] [--output run.json]
+    python -m benchmarks compare baseline.json run.json [--threshold 0.1]
+compare exits with status 1 if any benchmark regressed.
+"""
+
+import argparse
+import datetime as dt
+import logging
+import os
+import sys
+import tempfile
+from typing import Optional
+
+from benchmarks.cases import FULL_HISTORY_SIZES, HISTORY_SIZES, benchmark_cases
+from benchmarks.harness import (
+    REGRESSION_THRESHOLD,
+    BenchmarkResult,
+    benchmark_result,
+    compare_results,
+    format_seconds,
+    read_results,
+    time_calls,
+    write_results,
+)
+
+RESULTS_FOLDER: str = os.path.join("benchmarks", "results")
+DATA_FOLDER: str = os.path.join(tempfile.gettempdir(), "garage_door_benchmarks")
+
+
+def run_benchmarks(
+    history_sizes: tuple[int, ...],
+    data_folder: str,
+    name_filter: Optional[str] = None,
+    min_time: float = 0.2,
+    repeat: int = 5,
+) -> list[BenchmarkResult]:
+    """Every case, with logging off so that log writes don't add noise"""
+    logging.disable(logging.CRITICAL)
+    results: list[BenchmarkResult] = []
+    for case in benchmark_cases:
+        if name_filter and name_filter not in case.name:
+            continue
+        for size in history_sizes if case.history_sizes else case.sizes:
+            call, prepare = case.setup(size, data_folder)
+            number, times = time_calls(
+                call=call, prepare=prepare, min_time=min_time, repeat=repeat
+            )
+            result = benchmark_result(
+                name=case.name, size=size, number=number, times=times
+            )
+            print(
+                f"{result.key:<50} {format_seconds(result.median):>12} "
+                f"± {format_seconds(result.stdev)}",
+                flush=True,
+            )
+            results.append(result)
+    logging.disable(logging.NOTSET)
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument(
+        "--output", help=f"results file, default in {RESULTS_FOLDER}"
+    )
+    run_parser.add_argument("--filter", help="only benchmarks with this in their name")
+    run_parser.add_argument(
+        "--sizes", type=int, nargs="+", help=f"history events, default {HISTORY_SIZES}"
+    )
+    run_parser.add_argument(
+        "--full", action="store_true", help=f"history sizes {FULL_HISTORY_SIZES}"
+    )
+    run_parser.add_argument("--min-time", type=float, default=0.2, help="s a repeat")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument(
+        "--data-folder", default=DATA_FOLDER, help="generated history, kept for reuse"
+    )
+
+    compare_parser = commands.add_parser("compare", help="compare two runs")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help="flag a median slower by more than this fraction",
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        results = run_benchmarks(
+            history_sizes=tuple(args.sizes)
+            if args.sizes
+            else FULL_HISTORY_SIZES
+            if args.full
+            else HISTORY_SIZES,
+            data_folder=args.data_folder,
+            name_filter=args.filter,
+            min_time=args.min_time,
+            repeat=args.repeat,
+        )
+        results_filepath: str = args.output or os.path.join(
+            RESULTS_FOLDER, f"{dt.datetime.now():%Y%m%d-%H%M%S}.json"
+        )
+        os.makedirs(os.path.dirname(results_filepath) or ".", exist_ok=True)
+        write_results(results_filepath, results)
+        print(f"Results written to {results_filepath}")
+        return 0
+
+    lines, regressions = compare_results(
+        baseline=read_results(args.baseline),
+        current=read_results(args.current),
+        threshold=args.threshold,
+    )
+    print("\n".join(lines))
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
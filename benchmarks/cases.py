@@ -0,0 +1,214 @@
+""" The benchmarked code paths """
+
+from dataclasses import dataclass
+import datetime as dt
+import os
+import shutil
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.history_data import FIRST_EVENT, history_file, journal_file
+from src.color_as_hex_string import color_as_hex_string
+from src.config.config_main import load_config
+from src.garage_door import GarageDoor, GarageStatus
+from src.history_cache import load_cached_history
+from src.history_journal import JournalReader
+from src.history_store import SQLiteHistoryStore
+from src.plot_garage_door_status import clean_garage_door_history
+from src.tk_plot import tk_xy_plot
+from test.doubles import NullLogger, make_door
+
+HISTORY_SIZES: tuple[int, ...] = (1_000, 10_000, 100_000, 1_000_000)
+FULL_HISTORY_SIZES: tuple[int, ...] = HISTORY_SIZES + (10_000_000,)
+PLOT_SIZES: tuple[int, ...] = (1_000, 10_000, 100_000)  # points plotted
+
+Call = Callable[[], object]
+
+
+@dataclass
+class BenchmarkCase:
+    """
+    setup(size, data_folder) returns the call to time and, for calls that
+    need fresh input each time, a prepare() that makes the call untimed
+    """
+
+    name: str
+    setup: Callable[[Optional[int], str], tuple[Call, Optional[Callable[[], Call]]]]
+    sizes: tuple[Optional[int], ...] = (None,)
+    history_sizes: bool = False  # sizes are the run's history sizes
+
+
+benchmark_cases: list[BenchmarkCase] = []
+
+
+def benchmark(
+    name: str, sizes: tuple[Optional[int], ...] = (None,), history_sizes: bool = False
+):
+    def register(setup):
+        benchmark_cases.append(
+            BenchmarkCase(
+                name=name, setup=setup, sizes=sizes, history_sizes=history_sizes
+            )
+        )
+        return setup
+
+    return register
+
+
+def _primed_door(open_value: bool, closed_value: bool) -> GarageDoor:
+    door, _ = make_door(
+        open_value=open_value, closed_value=closed_value, Logger=NullLogger
+    )
+    door.state  # prime old_state
+    return door
+
+
+@benchmark("garage_door.state_transition")
+def _state_transition(size: Optional[int], data_folder: str):
+    door = _primed_door(open_value=False, closed_value=True)
+
+    def call() -> GarageStatus:
+        # Swap the sensors, so each read records an opened or closed transition
+        door.open_sensor.value, door.closed_sensor.value = (
+            door.closed_sensor.value,
+            door.open_sensor.value,
+        )
+        return door.state
+
+    return call, None
+
+
+@benchmark("garage_door.state_unchanged")
+def _state_unchanged(size: Optional[int], data_folder: str):
+    door = _primed_door(open_value=False, closed_value=True)
+    return lambda: door.state, None
+
+
+@benchmark("garage_door.door_open_longer_than_time_limit")
+def _door_open_longer_than_time_limit(size: Optional[int], data_folder: str):
+    door = _primed_door(open_value=True, closed_value=False)
+    return lambda: door.door_open_longer_than_time_limit, None
+
+
+@benchmark("config.load_config")
+def _load_config(size: Optional[int], data_folder: str):
+    return load_config, None
+
+
+def _cache_folder(data_folder: str, size: Optional[int]) -> str:
+    return os.path.join(data_folder, "cache", str(size))
+
+
+@benchmark("history.load_cached_history.cold", history_sizes=True)
+def _load_history_cold(size: Optional[int], data_folder: str):
+    history_filepaths = [history_file(data_folder, n_events=size)]  # type: ignore
+    cache_folder = _cache_folder(data_folder, size)
+
+    def prepare() -> Call:
+        shutil.rmtree(cache_folder, ignore_errors=True)
+        return lambda: load_cached_history(
+            history_filepaths=history_filepaths, cache_folder=cache_folder
+        )
+
+    return prepare(), prepare
+
+
+@benchmark("history.load_cached_history.warm", history_sizes=True)
+def _load_history_warm(size: Optional[int], data_folder: str):
+    history_filepaths = [history_file(data_folder, n_events=size)]  # type: ignore
+    cache_folder = _cache_folder(data_folder, size)
+    load_cached_history(history_filepaths=history_filepaths, cache_folder=cache_folder)
+    return (
+        lambda: load_cached_history(
+            history_filepaths=history_filepaths, cache_folder=cache_folder
+        ),
+        None,
+    )
+
+
+@benchmark("history.clean_garage_door_history", history_sizes=True)
+def _clean_history(size: Optional[int], data_folder: str):
+    door_status_history: dict[str, pd.DataFrame] = load_cached_history(
+        history_filepaths=[history_file(data_folder, n_events=size)],  # type: ignore
+        cache_folder=_cache_folder(data_folder, size),
+    )
+
+    def prepare() -> Call:
+        # It sorts in place, so each call needs its own copy
+        door_history_copy = {
+            door: door_history.copy()
+            for door, door_history in door_status_history.items()
+        }
+        return lambda: clean_garage_door_history(door_history_copy)
+
+    return prepare(), prepare
+
+
+@benchmark("history_journal.scan", history_sizes=True)
+def _scan_journal(size: Optional[int], data_folder: str):
+    journal_path = journal_file(data_folder, n_records=size)  # type: ignore
+
+    def call() -> tuple[np.ndarray, int]:
+        # Memory map it and count the statuses and find the latest, as a report
+        records = JournalReader(journal_path=journal_path).records
+        return np.bincount(records["status"], minlength=7), records["timestamp"].max()
+
+    return call, None
+
+
+@benchmark("history_store.events_between", history_sizes=True)
+def _store_events_between(size: Optional[int], data_folder: str):
+    db_path = os.path.join(data_folder, "store", f"history_{size}.sqlite3")
+    time_zone: str = load_config().APP.TIME_ZONE
+    if not os.path.exists(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        temp_path = f"{db_path}.{os.getpid()}.tmp"
+        history_store = SQLiteHistoryStore(db_path=temp_path, time_zone=time_zone)
+        door_status_history = load_cached_history(
+            history_filepaths=[history_file(data_folder, n_events=size)],  # type: ignore
+            cache_folder=_cache_folder(data_folder, size),
+        )
+        for door, door_history in door_status_history.items():
+            history_store.record_many(door, door_history)
+        history_store.close()
+        os.replace(temp_path, db_path)
+    history_store = SQLiteHistoryStore(db_path=db_path, time_zone=time_zone)
+    start: dt.datetime = FIRST_EVENT.astype(dt.datetime)
+    end = start + dt.timedelta(days=365)  # all of 100,000 events, a tenth of 1M
+    return lambda: history_store.events_between("TWO_CAR", start=start, end=end), None
+
+
+@benchmark("plot.tk_xy_plot", sizes=PLOT_SIZES)
+def _tk_xy_plot(size: Optional[int], data_folder: str):
+    rng = np.random.default_rng(1)
+    x_data = np.cumsum(rng.integers(1, 600, size=size))
+    y_data = rng.choice([0.0, 0.5, 1.0], size=size)
+    return (
+        lambda: tk_xy_plot(
+            x1_data=x_data,
+            y1_data=y_data,
+            x_label="Date",
+            y1_label="Door Position (0=Closed, 1=Open)",
+            title="Door, TWO_CAR, Position History",
+            logger=NullLogger(),
+        ),
+        None,
+    )
+
+
+def _color_case(color: str | int | tuple[int, int, int]):
+    def setup(size: Optional[int], data_folder: str):
+        return lambda: color_as_hex_string(color), None
+
+    return setup
+
+
+for color_format, color in (
+    ("hash", "#eed5b7"),
+    ("0x", "0xeed5b7"),
+    ("int", 15652279),
+    ("name", "bisque2"),
+):
+    benchmark(f"color_as_hex_string.{color_format}")(_color_case(color))
@@ -0,0 +1,163 @@
+""" Timing, results files and run to run comparison for the benchmarks """
+
+from dataclasses import asdict, dataclass
+import datetime as dt
+import json
+import platform
+import statistics
+import subprocess
+import time
+from typing import Any, Callable, Optional
+
+REGRESSION_THRESHOLD: float = 0.10  # slower by more than this fraction
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    size: Optional[int]  # history events, points plotted, ...
+    number: int  # calls per repeat
+    repeat: int
+    min: float  # seconds per call
+    median: float
+    mean: float
+    stdev: float
+
+    @property
+    def key(self) -> str:
+        return self.name if self.size is None else f"{self.name}[{self.size}]"
+
+
+def time_calls(
+    call: Callable[[], object],
+    prepare: Optional[Callable[[], Callable[[], object]]] = None,
+    min_time: float = 0.2,
+    repeat: int = 5,
+) -> tuple[int, list[float]]:
+    """
+    Seconds per call of each of repeat rounds, with number of calls a round
+    chosen so that a round takes at least min_time. With prepare, each call
+    is prepare()'s result, made untimed (e.g. a fresh copy of data the call
+    changes), so calls are timed one by one.
+    """
+    if prepare is not None:
+        return 1, [_time_prepared(prepare, min_time) for _ in range(repeat)]
+    number: int = 1
+    while True:  # as timeit.Timer.autorange
+        round_time = _time_round(call, number)
+        if round_time >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(round_time, 1e-9)))
+    return number, [round_time / number] + [
+        _time_round(call, number) / number for _ in range(repeat - 1)
+    ]
+
+
+def _time_round(call: Callable[[], object], number: int) -> float:
+    start_time = time.perf_counter()
+    for _ in range(number):
+        call()
+    return time.perf_counter() - start_time
+
+
+def _time_prepared(
+    prepare: Callable[[], Callable[[], object]], min_time: float
+) -> float:
+    total_time: float = 0.0
+    n_calls: int = 0
+    while total_time < min_time or not n_calls:
+        call = prepare()
+        start_time = time.perf_counter()
+        call()
+        total_time += time.perf_counter() - start_time
+        n_calls += 1
+    return total_time / n_calls
+
+
+def benchmark_result(
+    name: str, size: Optional[int], number: int, times: list[float]
+) -> BenchmarkResult:
+    return BenchmarkResult(
+        name=name,
+        size=size,
+        number=number,
+        repeat=len(times),
+        min=min(times),
+        median=statistics.median(times),
+        mean=statistics.fmean(times),
+        stdev=statistics.stdev(times) if len(times) > 1 else 0.0,
+    )
+
+
+def write_results(results_filepath: str, results: list[BenchmarkResult]) -> None:
+    with open(results_filepath, "w") as fp:
+        json.dump(
+            {
+                "created": dt.datetime.now().isoformat(timespec="seconds"),
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": [asdict(result) for result in results],
+            },
+            fp,
+            indent=2,
+        )
+        fp.write("\n")
+
+
+def read_results(results_filepath: str) -> dict[str, BenchmarkResult]:
+    with open(results_filepath) as fp:
+        run: dict[str, Any] = json.load(fp)
+    results = [BenchmarkResult(**result) for result in run["results"]]
+    return {result.key: result for result in results}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(
+    baseline: dict[str, BenchmarkResult],
+    current: dict[str, BenchmarkResult],
+    threshold: float = REGRESSION_THRESHOLD,
+) -> tuple[list[str], list[str]]:
+    """
+    A report line for each benchmark in both runs, and the keys of those
+    whose median time grew by more than threshold
+    """
+    lines: list[str] = [
+        f"{'benchmark':<50} {'baseline':>12} {'current':>12} {'change':>8}"
+    ]
+    regressions: list[str] = []
+    for key in sorted(baseline.keys() & current.keys()):
+        change = current[key].median / baseline[key].median - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        elif change < -threshold:
+            flag = "  faster"
+        lines.append(
+            f"{key:<50} {format_seconds(baseline[key].median):>12} "
+            f"{format_seconds(current[key].median):>12} {change:>+8.1%}{flag}"
+        )
+    for key in sorted(baseline.keys() - current.keys()):
+        lines.append(f"{key:<50} only in the baseline")
+    for key in sorted(current.keys() - baseline.keys()):
+        lines.append(f"{key:<50} new")
+    return lines, regressions
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3f} {unit}"
+    return f"{seconds / 1e-9:.1f} ns"
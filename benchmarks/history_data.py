@@ -0,0 +1,76 @@
+""" Synthetic history files and journals, for benchmarks """
+
+import os
+
+import numpy as np
+
+from src.history_journal import RECORD_DTYPE, _header
+from src.history_parser import DOORS
+
+ACTIONS: list[str] = ["opened", "closed", "unknown"]
+FIRST_EVENT: np.datetime64 = np.datetime64("2020-01-01T06:00:00.000", "ms")
+CHUNK_EVENTS: int = 1_000_000  # lines formatted at a time
+
+
+def write_history(history_filepath: str, n_events: int, seed: int = 1) -> None:
+    """
+    n_events door transitions, 1 s to 10 min apart (10M events end in 2115,
+    inside the range of pandas timestamps), in about 50 bytes a line.
+    Written a chunk at a time, so 10M events don't need 10M strings at once.
+    """
+    rng = np.random.default_rng(seed)
+    last_event: np.datetime64 = FIRST_EVENT
+    temp_filepath = f"{history_filepath}.{os.getpid()}.tmp"
+    with open(temp_filepath, "w") as fp:
+        for chunk_start in range(0, n_events, CHUNK_EVENTS):
+            n_chunk = min(CHUNK_EVENTS, n_events - chunk_start)
+            gaps = rng.integers(1_000, 600_000, size=n_chunk).astype("m8[ms]")
+            timestamps = last_event + np.cumsum(gaps)
+            last_event = timestamps[-1]
+            stamps = np.datetime_as_string(timestamps, unit="ms")
+            doors = rng.integers(0, len(DOORS), size=n_chunk)
+            actions = rng.integers(0, len(ACTIONS), size=n_chunk)
+            fp.write(
+                "".join(
+                    f"{stamp[:10]} {stamp[11:19]},{stamp[20:]}:INFO:DOOR:"
+                    f"{DOORS[door]}:{ACTIONS[action]}\n"
+                    for stamp, door, action in zip(
+                        stamps.tolist(), doors.tolist(), actions.tolist()
+                    )
+                )
+            )
+    os.replace(temp_filepath, history_filepath)
+
+
+def history_file(data_folder: str, n_events: int) -> str:
+    """The history file of n_events, written on first use and then reused"""
+    history_filepath = os.path.join(
+        data_folder, f"garage_door_status_history_{n_events}.log"
+    )
+    if not os.path.exists(history_filepath):
+        os.makedirs(data_folder, exist_ok=True)
+        write_history(history_filepath, n_events=n_events)
+    return history_filepath
+
+
+def write_journal(journal_path: str, n_records: int) -> None:
+    """n_records door transitions a minute apart, alternating doors"""
+    records = np.zeros(n_records, dtype=RECORD_DTYPE)
+    records["timestamp"] = 1_690_000_000_000_000 + np.arange(n_records) * 60_000_000
+    records["door"] = np.arange(n_records) % 2
+    records["status"] = np.where(np.arange(n_records) % 4 < 2, 1, 5)
+    records["sequence"] = np.arange(n_records)
+    temp_path = f"{journal_path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as fp:
+        fp.write(_header())
+        records.tofile(fp)
+    os.replace(temp_path, journal_path)
+
+
+def journal_file(data_folder: str, n_records: int) -> str:
+    """The journal of n_records, written on first use and then reused"""
+    journal_path = os.path.join(data_folder, f"history_{n_records}.journal")
+    if not os.path.exists(journal_path):
+        os.makedirs(data_folder, exist_ok=True)
+        write_journal(journal_path, n_records=n_records)
+    return journal_path
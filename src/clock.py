@@ -0,0 +1,150 @@
+""" Clocks: the system clock, and a simulated clock that jumps to the next event """
+
+import datetime as dt
+import heapq
+import itertools
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional, Protocol
+
+
+class ClockProto(Protocol):
+    def now(self, tz: Optional[dt.tzinfo] = None) -> dt.datetime:
+        ...
+
+    def monotonic(self) -> float:
+        ...
+
+    def sleep(self, seconds: float) -> None:
+        ...
+
+    def get(self, events: queue.SimpleQueue, timeout: Optional[float]) -> Any:
+        ...
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> None:
+        ...
+
+    def call_every(
+        self, interval: float, callback: Callable[[], None]
+    ) -> Callable[[], None]:
+        ...
+
+
+class SystemClock:
+    """Wall time, real sleeps and timer threads"""
+
+    def now(self, tz: Optional[dt.tzinfo] = None) -> dt.datetime:
+        return dt.datetime.now(tz)
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+    def get(self, events: queue.SimpleQueue, timeout: Optional[float]) -> Any:
+        """The next of events, raising queue.Empty after timeout seconds"""
+        return events.get(timeout=timeout)
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> None:
+        """Run callback on a timer thread after delay seconds"""
+        timer = threading.Timer(interval=delay, function=callback)
+        timer.daemon = True
+        timer.start()
+
+    def call_every(
+        self, interval: float, callback: Callable[[], None]
+    ) -> Callable[[], None]:
+        """
+        Run callback every interval seconds on one daemon thread, skipping
+        ticks it overruns, until the function returned is called
+        """
+        stopped = threading.Event()
+
+        def run() -> None:
+            next_time = time.monotonic()
+            while not stopped.is_set():
+                callback()
+                next_time = max(next_time + interval, time.monotonic())
+                stopped.wait(next_time - time.monotonic())
+
+        threading.Thread(target=run, name="call_every", daemon=True).start()
+        return stopped.set
+
+
+class SimulatedClock:
+    """
+    Time stands still until the thread driving the simulation sleeps or
+    waits, then jumps straight to the next callback due (running it on
+    that thread) or to the end of the sleep or wait, so hours of a
+    scenario take milliseconds.
+    """
+
+    def __init__(self, start: Optional[dt.datetime] = None) -> None:
+        start = start or dt.datetime.now(dt.timezone.utc)
+        if start.tzinfo is None:
+            start = start.astimezone()  # naive is local time, as datetime.now()
+        self.start: dt.datetime = start
+        self.elapsed: float = 0.0  # seconds since start
+        self._callbacks: list[tuple[float, int, Callable[[], None]]] = []
+        self._sequence = itertools.count()  # callbacks due together run in order
+
+    def now(self, tz: Optional[dt.tzinfo] = None) -> dt.datetime:
+        now_time = self.start + dt.timedelta(seconds=self.elapsed)
+        if tz is None:
+            return now_time.astimezone().replace(tzinfo=None)
+        return now_time.astimezone(tz)
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    def sleep(self, seconds: float) -> None:
+        end = self.elapsed + max(0.0, seconds)
+        while self._callbacks and self._callbacks[0][0] <= end:
+            self._run_next_callback()
+        self.elapsed = end
+
+    def get(self, events: queue.SimpleQueue, timeout: Optional[float]) -> Any:
+        """
+        The next of events, put there by a callback due within timeout
+        seconds, else raise queue.Empty at the end of the timeout
+        """
+        end = self.elapsed + timeout if timeout is not None else None
+        while events.empty():
+            if self._callbacks and (end is None or self._callbacks[0][0] <= end):
+                self._run_next_callback()
+            elif end is None:
+                raise RuntimeError("Waiting forever, nothing left to happen")
+            else:
+                self.elapsed = end
+                raise queue.Empty
+        return events.get_nowait()
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> None:
+        heapq.heappush(
+            self._callbacks,
+            (self.elapsed + max(0.0, delay), next(self._sequence), callback),
+        )
+
+    def call_every(
+        self, interval: float, callback: Callable[[], None]
+    ) -> Callable[[], None]:
+        """
+        Run callback every interval seconds until the function returned is
+        called. Until then there is always something left to happen.
+        """
+        stopped = threading.Event()
+
+        def tick() -> None:
+            if not stopped.is_set():
+                callback()
+                self.call_later(interval, tick)
+
+        self.call_later(interval, tick)
+        return stopped.set
+
+    def _run_next_callback(self) -> None:
+        due, _, callback = heapq.heappop(self._callbacks)
+        self.elapsed = max(self.elapsed, due)
+        callback()
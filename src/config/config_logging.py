@@ -1,5 +1,6 @@
 """ Set-up Logging and load logging configuration as log_cfg, boxed """
 
+import atexit
 import logging
 from os import makedirs, path
 from typing import Any
@@ -8,6 +9,12 @@ from yaml import safe_load
 from box import Box
 
 from src.config.config_main import cfg
+from src.config.log_handlers import (
+    BatchFlushStreamHandler,
+    BatchingQueueListener,
+    CompressingRotatingFileHandler,
+)
+from src.exit_handler import register_exit_callback
 
 
 def load_log_config() -> Box:
@@ -47,17 +54,19 @@ logger.propagate = False
 
 if log_cfg.handler.console.enabled:
     # Set-up console logger to sys.err
-    ch = logging.StreamHandler()
+    ch = BatchFlushStreamHandler()
     ch.setLevel(level=log_cfg.handler.console.level)
     ch.setFormatter(fmt=log_fmt)
     logger.addHandler(hdlr=ch)
 
 if log_cfg.handler.log_file.enabled:
     # Set-up file logging
-    fh = logging.FileHandler(
+    fh = CompressingRotatingFileHandler(
         filename=path.join(
             log_cfg.handler.log_file.folder, log_cfg.handler.log_file.filename
-        )
+        ),
+        maxBytes=log_cfg.handler.log_file.maxBytes or 0,
+        backupCount=log_cfg.handler.log_file.backupCount or 0,
     )
     fh.setLevel(level=log_cfg.handler.log_file.level)
     fh.setFormatter(fmt=log_fmt)
@@ -69,11 +78,33 @@ history_logger.propagate = False
 
 if log_cfg.handler.history.enabled:
     # Set-up history logging
-    h_fh = logging.FileHandler(
+    h_fh = CompressingRotatingFileHandler(
         filename=path.join(
             log_cfg.handler.history.folder, log_cfg.handler.history.filename
-        )
+        ),
+        maxBytes=log_cfg.handler.history.maxBytes or 0,
+        backupCount=log_cfg.handler.history.backupCount or 0,
     )
     h_fh.setLevel(level=log_cfg.handler.history.level)
     h_fh.setFormatter(fmt=log_fmt)
     history_logger.addHandler(hdlr=h_fh)
+
+
+def queue_logger(logger: logging.Logger) -> BatchingQueueListener:
+    """Write logger's records from a background thread, in batches"""
+    log_listener = BatchingQueueListener(
+        logger=logger,
+        flush_interval=log_cfg.queue.flush_interval,
+        batch_size=log_cfg.queue.batch_size,
+    ).start()
+    # Drained by exit_handler, or at exit if the program ends otherwise
+    register_exit_callback(log_listener.stop)
+    atexit.register(log_listener.stop)
+    return log_listener
+
+
+if log_cfg.queue.enabled:
+    log_listeners: list[BatchingQueueListener] = [
+        queue_logger(logger=logger),
+        queue_logger(logger=history_logger),
+    ]
@@ -1,22 +1,96 @@
 """ Loads General Program configuration as cfg, boxed """
 
+import os
+import signal
+import threading
 from box import Box
-from typing import Any
+from typing import Any, Callable, Optional
 import yaml
 
+from src.metrics import CONFIG_LOADS, CONFIG_RELOADS
+
 CONFIG_LOC: str = "configs/gd_mon_config.yaml"
 env = "dev"
 
 
-def load_config() -> Box:
-    with open(CONFIG_LOC) as fp:
-        full_cfg: dict[str, Any] = yaml.safe_load(fp)
+class ConfigCache:
+    """
+    Parsed configuration, re-read only when the file's mtime or size changes
+    or after a SIGHUP. Hands out a frozen Box snapshot that is shared by all
+    callers; subscribers are called with the new snapshot after each reload.
+    """
+
+    def __init__(self, config_loc: str = CONFIG_LOC, env: str = env) -> None:
+        self.config_loc = config_loc
+        self.env = env
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Box] = None
+        self._file_signature: Optional[tuple[int, int]] = None  # mtime_ns, size
+        self._reload_requested: bool = False
+        self._subscribers: list[Callable[[Box], None]] = []
+
+    def get(self) -> Box:
+        CONFIG_LOADS.inc()
+        file_stat = os.stat(self.config_loc)
+        file_signature = (file_stat.st_mtime_ns, file_stat.st_size)
+        if self._is_current(file_signature):
+            return self._snapshot
+
+        with self._lock:
+            if self._is_current(file_signature):  # another thread reloaded it
+                return self._snapshot
+            reloaded: bool = self._snapshot is not None
+            self._reload_requested = False
+            snapshot = self._snapshot = self._parse()
+            CONFIG_RELOADS.inc()
+            self._file_signature = file_signature
+
+        if reloaded:
+            for subscriber in self._subscribers:
+                subscriber(snapshot)
+        return snapshot
+
+    def _is_current(self, file_signature: tuple[int, int]) -> bool:
+        return (
+            self._snapshot is not None
+            and file_signature == self._file_signature
+            and not self._reload_requested
+        )
+
+    def _parse(self) -> Box:
+        with open(self.config_loc) as fp:
+            full_cfg: dict[str, Any] = yaml.safe_load(fp)
 
-    cfg: Box = Box(
-        {**full_cfg["base"], **full_cfg[env]}, default_box=True, default_box_attr=None
-    )
+        return Box(
+            {**full_cfg["base"], **full_cfg[self.env]},
+            default_box=True,
+            default_box_attr=None,
+            frozen_box=True,
+        )
 
-    return cfg
+    def subscribe(self, callback: Callable[[Box], None]) -> None:
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Box], None]) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def request_reload(self, *_: Any) -> None:
+        """Re-read the file on the next get(), safe to call from a signal handler"""
+        self._reload_requested = True
+
+    def install_sighup_handler(self) -> None:
+        try:
+            signal.signal(signalnum=signal.SIGHUP, handler=self.request_reload)
+        except AttributeError:  # doesn't work in windows for testing
+            pass
+
+
+config_cache: ConfigCache = ConfigCache()
+
+
+def load_config() -> Box:
+    return config_cache.get()
 
 
 cfg: Box = load_config()
@@ -0,0 +1,242 @@
+""" Log handlers: size rotated, gzipped files and batched, off-thread writing """
+
+import datetime as dt
+import gzip
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+import time
+from typing import Optional
+
+ARCHIVE_SUFFIX: str = ".gz"
+_STOP = object()  # sentinel that ends a BatchingQueueListener
+
+
+class BatchFlushMixin:
+    """
+    For stream handlers: while batch_flush is set, flush() after each record
+    does nothing and the records written collect in the stream's buffer
+    until flush_batch().
+    """
+
+    batch_flush: bool = False
+
+    def flush(self) -> None:
+        if not self.batch_flush:
+            super().flush()  # type: ignore[misc]
+
+    def flush_batch(self) -> None:
+        super().flush()  # type: ignore[misc]
+
+
+class BatchFlushStreamHandler(BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+class DeferredFormatQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records as they are. QueueHandler.prepare() would format each
+    one on the logging thread; here that is left to the listener's handlers.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class BatchingQueueListener:
+    """
+    Moves logger's handlers behind a queue. Records are written by a
+    background thread; the handlers' streams are flushed after batch_size
+    records or flush_interval seconds, whichever is first, or at once when
+    a record arrives after a quiet spell. stop() writes what is queued and
+    gives the handlers back to the logger.
+    """
+
+    def __init__(
+        self, logger: logging.Logger, flush_interval: float, batch_size: int
+    ) -> None:
+        self.logger = logger
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.handlers: list[logging.Handler] = []
+        self._queue_handler = DeferredFormatQueueHandler(queue=self.queue)
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "BatchingQueueListener":
+        self.handlers = list(self.logger.handlers)
+        for handler in self.handlers:
+            if isinstance(handler, BatchFlushMixin):
+                handler.batch_flush = True
+        self._thread = threading.Thread(
+            target=self._run, name=f"log-{self.logger.name}", daemon=True
+        )
+        self._thread.start()
+        self.logger.addHandler(self._queue_handler)
+        for handler in self.handlers:
+            self.logger.removeHandler(handler)
+        return self
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        for handler in self.handlers:
+            if isinstance(handler, BatchFlushMixin):
+                handler.batch_flush = False
+            self.logger.addHandler(handler)
+        self.logger.removeHandler(self._queue_handler)
+        self.queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        last_flush: float = -self.flush_interval  # so the first record is flushed
+        pending: int = 0  # records written since the last flush
+        while True:
+            timeout: Optional[float] = None  # nothing to flush, wait for a record
+            if pending:
+                timeout = max(0.0, last_flush + self.flush_interval - time.monotonic())
+            try:
+                record = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                record = None
+            if record is _STOP:
+                self._flush()
+                return
+            if record is not None:
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+                pending += 1
+            if pending and (
+                pending >= self.batch_size
+                or time.monotonic() - last_flush >= self.flush_interval
+            ):
+                self._flush()
+                pending = 0
+                last_flush = time.monotonic()
+
+    def _flush(self) -> None:
+        for handler in self.handlers:
+            try:
+                if isinstance(handler, BatchFlushMixin):
+                    handler.flush_batch()
+                else:
+                    handler.flush()
+            except (OSError, ValueError):  # stream closed, as logging.shutdown()
+                pass
+
+
+class CompressingRotatingFileHandler(
+    BatchFlushMixin, logging.handlers.RotatingFileHandler
+):
+    """
+    Rolls filename over when it would grow past maxBytes. The full file is
+    renamed to a hidden name in the same folder, which is quick, and a
+    background thread gzips it to "<filename>.<YYYYmmdd-HHMMSS-ffffff>.gz" so that
+    logging never waits for the compression. Archive names don't change
+    once written, and they start with the log's name, so the history loader
+    finds them. Only the newest backupCount archives are kept, or all of
+    them if backupCount is 0.
+    """
+
+    def __init__(
+        self, filename: str, maxBytes: int = 0, backupCount: int = 0, **kwargs
+    ) -> None:
+        super().__init__(
+            filename=filename, maxBytes=maxBytes, backupCount=backupCount, **kwargs
+        )
+        self._compressor: Optional[threading.Thread] = None
+        # Finish any rotation interrupted by a stop or crash
+        leftovers: list[str] = []
+        for fn in sorted(os.listdir(self._log_folder)):
+            if not fn.startswith(f".{self._log_name}."):
+                continue
+            if fn.endswith(".tmp"):
+                os.remove(os.path.join(self._log_folder, fn))  # compressed again below
+            else:
+                leftovers.append(os.path.join(self._log_folder, fn))
+        if leftovers:
+            self._start_compressor(leftovers)
+
+    @property
+    def _log_folder(self) -> str:
+        return os.path.dirname(self.baseFilename)
+
+    @property
+    def _log_name(self) -> str:
+        return os.path.basename(self.baseFilename)
+
+    def doRollover(self) -> None:
+        if self.stream:
+            self.stream.close()
+            self.stream = None  # type: ignore[assignment]
+        self.wait_for_compression()  # only if the last one is somehow unfinished
+        stamp: str = dt.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        rolled_path = os.path.join(self._log_folder, f".{self._log_name}.{stamp}")
+        suffix: int = 0
+        while os.path.exists(rolled_path) or os.path.exists(
+            self._archive_path(rolled_path)
+        ):
+            suffix += 1
+            rolled_path = os.path.join(
+                self._log_folder, f".{self._log_name}.{stamp}_{suffix:03d}"
+            )
+        if os.path.exists(self.baseFilename):
+            os.rename(self.baseFilename, rolled_path)
+            self._start_compressor([rolled_path])
+        if not self.delay:
+            self.stream = self._open()
+
+    def wait_for_compression(self) -> None:
+        if self._compressor is not None:
+            self._compressor.join()
+            self._compressor = None
+
+    def close(self) -> None:
+        super().close()
+        self.wait_for_compression()
+
+    def _start_compressor(self, rolled_paths: list[str]) -> None:
+        self._compressor = threading.Thread(
+            target=self._compress,
+            args=(rolled_paths,),
+            name=f"compress-{self._log_name}",
+            daemon=True,
+        )
+        self._compressor.start()
+
+    def _compress(self, rolled_paths: list[str]) -> None:
+        for rolled_path in rolled_paths:
+            archive_path = self._archive_path(rolled_path)
+            temp_path = os.path.join(
+                self._log_folder, f".{os.path.basename(archive_path)}.{os.getpid()}.tmp"
+            )
+            try:
+                with open(rolled_path, "rb") as source, gzip.open(
+                    temp_path, "wb"
+                ) as dest:
+                    shutil.copyfileobj(source, dest)
+                os.replace(temp_path, archive_path)  # never a half written archive
+                os.remove(rolled_path)
+            except FileNotFoundError:  # another process finished it first
+                continue
+        self._remove_old_archives()
+
+    def _archive_path(self, rolled_path: str) -> str:
+        return os.path.join(
+            self._log_folder, os.path.basename(rolled_path)[1:] + ARCHIVE_SUFFIX
+        )
+
+    def _remove_old_archives(self) -> None:
+        if not self.backupCount:
+            return
+        archives = sorted(
+            fn
+            for fn in os.listdir(self._log_folder)
+            if fn.startswith(f"{self._log_name}.") and fn.endswith(ARCHIVE_SUFFIX)
+        )
+        for fn in archives[: -self.backupCount]:
+            os.remove(os.path.join(self._log_folder, fn))
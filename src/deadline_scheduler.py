@@ -0,0 +1,62 @@
+""" Earliest deadline first scheduling of door checks """
+
+import heapq
+import itertools
+from typing import Optional
+
+
+class DeadlineScheduler:
+    """
+    One deadline (clock.monotonic() seconds) per key (e.g. a door name) on
+    a heap. Rescheduling or cancelling a key leaves its old heap entry
+    behind, skipped when it reaches the top, so every operation is
+    O(log n) however many doors.
+    """
+
+    def __init__(self) -> None:
+        self._deadlines: dict[str, float] = {}
+        self._heap: list[tuple[float, int, str]] = []
+        self._sequence = itertools.count()  # keys due together come out in order
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, key: str, deadline: Optional[float]) -> None:
+        """Replace key's deadline, None cancels it"""
+        if deadline is None:
+            self._deadlines.pop(key, None)
+            return
+        if self._deadlines.get(key) == deadline:
+            return
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._sequence), key))
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._compact()
+
+    def next_deadline(self) -> Optional[float]:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> list[str]:
+        """The keys due by now, earliest first, no longer scheduled"""
+        due: list[str] = []
+        while self._drop_stale() and self._heap[0][0] <= now:
+            _, _, key = heapq.heappop(self._heap)
+            del self._deadlines[key]
+            due.append(key)
+        return due
+
+    def _drop_stale(self) -> bool:
+        """Pop superseded entries off the top, True if any entry is left"""
+        while self._heap:
+            deadline, _, key = self._heap[0]
+            if self._deadlines.get(key) == deadline:
+                return True
+            heapq.heappop(self._heap)
+        return False
+
+    def _compact(self) -> None:
+        self._heap = [
+            entry for entry in self._heap if self._deadlines.get(entry[2]) == entry[0]
+        ]
+        heapq.heapify(self._heap)
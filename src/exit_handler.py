@@ -1,5 +1,6 @@
+import asyncio
 import signal
-from typing import Any, Optional, Protocol
+from typing import Any, Callable, Optional, Protocol
 
 
 class LoggerProto(Protocol):
@@ -10,15 +11,50 @@ class LoggerProto(Protocol):
         ...
 
 
-def exit_handler(
-    signum: Optional[signal.Signals] = None,
-    frame: Optional[signal.Handlers] = None,
+exit_callbacks: list[Callable[[], None]] = []
+
+
+def register_exit_callback(callback: Callable[[], None]) -> None:
+    """Run callback (e.g. drain a queue) when the monitor stops"""
+    exit_callbacks.append(callback)
+
+
+def run_exit_callbacks() -> None:
+    while exit_callbacks:
+        exit_callbacks.pop()()
+
+
+def log_exit(
     logger: Optional[LoggerProto] = None,
     history_logger: Optional[LoggerProto] = None,
-) -> Any:
+) -> None:
     msg = "Stopping Garage Door Monitor"
     if logger:
         logger.info(msg=msg)
     if history_logger:
         history_logger.info(msg=msg)
+
+
+def exit_handler(
+    signum: Optional[signal.Signals] = None,
+    frame: Optional[signal.Handlers] = None,
+    logger: Optional[LoggerProto] = None,
+    history_logger: Optional[LoggerProto] = None,
+) -> Any:
+    log_exit(logger=logger, history_logger=history_logger)
+    run_exit_callbacks()
     exit(0)
+
+
+def add_async_exit_handler(stop_event: asyncio.Event) -> None:
+    """
+    Loop-aware replacement for registering exit_handler: SIGINT (Ctrl + C) and
+    SIGTSTP (Ctrl + Z) set stop_event so the running loop can shut down
+    cleanly. Must be called from within the running loop.
+    """
+    loop = asyncio.get_running_loop()
+    for signame in ("SIGINT", "SIGTSTP"):
+        try:
+            loop.add_signal_handler(getattr(signal, signame), stop_event.set)
+        except (AttributeError, NotImplementedError):  # not available in windows
+            pass
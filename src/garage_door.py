@@ -1,18 +1,36 @@
-from dataclasses import dataclass
+import asyncio
+from dataclasses import dataclass, field
 import datetime as dt
 from enum import Enum
-from time import sleep
+import logging
+import math
+import time
 
 from box import Box
-from typing import Callable, Protocol
+from typing import Callable, Optional, Protocol, runtime_checkable
 
 import pytz
 
+from src import metrics
+from src.clock import ClockProto, SystemClock
+from src.sensor_bank import BankSnapshot
+
 
 class DoorSensorProto(Protocol):
     value: bool
 
 
+@runtime_checkable
+class FilteredSensorProto(Protocol):
+    """
+    A sensor that knows when (clock.monotonic() seconds) its value last
+    changed, e.g. a SensorSampler's FilteredSensor. Only changed_at is
+    checked, as isinstance reading value would take a sample.
+    """
+
+    changed_at: Optional[float]
+
+
 class LoggerProto(Protocol):
     def debug(self, msg: str) -> None:
         ...
@@ -21,6 +39,22 @@ class LoggerProto(Protocol):
         ...
 
 
+def _debug_enabled(logger: LoggerProto) -> bool:
+    """Loggers without levels, e.g. test doubles, take every debug message"""
+    is_enabled_for = getattr(logger, "isEnabledFor", None)
+    return is_enabled_for is None or is_enabled_for(logging.DEBUG)
+
+
+class SensorBankProto(Protocol):
+    def snapshot(self) -> BankSnapshot:
+        ...
+
+
+class EventSinkProto(Protocol):
+    def record(self, door: str, action: str, timestamp: dt.datetime) -> None:
+        ...
+
+
 class GarageStatus(Enum):
     open = 1
     un_open = 2
@@ -38,64 +72,103 @@ class GarageDoor:
     load_config: Callable[[], Box]
     debug_logger: LoggerProto
     history_logger: LoggerProto
+    # Also given each transition, e.g. an SQLiteHistoryStore
+    event_sinks: list[EventSinkProto] = field(default_factory=list)
+    # Where "now" comes from, a SimulatedClock runs scenarios in no time
+    clock: ClockProto = field(default_factory=SystemClock)
+    # Read both sensors from one snapshot of the bank, by pin, instead
+    sensor_bank: Optional[SensorBankProto] = None
+    open_pin: Optional[int] = None
+    closed_pin: Optional[int] = None
 
     def __post_init__(self) -> None:
+        # (open, closed) pins, read from the sensor bank
+        self._bank_pins: Optional[tuple[int, int]] = None
+        if self.sensor_bank is not None:
+            if self.open_pin is None or self.closed_pin is None:
+                raise ValueError(
+                    f"Door {self.name} reads a sensor bank, so needs open_pin and"
+                    f" closed_pin, not {self.open_pin} and {self.closed_pin}"
+                )
+            self._bank_pins = (self.open_pin, self.closed_pin)
         self.old_state: GarageStatus = GarageStatus.undefined  # prime
-        self.app_cfg: Box = self.load_config().APP
+        cfg: Box = self.load_config()
+        self.app_cfg: Box = cfg.APP
         self.TIME_ZONE = pytz.timezone(zone=self.app_cfg.TIME_ZONE)
-        self.status_change_time: dt.datetime = dt.datetime.now(self.TIME_ZONE)
-        self.door_cfg: Box = self.load_config().DOORS[self.name]
+        # Durations and deadlines are monotonic seconds, immune to DST and NTP
+        # steps. The wall time is only made for the history of a transition.
+        self.status_change_monotonic: float = self.clock.monotonic()
+        self.status_change_time: dt.datetime = self.clock.now(self.TIME_ZONE)
+        self.door_cfg: Box = cfg.DOORS[self.name]
         self.open_time_limit = self.door_cfg.OPEN.TIME_LIMIT  # reset to baseline
-        self.last_alarm_time: dt.datetime = dt.datetime.now() - dt.timedelta(
-            weeks=52
-        )  # a long time ago
+        self.last_alarm_monotonic: float = -math.inf  # never
+        # Set while both sensors are inactive but before the door is declared unknown
+        self.midstate_start_monotonic: Optional[float] = None
+        self._state_evaluation_time = metrics.STATE_EVALUATION.labels(self.name)
         msg = f"DOOR:{self.name}:created"
         self.debug_logger.debug(msg=msg)
         self.history_logger.info(msg=msg)
 
     @property
     def state(self) -> GarageStatus:
-        sensor_open_value: bool = bool(self.open_sensor.value)
-        sensor_closed_value: bool = bool(self.closed_sensor.value)
+        return self.update_state()
+
+    def update_state(self, at_time: Optional[float] = None) -> GarageStatus:
+        """
+        Read the sensors and return the door state. A state change is stamped
+        with at_time (clock.monotonic() seconds, e.g. when a sensor edge
+        arrived), default now.
+        """
+        start_time: float = time.perf_counter()
+        try:
+            return self._evaluate_state(at_time=at_time)
+        finally:
+            self._state_evaluation_time.observe(time.perf_counter() - start_time)
+
+    def _evaluate_state(self, at_time: Optional[float]) -> GarageStatus:
+        sensor_open_value, sensor_closed_value = self._read_sensors()
+        changed_at = at_time if at_time is not None else self._sensors_changed_at()
         match (sensor_open_value, sensor_closed_value):
             case (True, False):  # DOOR IS OPEN!
+                self._end_midstate()
                 if self.old_state != GarageStatus.open:
-                    self.status_change_time = dt.datetime.now(self.TIME_ZONE)
-                    self.old_state = GarageStatus.open  # for the next time
-                    msg = f"DOOR:{self.name}:opened"
-                    self.debug_logger.debug(msg=msg)
-                    self.history_logger.info(msg=msg)
+                    self._record_transition(GarageStatus.open, "opened", changed_at)
                 return GarageStatus.open
             case (False, True):  # DOOR IS CLOSED!
+                self._end_midstate()
                 if self.old_state != GarageStatus.closed:
-                    self.status_change_time = dt.datetime.now(self.TIME_ZONE)
-                    self.old_state = GarageStatus.closed  # for the next time
-                    msg = f"DOOR:{self.name}:closed"
-                    self.debug_logger.debug(msg=msg)
-                    self.history_logger.info(msg=msg)
+                    self._record_transition(GarageStatus.closed, "closed", changed_at)
                 # Reset open_time_limit to baseline
                 self.open_time_limit = self.door_cfg.OPEN.TIME_LIMIT
                 return GarageStatus.closed
             case (False, False):  # DOOR IS NEITHER OPEN NOR CLOSED!
-                self.debug_logger.debug(
-                    msg=f"Door, {self.name}, neither open nor closed, pausing and rechecking"
-                )
-                # Give door a chance to finish opening or closing
-                sleep(self.app_cfg.DOOR_MIDSTATE_RE_EVAL_TIME)
-                if self.open_sensor.value or self.closed_sensor.value:
+                if self.old_state == GarageStatus.unknown:
+                    return GarageStatus.unknown
+                now_time = at_time if at_time is not None else self.clock.monotonic()
+                if self.midstate_start_monotonic is None:
                     self.debug_logger.debug(
-                        msg=f"Door, {self.name}, is now open and/or closed"
+                        msg=f"Door, {self.name}, neither open nor closed, rechecking later"
                     )
-                    return self.state  # if open or closed, recursively run state
-                if self.old_state != GarageStatus.unknown:
-                    self.status_change_time = dt.datetime.now(self.TIME_ZONE)
-                    self.old_state = GarageStatus.unknown  # for the next time
-                    msg = f"DOOR:{self.name}:unknown"
-                    self.debug_logger.debug(msg=msg)
-                    self.history_logger.info(msg=msg)
+                    self.midstate_start_monotonic = (
+                        changed_at if changed_at is not None else now_time
+                    )
+                # Give door a chance to finish opening or closing
+                if (
+                    now_time - self.midstate_start_monotonic
+                    < self.app_cfg.DOOR_MIDSTATE_RE_EVAL_TIME
+                ):
+                    match self.old_state:
+                        case GarageStatus.closed:
+                            return GarageStatus.un_closed  # leaving closed
+                        case GarageStatus.open:
+                            return GarageStatus.un_open  # leaving open
+                        case _:
+                            return GarageStatus.unknown
+                self.midstate_start_monotonic = None
+                self._record_transition(GarageStatus.unknown, "unknown", now_time)
                 return GarageStatus.unknown
             case (True, True):  # DOOR IS BOTH OPEN AND CLOSED, PLEASE DRIVE THROUGH!
-                msg = f"For door {self}, both Open and Closed Sensors are Active"
+                msg = f"For door {self.name}, both Open and Closed Sensors are Active"
                 self.debug_logger.debug(msg=msg)
                 self.history_logger.info(msg=msg)
                 return GarageStatus.unknown
@@ -104,42 +177,137 @@ class GarageDoor:
                     f"Should never get here. {sensor_open_value=}, {sensor_closed_value=}"
                 )
 
+    def _read_sensors(self) -> tuple[bool, bool]:
+        """(open, closed) sensor values"""
+        if self.sensor_bank is None or self._bank_pins is None:
+            return bool(self.open_sensor.value), bool(self.closed_sensor.value)
+        open_pin, closed_pin = self._bank_pins
+        snapshot = self.sensor_bank.snapshot()
+        return snapshot.is_active(open_pin), snapshot.is_active(closed_pin)
+
+    def _sensors_changed_at(self) -> Optional[float]:
+        """
+        When filtered sensors (e.g. a SensorSampler's) last changed, for
+        stamping a transition with when it was sampled, else None
+        """
+        change_times: list[float] = [
+            sensor.changed_at
+            for sensor in (self.open_sensor, self.closed_sensor)
+            if isinstance(sensor, FilteredSensorProto) and sensor.changed_at is not None
+        ]
+        return max(change_times, default=None)
+
     @property
-    def seconds_at_state(self) -> int:
-        now_time = dt.datetime.now(self.TIME_ZONE)
-        time_delta: int = int((now_time - self.status_change_time).total_seconds())
-        self.debug_logger.debug(f"{self.name}:seconds_at_state: {time_delta} seconds")
-        return time_delta
+    def seconds_until_settled(self) -> Optional[float]:
+        """Seconds until a door between sensors is declared unknown, else None"""
+        if self.midstate_start_monotonic is None:
+            return None
+        return max(
+            0.0,
+            self.app_cfg.DOOR_MIDSTATE_RE_EVAL_TIME
+            - (self.clock.monotonic() - self.midstate_start_monotonic),
+        )
 
     @property
-    def door_open_longer_than_time_limit(self) -> bool:
-        self.door_cfg = self.load_config().DOORS[self.name]
-        time_since_last_open_alarm = (
-            dt.datetime.now() - self.last_alarm_time
-        ).total_seconds()
+    def alarm_deadline(self) -> Optional[float]:
+        """
+        When door_open_longer_than_time_limit next turns True: TIME_LIMIT
+        after the door opened and open_time_limit after the last alarm.
+        None unless the door is open, and while it is leaving open (no alarm
+        is sent then). In clock.monotonic() seconds.
+        """
         if (
-            # Is door open?
-            self.state == GarageStatus.open
-            # comparing minutes - Has door been open long enough?
-            and self.seconds_at_state > self.door_cfg.OPEN.TIME_LIMIT
-            # comparing minutes - Has it been long enough since last alarm?
-            and time_since_last_open_alarm > self.open_time_limit
+            self.old_state != GarageStatus.open
+            or self.midstate_start_monotonic is not None
         ):
-            # Reset last alarm time
-            self.last_alarm_time = dt.datetime.now()
-            # Increase open_time_limit for next alarm
-            self.open_time_limit = (
-                self.open_time_limit * self.door_cfg.OPEN.ALARM_INC_MULT
-                + self.door_cfg.OPEN.ALARM_INC_ADD
+            return None
+        return max(
+            self.status_change_monotonic + self.door_cfg.OPEN.TIME_LIMIT,
+            self.last_alarm_monotonic + self.open_time_limit,
+        )
+
+    @property
+    def next_deadline(self) -> Optional[float]:
+        """
+        The next time (clock.monotonic() seconds) the door needs looking at
+        without a sensor edge: its alarm_deadline, or when a door between
+        sensors settles to unknown
+        """
+        deadlines: list[float] = []
+        if self.midstate_start_monotonic is not None:
+            deadlines.append(
+                self.midstate_start_monotonic + self.app_cfg.DOOR_MIDSTATE_RE_EVAL_TIME
             )
+        alarm_deadline = self.alarm_deadline
+        if alarm_deadline is not None:
+            deadlines.append(alarm_deadline)
+        return min(deadlines, default=None)
+
+    def _end_midstate(self) -> None:
+        if self.midstate_start_monotonic is not None:
+            self.midstate_start_monotonic = None
+            self.debug_logger.debug(msg=f"Door, {self.name}, is now open and/or closed")
+
+    def _record_transition(
+        self, new_state: GarageStatus, action: str, at_time: Optional[float]
+    ) -> None:
+        now_monotonic: float = self.clock.monotonic()
+        self.status_change_monotonic = at_time if at_time is not None else now_monotonic
+        # The one wall clock read, back-dated to at_time, for the history
+        self.status_change_time = self.clock.now(self.TIME_ZONE) - dt.timedelta(
+            seconds=now_monotonic - self.status_change_monotonic
+        )
+        self.old_state = new_state  # for the next time
+        msg = f"DOOR:{self.name}:{action}"
+        self.debug_logger.debug(msg=msg)
+        self.history_logger.info(msg=msg)
+        for event_sink in self.event_sinks:
+            event_sink.record(self.name, action, self.status_change_time)
+        metrics.TRANSITIONS.labels(self.name, action).inc()
+
+    @property
+    def seconds_at_state(self) -> int:
+        time_delta: int = int(self.clock.monotonic() - self.status_change_monotonic)
+        if _debug_enabled(self.debug_logger):  # called every loop, skip the f-string
             self.debug_logger.debug(
-                msg=(
-                    f"door_open_longer_than_time_limit=True. "
-                    f"Increasing open_time_limit to {self.open_time_limit} seconds."
-                )
+                msg=f"{self.name}:seconds_at_state: {time_delta} seconds"
+            )
+        return time_delta
+
+    @property
+    def door_open_longer_than_time_limit(self) -> bool:
+        self.door_cfg = self.load_config().DOORS[self.name]
+        if self.state != GarageStatus.open:
+            return False
+        alarm_deadline = self.alarm_deadline
+        if alarm_deadline is None or self.clock.monotonic() < alarm_deadline:
+            return False
+        # Space the next alarm from when this one was due, so a late check
+        # doesn't push every later alarm back, but no more than a limit ago,
+        # so a check several limits late doesn't catch up with a burst
+        self.last_alarm_monotonic = max(
+            alarm_deadline, self.clock.monotonic() - self.open_time_limit
+        )
+        metrics.ALARMS.labels(self.name).inc()
+        # Increase open_time_limit for next alarm
+        self.open_time_limit = (
+            self.open_time_limit * self.door_cfg.OPEN.ALARM_INC_MULT
+            + self.door_cfg.OPEN.ALARM_INC_ADD
+        )
+        self.debug_logger.debug(
+            msg=(
+                f"door_open_longer_than_time_limit=True. "
+                f"Increasing open_time_limit to {self.open_time_limit} seconds."
             )
-            return True
-        return False
+        )
+        return True
+
+    async def async_update_state(self, at_time: Optional[float] = None) -> GarageStatus:
+        """update_state with the sensor reads in a worker thread"""
+        return await asyncio.to_thread(self.update_state, at_time)
+
+    async def async_door_open_longer_than_time_limit(self) -> bool:
+        return await asyncio.to_thread(lambda: self.door_open_longer_than_time_limit)
 
     def __str__(self) -> str:
         return f"DOOR:{self.name}:{self.state.name}"
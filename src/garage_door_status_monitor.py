@@ -1,14 +1,35 @@
-import datetime as dt
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 from functools import partial
+import queue
 import signal
-from time import sleep
-from typing import Callable, Optional, Protocol
+from time import perf_counter
+from typing import Callable, Iterable, Iterator, Optional, Protocol
 
 from box import Box
 
-from src.config.config_main import load_config
-from src.exit_handler import exit_handler
-from src.garage_door import GarageDoor
+from src import metrics
+from src.clock import ClockProto, SystemClock
+from src.config.config_main import config_cache, load_config
+from src.deadline_scheduler import DeadlineScheduler
+from src.exit_handler import (
+    add_async_exit_handler,
+    exit_handler,
+    log_exit,
+    register_exit_callback,
+    run_exit_callbacks,
+)
+from src.garage_door import (
+    EventSinkProto,
+    FilteredSensorProto,
+    GarageDoor,
+    GarageStatus,
+)
+from src.history_journal import HistoryJournal
+from src.history_store import SQLiteHistoryStore
+from src.sensor_bank import SensorBank, open_sensor_bank
+from src.sensor_sampler import SensorSampler
 
 
 class DoorSensorProto(Protocol):
@@ -22,6 +43,15 @@ class LoggerProto(Protocol):
     def info(self, msg: str) -> None:
         ...
 
+    def error(self, msg: str) -> None:
+        ...
+
+    def exception(self, msg: str) -> None:
+        ...
+
+
+SENSORS: tuple[str, ...] = ("OPEN", "CLOSED")  # sensor sections of DOORS.<name>
+
 
 def garage_door_status_monitor(
     DoorSensor: DoorSensorProto,
@@ -29,28 +59,113 @@ def garage_door_status_monitor(
     logger: LoggerProto,
     history_logger: LoggerProto,
     max_run_time: Optional[int] = None,
+    clock: Optional[ClockProto] = None,
 ) -> None:
     msg: str = f"Starting Garage Door Monitor"
     history_logger.info(msg=msg)
     logger.debug(msg=msg)
+    config_cache.install_sighup_handler()
+    config_reloaded = partial(_config_reloaded, logger=logger)
+    config_cache.subscribe(config_reloaded)
+    register_exit_callback(partial(config_cache.unsubscribe, config_reloaded))
+    cfg: Box = load_config()
+    clock = clock or SystemClock()
+    start_time: float = clock.monotonic()
+    garage_doors: Box = _create_garage_doors(
+        DoorSensor=DoorSensor, logger=logger, history_logger=history_logger, clock=clock
+    )
+    _start_metrics_server(logger=logger)
+
+    # Register the exit handler with `SIGINT`(CTRL + C)
+    signal.signal(
+        signalnum=signal.SIGINT,
+        handler=partial(exit_handler, logger=logger, history_logger=history_logger),
+    )
+
+    try:
+        # Register the exit handler with `SIGTSTP` (Ctrl + Z)
+        signal.signal(
+            signalnum=signal.SIGTSTP,
+            handler=partial(exit_handler, logger=logger, history_logger=history_logger),
+        )
+    except AttributeError:  # doesn't work in windows for testing
+        pass
+
+    if cfg.APP.MONITOR_MODE == "event":
+        _event_loop(
+            garage_doors=garage_doors,
+            send_notification=send_notification,
+            logger=logger,
+            history_logger=history_logger,
+            start_time=start_time,
+            max_run_time=max_run_time,
+            clock=clock,
+        )
+    elif cfg.APP.MONITOR_MODE == "adaptive":
+        _adaptive_poll_loop(
+            garage_doors=garage_doors,
+            send_notification=send_notification,
+            logger=logger,
+            history_logger=history_logger,
+            start_time=start_time,
+            max_run_time=max_run_time,
+            clock=clock,
+        )
+    else:
+        _poll_loop(
+            garage_doors=garage_doors,
+            send_notification=send_notification,
+            logger=logger,
+            history_logger=history_logger,
+            start_time=start_time,
+            max_run_time=max_run_time,
+            clock=clock,
+        )
+
+
+def _create_garage_doors(
+    DoorSensor: DoorSensorProto,
+    logger: LoggerProto,
+    history_logger: LoggerProto,
+    clock: ClockProto,
+) -> Box:
     cfg: Box = load_config()
     garage_door_config: Box = cfg.DOORS
     garage_doors: Box = Box({})
-    start_time: dt.datetime = dt.datetime.now()
+    sampler: Optional[SensorSampler] = None
+    if cfg.SAMPLER.ENABLED:
+        sampler = SensorSampler(
+            rate=cfg.SAMPLER.RATE,
+            window=cfg.SAMPLER.WINDOW,
+            filter_=cfg.SAMPLER.FILTER,
+            clock=clock,
+        )
 
     # Create DigitalInputDevice Door Open/Closed Sensors
     for garage_door in garage_door_config.keys():
         garage_doors[garage_door] = Box({})
-        for sensor in garage_door_config[garage_door].keys():
-            garage_doors[garage_door][
-                garage_door_config[garage_door][sensor].NAME
-            ] = DoorSensor(
+        for sensor in SENSORS:
+            door_sensor: DoorSensorProto = DoorSensor(
                 pin=int(garage_door_config[garage_door][sensor].NUMBER),
                 pull_up=garage_door_config[garage_door][sensor].PULL_UP,
                 bounce_time=garage_door_config[garage_door][sensor].BOUNCE_TIME,
             )
+            if sampler is not None:  # the doors see filtered samples instead
+                door_sensor = sampler.add(door_sensor)
+            garage_doors[garage_door][
+                garage_door_config[garage_door][sensor].NAME
+            ] = door_sensor
+    if sampler is not None:
+        sampler.start()
+        register_exit_callback(sampler.stop)
+    sensor_bank: Optional[SensorBank] = None
+    if cfg.SENSOR_BANK.ENABLED and sampler is None:  # the sampler reads them all
+        sensor_bank = _create_sensor_bank(
+            garage_doors=garage_doors, logger=logger, clock=clock
+        )
 
     # Create GarageDoor Objects
+    event_sinks: list[EventSinkProto] = _create_event_sinks()
     for garage_door in garage_door_config.keys():
         garage_doors[garage_door]["DoorObject"] = GarageDoor(
             name=garage_door,
@@ -59,60 +174,601 @@ def garage_door_status_monitor(
             load_config=load_config,
             debug_logger=logger,
             history_logger=history_logger,
+            event_sinks=event_sinks,
+            clock=clock,
+            sensor_bank=sensor_bank,
+            open_pin=int(garage_door_config[garage_door].OPEN.NUMBER),
+            closed_pin=int(garage_door_config[garage_door].CLOSED.NUMBER),
         )
 
-    # Register the exit handler with `SIGINT`(CTRL + C)
-    signal.signal(
-        signalnum=signal.SIGINT,
-        handler=partial(exit_handler, logger=logger, history_logger=history_logger),
+    return garage_doors
+
+
+def _create_sensor_bank(
+    garage_doors: Box, logger: LoggerProto, clock: ClockProto
+) -> SensorBank:
+    """One bank of every DOORS sensor pin, read through the devices as needed"""
+    garage_door_config: Box = load_config().DOORS
+    devices: dict[int, DoorSensorProto] = {}
+    pull_ups: dict[int, bool] = {}
+    for garage_door in garage_door_config.keys():
+        for sensor in SENSORS:
+            sensor_cfg: Box = garage_door_config[garage_door][sensor]
+            devices[int(sensor_cfg.NUMBER)] = garage_doors[garage_door][sensor_cfg.NAME]
+            pull_ups[int(sensor_cfg.NUMBER)] = sensor_cfg.PULL_UP
+    return open_sensor_bank(
+        devices=devices, pull_ups=pull_ups, clock=clock, logger=logger
     )
 
+
+@contextmanager
+def _shared_snapshot(doors: Iterable[GarageDoor]) -> Iterator[None]:
+    """Have doors checked together read their sensor bank once between them"""
+    with ExitStack() as stack:
+        for sensor_bank in {
+            id(door.sensor_bank): door.sensor_bank
+            for door in doors
+            if door.sensor_bank is not None
+        }.values():
+            stack.enter_context(sensor_bank.hold())
+        yield
+
+
+def _create_event_sinks() -> list[EventSinkProto]:
+    cfg: Box = load_config()
+    event_sinks: list[EventSinkProto] = []
+    if cfg.HISTORY.SQLITE.PATH:
+        history_store = SQLiteHistoryStore(
+            db_path=cfg.HISTORY.SQLITE.PATH,
+            time_zone=cfg.APP.TIME_ZONE,
+            batch_size=cfg.HISTORY.SQLITE.BATCH_SIZE,
+            flush_interval=cfg.HISTORY.SQLITE.FLUSH_INTERVAL,
+        )
+        register_exit_callback(history_store.close)
+        event_sinks.append(history_store)
+    if cfg.HISTORY.JOURNAL.PATH:
+        history_journal = HistoryJournal(
+            journal_path=cfg.HISTORY.JOURNAL.PATH, time_zone=cfg.APP.TIME_ZONE
+        )
+        register_exit_callback(history_journal.close)
+        event_sinks.append(history_journal)
+    return event_sinks
+
+
+def _start_metrics_server(logger: LoggerProto) -> None:
+    metrics_cfg: Box = load_config().METRICS
+    if not metrics_cfg.ENABLED:
+        return
     try:
-        # Register the exit handler with `SIGTSTP` (Ctrl + Z)
-        signal.signal(
-            signalnum=signal.SIGTSTP,
-            handler=partial(exit_handler, logger=logger, history_logger=history_logger),
+        server = metrics.start_metrics_server(
+            registry=metrics.registry, host=metrics_cfg.HOST, port=metrics_cfg.PORT
         )
-    except AttributeError:  # doesn't work in windows for testing
-        pass
+    except OSError as err:  # e.g. the port is in use, monitor the doors anyway
+        logger.error(msg=f"Metrics server not started: {err!r}")
+        return
+    register_exit_callback(partial(metrics.stop_metrics_server, server))
+    logger.debug(
+        msg=f"Metrics at http://{metrics_cfg.HOST}:{server.server_port}/metrics"
+    )
 
-    # Main Loop
-    while True:
-        if max_run_time and (
-            (dt.datetime.now() - start_time).total_seconds() > max_run_time
-        ):
-            msg = f"Max. run time of {max_run_time} exceeded. Closing Monitor"
-            logger.debug(msg=msg)
-            history_logger.info(msg=msg)
-            exit_handler(logger=logger, history_logger=history_logger)
-
-        # Check if garages have been open for more than X minutes (from config)
-        for garage_door in garage_door_config.keys():
-            if garage_doors[garage_door]["DoorObject"].door_open_longer_than_time_limit:
+
+def _config_reloaded(cfg: Box, logger: LoggerProto) -> None:
+    logger.info(msg="Configuration reloaded")
+
+
+def _check_max_run_time(
+    logger: LoggerProto,
+    history_logger: LoggerProto,
+    start_time: float,
+    max_run_time: Optional[int],
+    clock: ClockProto,
+) -> None:
+    if max_run_time and (clock.monotonic() - start_time >= max_run_time):
+        msg = f"Max. run time of {max_run_time} exceeded. Closing Monitor"
+        logger.debug(msg=msg)
+        history_logger.info(msg=msg)
+        exit_handler(logger=logger, history_logger=history_logger)
+
+
+def _check_open_doors(
+    garage_doors: Box,
+    send_notification: Callable[[str], None],
+    logger: LoggerProto,
+    scheduler: DeadlineScheduler,
+    door_names: Optional[Iterable[str]] = None,
+) -> None:
+    """
+    Send an alarm for each of door_names (default all) open too long, and
+    schedule when each next needs checking
+    """
+    start_time: float = perf_counter()
+    doors: list[GarageDoor] = [
+        garage_doors[garage_door]["DoorObject"]
+        for garage_door in (garage_doors.keys() if door_names is None else door_names)
+    ]
+    with _shared_snapshot(doors):
+        for door in doors:
+            if door.door_open_longer_than_time_limit:
                 send_notification(
-                    msg=(
-                        f"{garage_doors[garage_door]['DoorObject'].name} open for "
-                        f"{garage_doors[garage_door]['DoorObject'].seconds_at_state // 60} minutes"
-                    ),
+                    msg=f"{door.name} open for {door.seconds_at_state // 60} minutes",
+                    logger=logger,
+                )
+            scheduler.schedule(door.name, door.next_deadline)
+    metrics.LOOP_DURATION.labels("all").observe(perf_counter() - start_time)
+
+
+def _wake_time(
+    next_check: float,
+    scheduler: DeadlineScheduler,
+    start_time: float,
+    max_run_time: Optional[int],
+) -> float:
+    """The earliest of next_check, the next door deadline and the end of the run"""
+    wake_times: list[float] = [next_check]
+    next_deadline = scheduler.next_deadline()
+    if next_deadline is not None:
+        wake_times.append(next_deadline)
+    if max_run_time:
+        wake_times.append(start_time + max_run_time)
+    return min(wake_times)
+
+
+def _transition_time(door: GarageDoor, edge_time: float) -> Optional[float]:
+    """
+    When a door's sensor edge says it changed: edge_time, unless its sensors
+    are filtered, whose edges come once a filter agrees, e.g. a debounce
+    window late. None then, so the door takes when the filtered value changed.
+    """
+    if isinstance(door.open_sensor, FilteredSensorProto) or isinstance(
+        door.closed_sensor, FilteredSensorProto
+    ):
+        return None
+    return edge_time
+
+
+def _seconds_until(wake_time: float, clock: ClockProto) -> float:
+    return max(0.0, wake_time - clock.monotonic())
+
+
+def _poll_loop(
+    garage_doors: Box,
+    send_notification: Callable[[str], None],
+    logger: LoggerProto,
+    history_logger: LoggerProto,
+    start_time: float,
+    max_run_time: Optional[int],
+    clock: ClockProto,
+) -> None:
+    """
+    Read every door at LOOP_DELAY. In between, sleep until the next door
+    deadline (an alarm due, a door between sensors settling) and check just
+    the doors due.
+    """
+    cfg: Box = load_config()
+    scheduler = DeadlineScheduler()
+    while True:
+        _check_max_run_time(
+            logger=logger,
+            history_logger=history_logger,
+            start_time=start_time,
+            max_run_time=max_run_time,
+            clock=clock,
+        )
+        _check_open_doors(
+            garage_doors=garage_doors,
+            send_notification=send_notification,
+            logger=logger,
+            scheduler=scheduler,
+        )
+        next_poll = clock.monotonic() + cfg.APP.LOOP_DELAY
+        while True:
+            wake_time = _wake_time(
+                next_check=next_poll,
+                scheduler=scheduler,
+                start_time=start_time,
+                max_run_time=max_run_time,
+            )
+            clock.sleep(_seconds_until(wake_time, clock))
+            now_time = clock.monotonic()
+            if now_time >= next_poll or (
+                max_run_time and now_time >= start_time + max_run_time
+            ):
+                break
+            _check_open_doors(
+                garage_doors=garage_doors,
+                send_notification=send_notification,
+                logger=logger,
+                scheduler=scheduler,
+                door_names=scheduler.pop_due(now_time),
+            )
+        cfg = load_config()  # cached, re-read only if the file changed or SIGHUP
+
+
+def _door_phase(door: GarageDoor) -> tuple[GarageStatus, bool]:
+    return door.old_state, door.midstate_start_monotonic is not None
+
+
+def _next_poll_interval(
+    previous: Optional[float], door: GarageDoor, changed: bool, loop_delay: float
+) -> float:
+    """
+    FAST while a door is moving or unknown, or has just changed, else BACKOFF
+    times the previous interval up to the door's OPEN or CLOSED interval. A
+    door without a POLL section (or one of its intervals) is read every
+    loop_delay (APP.LOOP_DELAY) seconds instead, as in "poll" mode.
+    """
+    poll_cfg: Box = door.door_cfg.POLL or Box()
+    if (
+        changed
+        or previous is None
+        or door.midstate_start_monotonic is not None
+        or door.old_state not in (GarageStatus.open, GarageStatus.closed)
+    ):
+        return poll_cfg.get("FAST") or loop_delay
+    limit: float = (
+        poll_cfg.get("OPEN")
+        if door.old_state == GarageStatus.open
+        else poll_cfg.get("CLOSED")
+    ) or loop_delay
+    return min(limit, previous * (poll_cfg.get("BACKOFF") or 1))
+
+
+def _adaptive_poll_loop(
+    garage_doors: Box,
+    send_notification: Callable[[str], None],
+    logger: LoggerProto,
+    history_logger: LoggerProto,
+    start_time: float,
+    max_run_time: Optional[int],
+    clock: ClockProto,
+) -> None:
+    """
+    Read each door at its own interval (DOORS.<name>.POLL): FAST while it is
+    moving or unknown and just after it changes, then BACKOFF times longer
+    each read it stays put, up to its OPEN or CLOSED interval. Alarm and
+    settle deadlines are checked as they fall due in between.
+    """
+    cfg: Box = load_config()
+    deadlines = DeadlineScheduler()
+    polls = DeadlineScheduler()
+    intervals: dict[str, float] = {}
+    due_doors: list[str] = list(garage_doors.keys())
+    while True:
+        _check_max_run_time(
+            logger=logger,
+            history_logger=history_logger,
+            start_time=start_time,
+            max_run_time=max_run_time,
+            clock=clock,
+        )
+        phases = {
+            garage_door: _door_phase(garage_doors[garage_door]["DoorObject"])
+            for garage_door in due_doors
+        }
+        _check_open_doors(
+            garage_doors=garage_doors,
+            send_notification=send_notification,
+            logger=logger,
+            scheduler=deadlines,
+            door_names=due_doors,
+        )
+        now_time = clock.monotonic()
+        for garage_door in due_doors:
+            door: GarageDoor = garage_doors[garage_door]["DoorObject"]
+            intervals[garage_door] = _next_poll_interval(
+                previous=intervals.get(garage_door),
+                door=door,
+                changed=_door_phase(door) != phases[garage_door],
+                loop_delay=cfg.APP.LOOP_DELAY,
+            )
+            polls.schedule(garage_door, now_time + intervals[garage_door])
+        wake_time = _wake_time(
+            next_check=polls.next_deadline(),
+            scheduler=deadlines,
+            start_time=start_time,
+            max_run_time=max_run_time,
+        )
+        clock.sleep(_seconds_until(wake_time, clock))
+        now_time = clock.monotonic()
+        # A door due both to poll and for a deadline is read once
+        due_doors = list(
+            dict.fromkeys(polls.pop_due(now_time) + deadlines.pop_due(now_time))
+        )
+        cfg = load_config()  # cached, re-read only if the file changed or SIGHUP
+
+
+def _event_loop(
+    garage_doors: Box,
+    send_notification: Callable[[str], None],
+    logger: LoggerProto,
+    history_logger: LoggerProto,
+    start_time: float,
+    max_run_time: Optional[int],
+    clock: ClockProto,
+) -> None:
+    """
+    Sensor edge callbacks put (door, timestamp) on a queue as they arrive and
+    the door is re-evaluated with that timestamp. Otherwise the loop sleeps
+    until the earliest door deadline (an alarm due, a door between sensors
+    settling) and checks only the doors due. Every door is still read at
+    FALLBACK_LOOP_DELAY, in case an edge is missed.
+    """
+    cfg: Box = load_config()
+    edges: queue.SimpleQueue[tuple[str, float]] = queue.SimpleQueue()
+
+    def queue_edge(door_name: str) -> None:
+        # Runs on the sensor's callback thread, so only timestamp and hand off
+        edges.put((door_name, clock.monotonic()))
+
+    for garage_door in garage_doors.keys():
+        for sensor in ("open_sensor", "closed_sensor"):
+            garage_doors[garage_door][sensor].when_activated = partial(
+                queue_edge, garage_door
+            )
+            garage_doors[garage_door][sensor].when_deactivated = partial(
+                queue_edge, garage_door
+            )
+
+    scheduler = DeadlineScheduler()
+    next_poll: float = clock.monotonic()
+    while True:
+        _check_max_run_time(
+            logger=logger,
+            history_logger=history_logger,
+            start_time=start_time,
+            max_run_time=max_run_time,
+            clock=clock,
+        )
+        now_time = clock.monotonic()
+        if now_time >= next_poll:
+            _check_open_doors(
+                garage_doors=garage_doors,
+                send_notification=send_notification,
+                logger=logger,
+                scheduler=scheduler,
+            )
+            next_poll = now_time + cfg.APP.FALLBACK_LOOP_DELAY
+        else:
+            due_doors = scheduler.pop_due(now_time)
+            if due_doors:
+                _check_open_doors(
+                    garage_doors=garage_doors,
+                    send_notification=send_notification,
                     logger=logger,
+                    scheduler=scheduler,
+                    door_names=due_doors,
                 )
+        wake_time = _wake_time(
+            next_check=next_poll,
+            scheduler=scheduler,
+            start_time=start_time,
+            max_run_time=max_run_time,
+        )
+        try:
+            edge_door, edge_time = clock.get(
+                edges, timeout=_seconds_until(wake_time, clock)
+            )
+        except queue.Empty:
+            cfg = load_config()
+            continue
 
-            # Other checks TBD?
+        # Drain the burst of edges, keeping the latest timestamp for each door
+        edge_times: dict[str, float] = {edge_door: edge_time}
+        while True:
+            try:
+                edge_door, edge_time = edges.get_nowait()
+            except queue.Empty:
+                break
+            edge_times[edge_door] = edge_time
+        for edge_door, edge_time in edge_times.items():
+            logger.debug(msg=f"DOOR:{edge_door}:sensor edge at {edge_time:.3f} s")
+            door: GarageDoor = garage_doors[edge_door]["DoorObject"]
+            door.update_state(at_time=_transition_time(door, edge_time))
+            scheduler.schedule(edge_door, door.next_deadline)
+        cfg = load_config()
 
-        sleep(cfg.APP.LOOP_DELAY)
-        cfg = load_config()  # reload so that loop delay can be changed for dev.
+
+async def async_garage_door_status_monitor(
+    DoorSensor: DoorSensorProto,
+    send_notification: Callable[[str], None],
+    logger: LoggerProto,
+    history_logger: LoggerProto,
+    max_run_time: Optional[int] = None,
+    clock: Optional[ClockProto] = None,
+) -> None:
+    """
+    asyncio version of garage_door_status_monitor with one task per door, each
+    on its own cadence (DOORS.<name>.LOOP_DELAY, default APP.LOOP_DELAY).
+    Sensor reads run in worker threads and notifications are sent in the
+    background, so a slow door or notification never holds up the others.
+    Returns after SIGINT/SIGTSTP or max_run_time. clock only stamps times
+    here, the waits are the event loop's.
+    """
+    msg: str = f"Starting Garage Door Monitor"
+    history_logger.info(msg=msg)
+    logger.debug(msg=msg)
+    config_cache.install_sighup_handler()
+    config_reloaded = partial(_config_reloaded, logger=logger)
+    config_cache.subscribe(config_reloaded)
+    register_exit_callback(partial(config_cache.unsubscribe, config_reloaded))
+    cfg: Box = load_config()
+    clock = clock or SystemClock()
+    garage_doors: Box = _create_garage_doors(
+        DoorSensor=DoorSensor, logger=logger, history_logger=history_logger, clock=clock
+    )
+    _start_metrics_server(logger=logger)
+    loop = asyncio.get_running_loop()
+    stop_event = asyncio.Event()
+    add_async_exit_handler(stop_event=stop_event)
+    # Own threads, so waiting notifications can't starve the sensor reads
+    notification_executor = ThreadPoolExecutor(
+        max_workers=2, thread_name_prefix="notification"
+    )
+    notifications: set[asyncio.Future] = set()
+
+    door_tasks: list[asyncio.Task] = []
+    for garage_door in garage_doors.keys():
+        edges: asyncio.Queue[float] = asyncio.Queue()
+        if cfg.APP.MONITOR_MODE == "event":
+
+            def queue_edge(edges: asyncio.Queue[float] = edges) -> None:
+                # Runs on the sensor's callback thread, hand off to the loop
+                loop.call_soon_threadsafe(edges.put_nowait, clock.monotonic())
+
+            for sensor in ("open_sensor", "closed_sensor"):
+                garage_doors[garage_door][sensor].when_activated = queue_edge
+                garage_doors[garage_door][sensor].when_deactivated = queue_edge
+        door_tasks.append(
+            asyncio.create_task(
+                _monitor_door(
+                    door=garage_doors[garage_door]["DoorObject"],
+                    edges=edges,
+                    send_notification=send_notification,
+                    logger=logger,
+                    notifications=notifications,
+                    notification_executor=notification_executor,
+                ),
+                name=garage_door,
+            )
+        )
+
+    try:
+        await asyncio.wait_for(stop_event.wait(), timeout=max_run_time)
+    except asyncio.TimeoutError:
+        msg = f"Max. run time of {max_run_time} exceeded. Closing Monitor"
+        logger.debug(msg=msg)
+        history_logger.info(msg=msg)
+    finally:
+        for door_task in door_tasks:
+            door_task.cancel()
+        results = await asyncio.gather(*door_tasks, return_exceptions=True)
+        for door_task, result in zip(door_tasks, results):
+            if isinstance(result, Exception):
+                logger.error(msg=f"DOOR:{door_task.get_name()}:stopped: {result!r}")
+        # Let notifications already on their way finish
+        await asyncio.gather(*notifications, return_exceptions=True)
+        notification_executor.shutdown()
+        log_exit(logger=logger, history_logger=history_logger)
+        run_exit_callbacks()
+
+
+async def _monitor_door(
+    door: GarageDoor,
+    edges: asyncio.Queue[float],
+    send_notification: Callable[[str], None],
+    logger: LoggerProto,
+    notifications: set[asyncio.Future],
+    notification_executor: ThreadPoolExecutor,
+) -> None:
+    """
+    Check door, then wait for a sensor edge or its next deadline, over and
+    over. A check that fails (e.g. a sensor read raising OSError) is logged
+    and retried a loop delay later, so one bad read can't stop the door
+    being watched.
+    """
+    while True:
+        try:
+            await _check_door(
+                door=door,
+                edges=edges,
+                send_notification=send_notification,
+                logger=logger,
+                notifications=notifications,
+                notification_executor=notification_executor,
+            )
+        except Exception:
+            logger.exception(msg=f"DOOR:{door.name}:check failed, retrying")
+            await asyncio.sleep(_door_loop_delay(door))
+
+
+def _door_loop_delay(door: GarageDoor) -> float:
+    cfg: Box = load_config()
+    return cfg.DOORS[door.name].LOOP_DELAY or cfg.APP.LOOP_DELAY
+
+
+async def _check_door(
+    door: GarageDoor,
+    edges: asyncio.Queue[float],
+    send_notification: Callable[[str], None],
+    logger: LoggerProto,
+    notifications: set[asyncio.Future],
+    notification_executor: ThreadPoolExecutor,
+) -> None:
+    """One pass of _monitor_door"""
+    start_time: float = perf_counter()
+    if await door.async_door_open_longer_than_time_limit():
+        notification = asyncio.get_running_loop().run_in_executor(
+            notification_executor,
+            partial(
+                send_notification,
+                msg=f"{door.name} open for {door.seconds_at_state // 60} minutes",
+                logger=logger,
+            ),
+        )
+        notifications.add(notification)
+        notification.add_done_callback(
+            partial(_notification_done, notifications=notifications, logger=logger)
+        )
+    metrics.LOOP_DURATION.labels(door.name).observe(perf_counter() - start_time)
+
+    delay: float = _door_loop_delay(door)
+    next_deadline = door.next_deadline  # an alarm due, or settling
+    if next_deadline is not None:
+        delay = min(delay, _seconds_until(next_deadline, door.clock))
+    try:
+        edge_time = await asyncio.wait_for(edges.get(), timeout=delay)
+    except asyncio.TimeoutError:
+        return
+    while not edges.empty():
+        edge_time = edges.get_nowait()  # keep the latest of a burst
+    logger.debug(msg=f"DOOR:{door.name}:sensor edge at {edge_time:.3f} s")
+    await door.async_update_state(at_time=_transition_time(door, edge_time))
+
+
+def _notification_done(
+    notification: asyncio.Future,
+    notifications: set[asyncio.Future],
+    logger: LoggerProto,
+) -> None:
+    notifications.discard(notification)
+    if not notification.cancelled() and notification.exception() is not None:
+        logger.error(msg=f"Notification failed: {notification.exception()!r}")
 
 
 if __name__ == "__main__":
+    import argparse
+
     from gpiozero import DigitalInputDevice as DoorSensor
 
     from src.config.config_logging import history_logger
     from src.config.config_logging import logger
+    from src.profiling import add_profile_argument, profile_mode, profiled
     from src.send_notification import send_notification
 
-    garage_door_status_monitor(
-        DoorSensor=DoorSensor,
-        send_notification=send_notification,
+    parser = argparse.ArgumentParser(description="Monitor the garage doors")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    cfg = load_config()
+    with profiled(
+        name="garage_door_status_monitor",
+        output_folder=cfg.PROFILE.FOLDER,
+        mode=profile_mode(args.profile),
+        sample_interval=cfg.PROFILE.SAMPLE_INTERVAL,
         logger=logger,
-        history_logger=history_logger,
-    )
+    ):
+        if cfg.APP.RUNTIME == "async":
+            asyncio.run(
+                async_garage_door_status_monitor(
+                    DoorSensor=DoorSensor,
+                    send_notification=send_notification,
+                    logger=logger,
+                    history_logger=history_logger,
+                )
+            )
+        else:
+            garage_door_status_monitor(
+                DoorSensor=DoorSensor,
+                send_notification=send_notification,
+                logger=logger,
+                history_logger=history_logger,
+            )
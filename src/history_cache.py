@@ -0,0 +1,484 @@
+""" Incremental loading and caching of the garage door status history files """
+
+from dataclasses import dataclass, field
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from typing import IO, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.config.config_logging import logger
+from src.history_parser import (
+    merge_door_histories,
+    open_history_file,
+    parse_history_ranges,
+)
+
+FINGERPRINT_BYTES: int = 1024  # head of the file that identifies it
+
+
+@dataclass
+class HistoryFileState:
+    offset: int = 0  # bytes already parsed, always just after a "\n"
+    fingerprint: str = ""  # sha1 of the first min(offset, FINGERPRINT_BYTES)
+    rows: int = 0  # parsed, in the file's RowColumns
+
+
+@dataclass
+class LoaderIndex:
+    files: dict[str, HistoryFileState] = field(default_factory=dict)
+    doors: list[str] = field(default_factory=list)  # names of the door codes
+    states: list[str] = field(default_factory=list)  # names of the state codes
+
+
+@dataclass
+class HistoryUpdate:
+    door_history: dict[str, pd.DataFrame]  # the rows parsed by the update
+    # Each file's offset before the update, None if a file was re-read from
+    # the start or dropped, so the rows weren't only appended
+    since: Optional[dict[str, int]]
+    offsets: dict[str, int]  # each file's offset after the update
+
+
+class RowColumns:
+    """
+    Rows of (timestamp, door, state) as three append-only raw column files in
+    folder: int64 epoch microseconds and int8 codes into the door and state
+    names its owner keeps. Read back memory mapped.
+    """
+
+    DTYPES: dict[str, type] = {"timestamp": np.int64, "door": np.int8, "state": np.int8}
+
+    def __init__(self, folder: str) -> None:
+        self.folder = folder
+
+    def read(self, rows: int) -> dict[str, np.ndarray]:
+        if not rows:  # an empty file can't be memory mapped
+            return {column: np.empty(0, dtype) for column, dtype in self.DTYPES.items()}
+        return {
+            column: np.memmap(self._path(column), dtype=dtype, mode="r", shape=(rows,))
+            for column, dtype in self.DTYPES.items()
+        }
+
+    def append(self, columns: dict[str, np.ndarray], rows: int) -> None:
+        """
+        Add columns after the first rows, dropping anything past them, e.g.
+        from an append cut short before its owner recorded it
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        for column, dtype in self.DTYPES.items():
+            with open(self._path(column), "ab") as fp:
+                fp.truncate(rows * np.dtype(dtype).itemsize)
+                fp.write(np.ascontiguousarray(columns[column], dtype=dtype).tobytes())
+
+    def clear(self) -> None:
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _path(self, column: str) -> str:
+        return os.path.join(self.folder, f"{column}.bin")
+
+
+def encode_history(
+    door_history: dict[str, pd.DataFrame], doors: list[str], states: list[str]
+) -> dict[str, np.ndarray]:
+    """
+    RowColumns columns of door_history, door by door. Door and state names
+    not in doors and states yet are added to them.
+    """
+    timestamps: list[np.ndarray] = [np.empty(0, dtype=np.int64)]
+    door_codes: list[np.ndarray] = [np.empty(0, dtype=np.int8)]
+    state_codes: list[np.ndarray] = [np.empty(0, dtype=np.int8)]
+    for door_name, door_frame in door_history.items():
+        if door_name not in doors:
+            doors.append(door_name)
+        positions = door_frame["position"].to_numpy(dtype=object)
+        states.extend(state for state in pd.unique(positions) if state not in states)
+        timestamps.append(
+            door_frame["datetime"].to_numpy(dtype="datetime64[us]").view(np.int64)
+        )
+        door_codes.append(np.full(len(door_frame), doors.index(door_name), np.int8))
+        state_codes.append(pd.Categorical(positions, categories=states).codes)
+    return {
+        "timestamp": np.concatenate(timestamps),
+        "door": np.concatenate(door_codes).astype(np.int8),
+        "state": np.concatenate(state_codes).astype(np.int8),
+    }
+
+
+def decode_history(
+    columns: dict[str, np.ndarray], doors: list[str], states: list[str]
+) -> dict[str, pd.DataFrame]:
+    """
+    Per-door frames of RowColumns columns, each in datetime order (stable,
+    so rows at the same time keep the order they were added in)
+    """
+    state_names = np.asarray(states, dtype=object)
+    door_status_history: dict[str, pd.DataFrame] = {}
+    for door_code, door_name in enumerate(doors):
+        door_rows = np.flatnonzero(columns["door"] == door_code)
+        if not len(door_rows):
+            continue
+        timestamps = columns["timestamp"][door_rows]
+        if np.any(np.diff(timestamps) < 0):  # appended out of order
+            order = np.argsort(timestamps, kind="stable")
+            door_rows, timestamps = door_rows[order], timestamps[order]
+        door_status_history[door_name] = pd.DataFrame(
+            {
+                "datetime": timestamps.view("datetime64[us]"),
+                "position": state_names[columns["state"][door_rows]],
+            }
+        )
+    return door_status_history
+
+
+class IncrementalHistoryLoader:
+    """
+    Parses only what was appended to each history file since the last run.
+    Each file's parsed rows are kept in RowColumns that new rows are appended
+    to, and where each file was parsed up to in a small LoaderIndex pickle at
+    cache_path, so an update costs what was appended, not the whole history.
+    A file that is shorter than its offset or whose head no longer matches
+    (rotated or truncated) is parsed again from the start; files that have
+    gone are dropped.
+    """
+
+    def __init__(self, cache_path: str, workers: int = 1) -> None:
+        self.cache_path = cache_path
+        self.rows_folder = f"{os.path.splitext(cache_path)[0]}_rows"
+        self.workers = workers  # processes parsing new bytes, 1 parses in process
+        self.bytes_parsed: int = 0  # by the last update, for monitoring
+
+    def load(self, history_filepaths: list[str]) -> dict[str, pd.DataFrame]:
+        """The merged per-door history of history_filepaths, updated first"""
+        self.update(history_filepaths)
+        return self.history(history_filepaths)
+
+    def history(self, history_filepaths: list[str]) -> dict[str, pd.DataFrame]:
+        """The merged per-door history of history_filepaths as last updated"""
+        index: LoaderIndex = self._read_cache()
+        return merge_door_histories(
+            [
+                decode_history(
+                    self._row_columns(history_filepath).read(file_state.rows),
+                    doors=index.doors,
+                    states=index.states,
+                )
+                for history_filepath in history_filepaths
+                if (file_state := index.files.get(history_filepath)) is not None
+            ]
+        )
+
+    def update(self, history_filepaths: list[str]) -> HistoryUpdate:
+        """Parse what has been added to history_filepaths since the last update"""
+        index: LoaderIndex = self._read_cache()
+        self.bytes_parsed = 0
+        since: Optional[dict[str, int]] = {
+            history_filepath: index.files[history_filepath].offset
+            for history_filepath in history_filepaths
+            if history_filepath in index.files
+        }
+        changed: bool = set(index.files) != set(history_filepaths)
+        for history_filepath in set(index.files) - set(history_filepaths):
+            self._row_columns(history_filepath).clear()
+            since = None
+
+        # Find what's new in every file, then parse it all at once
+        new_ranges: dict[str, tuple[HistoryFileState, int, str]] = {}
+        for history_filepath in history_filepaths:
+            old_file_state = index.files.get(history_filepath, HistoryFileState())
+            file_state, end, fingerprint = self._new_range(
+                history_filepath, old_file_state
+            )
+            if file_state is not old_file_state:
+                changed = True
+                if old_file_state.offset:  # re-read from the start
+                    self._row_columns(history_filepath).clear()
+                    since = None
+            index.files[history_filepath] = file_state
+            if end > file_state.offset:
+                new_ranges[history_filepath] = (file_state, end, fingerprint)
+        new_door_histories = parse_history_ranges(
+            [
+                (history_filepath, file_state.offset, end)
+                for history_filepath, (file_state, end, _) in new_ranges.items()
+            ],
+            workers=self.workers,
+        )
+
+        for (history_filepath, (file_state, end, fingerprint)), door_history in zip(
+            new_ranges.items(), new_door_histories
+        ):
+            self.bytes_parsed += end - file_state.offset
+            changed = True
+            columns = encode_history(
+                door_history, doors=index.doors, states=index.states
+            )
+            self._row_columns(history_filepath).append(columns, rows=file_state.rows)
+            index.files[history_filepath] = HistoryFileState(
+                offset=end,
+                fingerprint=fingerprint,
+                rows=file_state.rows + len(columns["timestamp"]),
+            )
+
+        index.files = {
+            history_filepath: index.files[history_filepath]
+            for history_filepath in history_filepaths
+        }
+        if changed:
+            self._write_cache(index)
+        return HistoryUpdate(
+            door_history=merge_door_histories(new_door_histories),
+            since=since,
+            offsets={
+                history_filepath: file_state.offset
+                for history_filepath, file_state in index.files.items()
+            },
+        )
+
+    def _row_columns(self, history_filepath: str) -> RowColumns:
+        file_key: str = hashlib.sha1(history_filepath.encode()).hexdigest()
+        return RowColumns(os.path.join(self.rows_folder, file_key))
+
+    def _new_range(
+        self, history_filepath: str, file_state: HistoryFileState
+    ) -> tuple[HistoryFileState, int, str]:
+        """
+        The state to parse on from (reset if the file was rotated or
+        truncated), where the complete lines end and the new fingerprint
+        """
+        with open_history_file(history_filepath) as fp:
+            head: bytes = fp.read(FINGERPRINT_BYTES)
+            if history_filepath.endswith(".gz"):
+                # An archive is complete once written and never changes, so
+                # only measure (decompress) it when it hasn't been parsed
+                if (
+                    file_state.offset
+                    and _fingerprint(head[: file_state.offset])
+                    == file_state.fingerprint
+                ):
+                    return file_state, file_state.offset, file_state.fingerprint
+                size: int = fp.seek(0, os.SEEK_END)
+                return HistoryFileState(), size, _fingerprint(head[:size])
+            size = os.fstat(fp.fileno()).st_size
+            if file_state.offset and (
+                size < file_state.offset
+                or _fingerprint(head[: file_state.offset]) != file_state.fingerprint
+            ):
+                logger.debug(f"{history_filepath} rotated or truncated, re-reading")
+                file_state = HistoryFileState()
+            # Leave a partly written last line for next time
+            end: int = _end_of_last_line(fp, start=file_state.offset, size=size)
+        return file_state, end, _fingerprint(head[:end])
+
+    def _read_cache(self) -> LoaderIndex:
+        try:
+            with open(self.cache_path, "rb") as fp:
+                index = pickle.load(fp)
+        except FileNotFoundError:
+            return LoaderIndex()
+        except (pickle.UnpicklingError, EOFError, AttributeError) as err:
+            logger.warning(
+                f"Ignoring unreadable history cache {self.cache_path}: {err}"
+            )
+            return LoaderIndex()
+        if not isinstance(index, LoaderIndex):
+            logger.debug(f"Re-reading the history, {self.cache_path} is an old cache")
+            return LoaderIndex()
+        return index
+
+    def _write_cache(self, index: LoaderIndex) -> None:
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        temp_path = f"{self.cache_path}.tmp"
+        with open(temp_path, "wb") as fp:
+            pickle.dump(index, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.cache_path)  # never leave a half written cache
+
+
+def _fingerprint(head: bytes) -> str:
+    return hashlib.sha1(head).hexdigest()
+
+
+def _end_of_last_line(fp: IO[bytes], start: int, size: int) -> int:
+    """Just after the last "\n" between start and size, or start if none"""
+    end: int = size
+    while end > start:
+        block_start: int = max(start, end - 2**16)
+        fp.seek(block_start)
+        newline: int = fp.read(end - block_start).rfind(b"\n")
+        if newline >= 0:
+            return block_start + newline + 1
+        end = block_start
+    return start
+
+
+class ColumnarHistoryCache:
+    """
+    The merged per-door history as RowColumns in cache_folder, memory mapped
+    on read, plus a manifest.json with the door and state names, the size and
+    mtime of the source files and how far each was parsed. It is only used
+    while the source files are unchanged; rows only appended to them are
+    appended to the columns.
+    """
+
+    def __init__(self, cache_folder: str) -> None:
+        self.cache_folder = cache_folder
+        self.manifest_path = os.path.join(cache_folder, "manifest.json")
+        self.row_columns = RowColumns(os.path.join(cache_folder, "rows"))
+
+    def read(self, sources: dict[str, list[int]]) -> Optional[dict[str, pd.DataFrame]]:
+        """The cached history, or None if the sources have changed since"""
+        manifest = self._read_manifest()
+        if manifest is None or manifest["sources"] != sources:
+            return None
+        return decode_history(
+            self.row_columns.read(manifest["rows"]),
+            doors=manifest["doors"],
+            states=manifest["states"],
+        )
+
+    def write(
+        self,
+        door_status_history: dict[str, pd.DataFrame],
+        sources: dict[str, list[int]],
+        offsets: Optional[dict[str, int]] = None,
+    ) -> None:
+        """Replace the cache with door_status_history"""
+        self._remove_manifest()
+        self.row_columns.clear()
+        self._append(door_status_history, sources, offsets or {}, manifest=None)
+
+    def append(
+        self,
+        history_update: HistoryUpdate,
+        sources: dict[str, list[int]],
+    ) -> bool:
+        """
+        Append the rows of history_update, if they follow on from what is
+        cached, i.e. every file was only appended to since. False otherwise,
+        and the cache is left as it was.
+        """
+        manifest = self._read_manifest()
+        if (
+            manifest is None
+            or history_update.since is None
+            or set(manifest["offsets"]) - set(history_update.offsets)
+            or any(
+                history_update.since.get(history_filepath, 0)
+                != manifest["offsets"].get(history_filepath, 0)
+                for history_filepath in history_update.offsets
+            )
+        ):
+            return False
+        self._remove_manifest()
+        self._append(
+            history_update.door_history, sources, history_update.offsets, manifest
+        )
+        return True
+
+    def export_arrow_ipc(self, arrow_path: str) -> None:
+        """
+        Write the cached history as an uncompressed Arrow IPC file, which other
+        tools can memory map (e.g. pyarrow.ipc.open_file(pyarrow.memory_map(...))).
+        Needs the optional pyarrow package.
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("Exporting the history to Arrow needs pyarrow installed")
+
+        manifest = self._read_manifest()
+        if manifest is None:
+            raise FileNotFoundError(f"No history cache in {self.cache_folder}")
+        columns = self.row_columns.read(manifest["rows"])
+        # Door by door, each in datetime order, as appends interleave them
+        order = np.lexsort((columns["timestamp"], columns["door"]))
+        table = pa.table(
+            {
+                "timestamp": pa.array(
+                    columns["timestamp"][order].view("datetime64[us]")
+                ),
+                "door": pa.DictionaryArray.from_arrays(
+                    columns["door"][order], manifest["doors"]
+                ),
+                "state": pa.DictionaryArray.from_arrays(
+                    columns["state"][order], manifest["states"]
+                ),
+            }
+        )
+        with pa.OSFile(arrow_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    def _append(
+        self,
+        door_status_history: dict[str, pd.DataFrame],
+        sources: dict[str, list[int]],
+        offsets: dict[str, int],
+        manifest: Optional[dict],
+    ) -> None:
+        doors: list[str] = manifest["doors"] if manifest else []
+        states: list[str] = manifest["states"] if manifest else []
+        rows: int = manifest["rows"] if manifest else 0
+        columns = encode_history(door_status_history, doors=doors, states=states)
+        self.row_columns.append(columns, rows=rows)
+        # The manifest goes last, so a half written cache is never used
+        manifest = {
+            "sources": sources,
+            "offsets": offsets,
+            "rows": rows + len(columns["timestamp"]),
+            "doors": doors,
+            "states": states,
+        }
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, "w") as fp:
+            json.dump(manifest, fp)
+        os.replace(temp_path, self.manifest_path)
+
+    def _remove_manifest(self) -> None:
+        if os.path.exists(self.manifest_path):
+            os.remove(self.manifest_path)
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            with open(self.manifest_path) as fp:
+                manifest = json.load(fp)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return manifest if "offsets" in manifest else None  # else an old cache
+
+
+def source_signatures(history_filepaths: list[str]) -> dict[str, list[int]]:
+    signatures: dict[str, list[int]] = {}
+    for history_filepath in history_filepaths:
+        file_stat = os.stat(history_filepath)
+        signatures[history_filepath] = [file_stat.st_size, file_stat.st_mtime_ns]
+    return signatures
+
+
+def load_cached_history(
+    history_filepaths: list[str], cache_folder: str, workers: int = 1
+) -> dict[str, pd.DataFrame]:
+    """
+    The merged per-door history of history_filepaths, from the columnar cache
+    while the files are unchanged, otherwise parsed incrementally and cached:
+    rows appended to the files are appended to the cache
+    """
+    sources = source_signatures(history_filepaths)
+    columnar_cache = ColumnarHistoryCache(os.path.join(cache_folder, "columnar"))
+    door_status_history = columnar_cache.read(sources)
+    if door_status_history is not None:
+        return door_status_history
+    loader = IncrementalHistoryLoader(
+        cache_path=os.path.join(cache_folder, "history_offsets.pkl"),
+        workers=workers,
+    )
+    history_update = loader.update(history_filepaths)
+    if not columnar_cache.append(history_update, sources):
+        columnar_cache.write(
+            loader.history(history_filepaths), sources, history_update.offsets
+        )
+    return columnar_cache.read(sources) or {}
@@ -0,0 +1,181 @@
+""" Append-only binary journal of door transitions, read back by memory mapping """
+
+import datetime as dt
+import json
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from src.garage_door import GarageStatus
+from src.history_store import from_epoch_us, to_epoch_us
+
+JOURNAL_MAGIC: bytes = b"GDJOURNL"
+JOURNAL_VERSION: int = 1
+HEADER_BYTES: int = 16  # magic, version, padding; records start 16 byte aligned
+RECORD_DTYPE: np.dtype = np.dtype(
+    [
+        ("timestamp", "<i8"),  # microseconds since the epoch, UTC
+        ("door", "<u2"),  # index into the door names sidecar
+        ("status", "u1"),  # GarageStatus value
+        ("pad", "u1"),
+        ("sequence", "<u4"),  # per journal, from 0
+    ]
+)  # 16 bytes
+ACTION_STATUS: dict[str, GarageStatus] = {
+    "opened": GarageStatus.open,
+    "closed": GarageStatus.closed,
+    "unknown": GarageStatus.unknown,
+}
+
+
+def door_names_path(journal_path: str) -> str:
+    return f"{journal_path}.doors.json"
+
+
+class HistoryJournal:
+    """
+    A GarageDoor event sink that appends each transition to journal_path as a
+    fixed width RECORD_DTYPE record. Door names are numbered in a JSON sidecar
+    next to it. Each record is written with one write() and flushed, so a
+    crash can at most leave a partial last record, which readers ignore.
+    """
+
+    def __init__(self, journal_path: str, time_zone: str) -> None:
+        self.journal_path = journal_path
+        self.TIME_ZONE = pytz.timezone(zone=time_zone)
+        self._lock = threading.Lock()
+        self._door_names: list[str] = _read_door_names(journal_path)
+
+        os.makedirs(os.path.dirname(journal_path) or ".", exist_ok=True)
+        self._fp = open(journal_path, "ab")
+        if self._fp.tell() == 0:
+            self._fp.write(_header())
+            self._fp.flush()
+        records = JournalReader(journal_path).records
+        self._next_sequence: int = (
+            int(records["sequence"][-1]) + 1 if len(records) else 0
+        )
+        # Continue after the last whole record
+        self._fp.truncate(HEADER_BYTES + len(records) * RECORD_DTYPE.itemsize)
+        self._fp.seek(0, os.SEEK_END)
+
+    def record(self, door: str, action: str, timestamp: dt.datetime) -> None:
+        record = np.zeros(1, dtype=RECORD_DTYPE)
+        record["timestamp"] = to_epoch_us(timestamp, self.TIME_ZONE)
+        record["status"] = ACTION_STATUS[action].value
+        with self._lock:
+            record["door"] = self._door_id(door)
+            record["sequence"] = self._next_sequence
+            self._fp.write(record.tobytes())
+            self._fp.flush()
+            self._next_sequence += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._fp.close()
+
+    def _door_id(self, door: str) -> int:
+        if door not in self._door_names:
+            self._door_names.append(door)
+            temp_path = f"{door_names_path(self.journal_path)}.tmp"
+            with open(temp_path, "w") as fp:
+                json.dump(self._door_names, fp)
+            os.replace(temp_path, door_names_path(self.journal_path))
+        return self._door_names.index(door)
+
+
+class JournalReader:
+    """
+    The records of a journal as a read-only structured array memory mapped
+    from the file, so nothing is read or copied until it is used.
+    """
+
+    def __init__(self, journal_path: str) -> None:
+        self.journal_path = journal_path
+        self.door_names: list[str] = _read_door_names(journal_path)
+        self.records: np.ndarray = self._map_records()
+
+    def _map_records(self) -> np.ndarray:
+        with open(self.journal_path, "rb") as fp:
+            header: bytes = fp.read(HEADER_BYTES)
+            n_records: int = (
+                os.fstat(fp.fileno()).st_size - HEADER_BYTES
+            ) // RECORD_DTYPE.itemsize
+        if header[: len(JOURNAL_MAGIC)] != JOURNAL_MAGIC:
+            raise ValueError(f"{self.journal_path} is not a door history journal")
+        if n_records <= 0:  # an empty memmap is an error
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(
+            self.journal_path,
+            dtype=RECORD_DTYPE,
+            mode="r",
+            offset=HEADER_BYTES,
+            shape=(n_records,),
+        )
+
+    def between(
+        self, start: Optional[dt.datetime], end: Optional[dt.datetime], time_zone: str
+    ) -> np.ndarray:
+        """
+        The records with start <= timestamp < end, in time order. Records are
+        written as transitions are recorded, which needn't be time order: a
+        transition is stamped with its sensor edge or sample time, and doors
+        are recorded concurrently.
+        """
+        tz = pytz.timezone(zone=time_zone)
+        timestamps = self.records["timestamp"]
+        in_range = np.ones(len(timestamps), dtype=bool)
+        if start:
+            in_range &= timestamps >= to_epoch_us(start, tz)
+        if end:
+            in_range &= timestamps < to_epoch_us(end, tz)
+        records = self.records[in_range]
+        if np.any(np.diff(records["timestamp"]) < 0):
+            records = records[np.argsort(records["timestamp"], kind="stable")]
+        return records
+
+    def door_status_history(
+        self,
+        time_zone: str,
+        start: Optional[dt.datetime] = None,
+        end: Optional[dt.datetime] = None,
+    ) -> dict[str, pd.DataFrame]:
+        """Each door's datetime/position history, like load_garage_door_history()"""
+        records = self.between(start=start, end=end, time_zone=time_zone)
+        tz = pytz.timezone(zone=time_zone)
+        status_names = np.empty(
+            max(status.value for status in GarageStatus) + 1, dtype=object
+        )
+        for status in GarageStatus:
+            status_names[status.value] = status.name
+
+        door_status_history: dict[str, pd.DataFrame] = {}
+        for door_id, door_name in enumerate(self.door_names):
+            door_records = records[records["door"] == door_id]
+            if not len(door_records):
+                continue
+            door_status_history[door_name] = pd.DataFrame(
+                {
+                    "datetime": from_epoch_us(door_records["timestamp"], tz),
+                    "position": status_names[door_records["status"]],
+                }
+            )
+        return door_status_history
+
+
+def _header() -> bytes:
+    return (JOURNAL_MAGIC + JOURNAL_VERSION.to_bytes(2, "little")).ljust(
+        HEADER_BYTES, b"\0"
+    )
+
+
+def _read_door_names(journal_path: str) -> list[str]:
+    try:
+        with open(door_names_path(journal_path)) as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return []
@@ -0,0 +1,249 @@
+""" Bulk parsing of the garage door status history log, one DataFrame per door """
+
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import gzip
+import io
+import os
+import time
+from typing import IO, Any
+
+import pandas as pd
+
+from src.config.config_logging import log_cfg, logger
+
+DOORS: list[str] = ["ONE_CAR", "TWO_CAR"]
+EXCLUDED_ACTIONS: list[str] = ["created"]
+HISTORY_TIMESTAMP_FORMAT: str = "%Y-%m-%d %H:%M:%S,%f"
+HISTORY_FIELDS: list[int] = [0, 1, 2, 5, 6]  # timestamp (3 fields), door, action
+HISTORY_RANGE_BYTES: int = 16 * 2**20  # most bytes of a file parsed by one worker
+POSITION_VALUE: dict[str, float] = {
+    "closed": 0,
+    "unknown": 0.5,
+    "Unknown": 0.5,
+    "un_open": 0.5,
+    "un_closed": 0.5,
+    "open": 1,
+    "opened": 1,
+}
+
+
+def history_filepaths() -> list[str]:
+    """History files in the history folder, in directory order"""
+    config_filename_base: str = log_cfg.handler.history.filename.split(".")[0]
+    return [
+        os.path.join(log_cfg.handler.history.folder, fn)
+        for fn in os.listdir(log_cfg.handler.history.folder)
+        if (fn.startswith(config_filename_base) and "example" not in fn)
+    ]
+
+
+def read_history_fields(
+    filepath_or_buffer: str | IO, **read_csv_kwargs: Any
+) -> pd.DataFrame:
+    """
+    Split history lines like "2023-08-09 15:03:03,116:INFO:DOOR:ONE_CAR:closed"
+    on ":" in one pass of the C csv parser. Columns 0-2 are the timestamp, 5
+    the door and 6 the action; missing fields are "".
+    """
+    try:
+        return pd.read_csv(
+            filepath_or_buffer,
+            sep=":",
+            header=None,
+            names=list(range(7)),
+            usecols=HISTORY_FIELDS,  # also tolerates lines with more fields
+            index_col=False,  # even when the first line has more fields
+            dtype=str,
+            na_filter=False,
+            quoting=csv.QUOTE_NONE,
+            engine="c",
+            **read_csv_kwargs,
+        )
+    except pd.errors.ParserError as err:
+        if "Too many columns specified" not in str(err):
+            raise
+        # No line has 7 fields, so there are no door lines
+        return pd.DataFrame({field: pd.Series(dtype=str) for field in HISTORY_FIELDS})
+
+
+def parse_history_fields(fields: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """
+    Turn the fields of history lines into a datetime/position DataFrame per
+    door, with vectorized string and datetime operations. Lines for other
+    doors, excluded actions and lines with an invalid timestamp are skipped.
+    """
+    fields = fields[
+        (fields[6] != "") & fields[5].isin(DOORS) & ~fields[6].isin(EXCLUDED_ACTIONS)
+    ]
+    # "%S,%f" goes through a slow path in pandas, "%S.%f" is ISO 8601 and fast
+    timestamps: pd.Series = pd.to_datetime(
+        fields[0].str.cat([fields[1], fields[2].str.replace(",", ".")], sep=":"),
+        format=HISTORY_TIMESTAMP_FORMAT.replace(",", "."),
+        errors="coerce",
+    ).where(fields[2].str.contains(","))
+    if timestamps.isna().any():
+        logger.debug(f"Invalid Timestamps: {timestamps.isna().sum()} lines skipped")
+
+    door_status_history: dict[str, pd.DataFrame] = {}  # a dict for each door
+    for door_name, door_fields in fields.groupby(5, sort=False):
+        door_timestamps = timestamps[door_fields.index]
+        valid = door_timestamps.notna()
+        door_status_history[door_name] = pd.DataFrame(
+            {
+                "datetime": door_timestamps[valid].to_numpy(),
+                "position": door_fields.loc[valid, 6].to_numpy(),
+            }
+        )
+
+    return door_status_history
+
+
+def parse_history_file(history_filepath: str) -> dict[str, pd.DataFrame]:
+    return parse_history_fields(read_history_fields(history_filepath))
+
+
+def open_history_file(history_filepath: str) -> IO[bytes]:
+    """A history file or a gzipped archive of one, for reading bytes"""
+    if history_filepath.endswith(".gz"):
+        return gzip.open(history_filepath, "rb")
+    return open(history_filepath, "rb")
+
+
+def parse_history_range(
+    history_filepath: str, start: int, end: int
+) -> dict[str, pd.DataFrame]:
+    """Parse the lines in bytes start to end of a file, both at line starts"""
+    with open_history_file(history_filepath) as fp:
+        fp.seek(start)
+        return parse_history_fields(
+            read_history_fields(io.BytesIO(fp.read(end - start)))
+        )
+
+
+def split_history_range(
+    history_filepath: str, start: int, end: int, range_bytes: int
+) -> list[tuple[int, int]]:
+    """
+    start to end as ranges of about range_bytes, split at line starts. Gzipped
+    archives are left whole, as seeking in them means decompressing again.
+    """
+    if history_filepath.endswith(".gz"):
+        return [(start, end)]
+    ranges: list[tuple[int, int]] = []
+    with open(history_filepath, "rb") as fp:
+        while end - start > range_bytes:
+            fp.seek(start + range_bytes)
+            split: int = start + range_bytes + len(fp.readline())
+            if split >= end:
+                break
+            ranges.append((start, split))
+            start = split
+    ranges.append((start, end))
+    return ranges
+
+
+def parse_history_ranges(
+    history_ranges: list[tuple[str, int, int]],
+    workers: int,
+    range_bytes: int = HISTORY_RANGE_BYTES,
+) -> list[dict[str, pd.DataFrame]]:
+    """
+    Parse (filepath, start, end) ranges of history files, in a pool of
+    workers processes when there is more than one range to share out, with
+    ranges larger than range_bytes split up. One result per range, in order.
+    """
+    parts: list[tuple[int, str, int, int]] = [
+        (index, history_filepath, part_start, part_end)
+        for index, (history_filepath, start, end) in enumerate(history_ranges)
+        for part_start, part_end in split_history_range(
+            history_filepath, start, end, range_bytes=range_bytes
+        )
+    ]
+    start_time = time.perf_counter()
+    if workers > 1 and len(parts) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(parts))) as executor:
+            part_histories = list(
+                executor.map(
+                    parse_history_range,
+                    *zip(
+                        *[
+                            (history_filepath, start, end)
+                            for _, history_filepath, start, end in parts
+                        ]
+                    ),
+                )
+            )
+    else:
+        part_histories = [
+            parse_history_range(history_filepath, start, end)
+            for _, history_filepath, start, end in parts
+        ]
+    logger.debug(
+        f"Parsed {sum(end - start for _, _, start, end in parts)} bytes of "
+        f"{len(history_ranges)} ranges in {len(parts)} parts with "
+        f"{workers} workers in {time.perf_counter() - start_time:.2f} s"
+    )
+
+    # Parts of a range are in file order, which is time order
+    range_parts: list[list[dict[str, pd.DataFrame]]] = [[] for _ in history_ranges]
+    for (index, _, _, _), part_history in zip(parts, part_histories):
+        range_parts[index].append(part_history)
+    return [merge_door_histories(door_histories) for door_histories in range_parts]
+
+
+def merge_door_histories(
+    door_histories: list[dict[str, pd.DataFrame]]
+) -> dict[str, pd.DataFrame]:
+    """
+    Concatenate per door, once, in datetime order. The parts come in file
+    order, which is only time order within a file, and events at the same
+    time keep the order of the parts.
+    """
+    door_frames: dict[str, list[pd.DataFrame]] = {}
+    for door_history in door_histories:
+        for door_name, door_frame in door_history.items():
+            door_frames.setdefault(door_name, []).append(door_frame)
+    return {
+        door_name: _in_datetime_order(pd.concat(frames, ignore_index=True))
+        for door_name, frames in door_frames.items()
+    }
+
+
+def _in_datetime_order(door_frame: pd.DataFrame) -> pd.DataFrame:
+    """Sorted (stable) by datetime, unless it already is, e.g. one file's"""
+    if door_frame["datetime"].is_monotonic_increasing:
+        return door_frame
+    return door_frame.sort_values(by="datetime", kind="stable", ignore_index=True)
+
+
+def _history_file_size(history_filepath: str) -> int:
+    """Bytes of history in a file, decompressed for a gzipped archive"""
+    with open_history_file(history_filepath) as fp:
+        return fp.seek(0, os.SEEK_END)
+
+
+def report_parse_speedup(history_filepaths: list[str], workers: int) -> None:
+    """Print parse time in process and with workers as the file count grows"""
+    file_counts = sorted({min(2**n, len(history_filepaths)) for n in range(8)})
+    print(f"files  1 worker (s)  {workers} workers (s)  speedup")
+    for file_count in file_counts:
+        history_ranges = [
+            (history_filepath, 0, _history_file_size(history_filepath))
+            for history_filepath in history_filepaths[:file_count]
+        ]
+        times: list[float] = []
+        for n_workers in (1, workers):
+            start_time = time.perf_counter()
+            parse_history_ranges(history_ranges, workers=n_workers)
+            times.append(time.perf_counter() - start_time)
+        print(
+            f"{file_count:5d}  {times[0]:12.2f}  {times[1]:{len(str(workers)) + 12}.2f}"
+            f"  {times[0] / times[1]:7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    report_parse_speedup(
+        history_filepaths=history_filepaths(), workers=os.cpu_count() or 1
+    )
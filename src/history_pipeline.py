@@ -0,0 +1,296 @@
+""" Streaming, bounded memory processing of the garage door status history """
+
+import datetime as dt
+import io
+import os
+import tempfile
+from typing import Iterable, Iterator, Optional
+
+from box import Box
+import numpy as np
+import pandas as pd
+
+from src.config.config_main import load_config
+from src.history_parser import (
+    POSITION_VALUE,
+    history_filepaths,
+    open_history_file,
+    parse_history_fields,
+    read_history_fields,
+)
+
+BLOCK_BYTES: int = 4 * 2**20  # of history lines read and parsed at a time
+CHUNK_ROWS: int = 100_000  # most rows per chunk handed between stages
+
+# A door's chunk between stages: epoch microsecond timestamps and position codes
+DoorChunk = tuple[str, np.ndarray, np.ndarray]
+
+
+def read_line_blocks(
+    history_filepath: str, block_bytes: int = BLOCK_BYTES
+) -> Iterator[bytes]:
+    """Whole lines of a history file or archive, about block_bytes at a time"""
+    partial_line: bytes = b""
+    with open_history_file(history_filepath) as fp:
+        while block := fp.read(block_bytes):
+            block = partial_line + block
+            end: int = block.rfind(b"\n") + 1
+            partial_line = block[end:]
+            if end:
+                yield block[:end]
+    if partial_line:
+        yield partial_line + b"\n"
+
+
+def parse_line_blocks(
+    line_blocks: Iterable[bytes], positions: list[str]
+) -> Iterator[DoorChunk]:
+    """
+    Parse blocks of history lines into per-door chunks, dropping other doors,
+    EXCLUDED_ACTIONS and invalid lines. Positions are coded by their index in
+    positions, which is extended as new ones turn up.
+    """
+    for line_block in line_blocks:
+        door_histories = parse_history_fields(
+            read_history_fields(io.BytesIO(line_block))
+        )
+        for door_name, door_history in door_histories.items():
+            position_codes = pd.Categorical(door_history["position"])
+            for position in position_codes.categories:
+                if position not in positions:
+                    positions.append(position)
+            code_map = np.array(
+                [positions.index(position) for position in position_codes.categories],
+                dtype=np.int16,
+            )
+            yield (
+                door_name,
+                door_history["datetime"]
+                .to_numpy(dtype="datetime64[us]")
+                .view(np.int64),
+                code_map[position_codes.codes]
+                if len(code_map)
+                else np.empty(0, np.int16),
+            )
+
+
+class SortedRuns:
+    """
+    Per-door runs of rows in time order, spilled to files in folder. Chunks
+    that continue a door's last run in time order are appended to it, so
+    history that was logged in order makes one run per door; anything else
+    (e.g. the clock set back at boot) starts a new, sorted run.
+    """
+
+    def __init__(self, folder: str) -> None:
+        self.folder = folder
+        self.runs: dict[str, list[str]] = {}  # door: run file paths, less suffix
+        self._last_timestamp: dict[str, int] = {}
+
+    def add(self, door_name: str, timestamps: np.ndarray, codes: np.ndarray) -> None:
+        if not len(timestamps):
+            return
+        order = np.argsort(timestamps, kind="stable")
+        timestamps, codes = timestamps[order], codes[order]
+        door_runs = self.runs.setdefault(door_name, [])
+        if not door_runs or timestamps[0] < self._last_timestamp[door_name]:
+            door_runs.append(os.path.join(self.folder, f"{door_name}_{len(door_runs)}"))
+        run_path = door_runs[-1]
+        with open(f"{run_path}.timestamp", "ab") as fp:
+            timestamps.astype(np.int64).tofile(fp)
+        with open(f"{run_path}.code", "ab") as fp:
+            codes.astype(np.int16).tofile(fp)
+        self._last_timestamp[door_name] = int(timestamps[-1])
+
+    def merged(self, door_name: str, chunk_rows: int) -> Iterator[DoorChunk]:
+        """
+        The door's rows in time order, rows with equal timestamps in the
+        order they were added, at most about chunk_rows at a time
+        """
+        runs = [
+            (
+                np.memmap(f"{run_path}.timestamp", dtype=np.int64, mode="r"),
+                np.memmap(f"{run_path}.code", dtype=np.int16, mode="r"),
+            )
+            for run_path in self.runs.get(door_name, [])
+        ]
+        block_rows: int = max(1, chunk_rows // max(1, len(runs)))
+        cursors: list[int] = [0] * len(runs)
+        while any(cursor < len(run[0]) for cursor, run in zip(cursors, runs)):
+            block_ends = [
+                min(cursor + block_rows, len(timestamps))
+                for cursor, (timestamps, _) in zip(cursors, runs)
+            ]
+            # Rows before the end of the shortest unfinished block are final
+            bound = min(
+                (
+                    timestamps[block_end - 1]
+                    for block_end, (timestamps, _) in zip(block_ends, runs)
+                    if block_end < len(timestamps)
+                ),
+                default=np.iinfo(np.int64).max,
+            )
+            side = "left" if bound < np.iinfo(np.int64).max else "right"
+            takes = [
+                cursor
+                + int(np.searchsorted(timestamps[cursor:block_end], bound, side=side))
+                for cursor, block_end, (timestamps, _) in zip(cursors, block_ends, runs)
+            ]
+            if takes == cursors:  # a whole block at bound, take every row at bound
+                takes = [
+                    cursor + int(np.searchsorted(timestamps[cursor:], bound, "right"))
+                    for cursor, (timestamps, _) in zip(cursors, runs)
+                ]
+            timestamps = np.concatenate(
+                [run[0][cursor:take] for cursor, take, run in zip(cursors, takes, runs)]
+            )
+            codes = np.concatenate(
+                [run[1][cursor:take] for cursor, take, run in zip(cursors, takes, runs)]
+            )
+            order = np.argsort(timestamps, kind="stable")  # ties stay in run order
+            cursors = takes
+            yield door_name, timestamps[order], codes[order]
+
+
+def dedupe(chunks: Iterable[DoorChunk]) -> Iterator[DoorChunk]:
+    """Keep the first row for each timestamp of a door's time ordered chunks"""
+    last_timestamp: Optional[int] = None
+    for door_name, timestamps, codes in chunks:
+        keep = np.ones(len(timestamps), dtype=bool)
+        keep[1:] = timestamps[1:] != timestamps[:-1]
+        if len(timestamps) and last_timestamp is not None:
+            keep[0] = timestamps[0] != last_timestamp
+        if len(timestamps):
+            last_timestamp = int(timestamps[-1])
+        yield door_name, timestamps[keep], codes[keep]
+
+
+def insert_transitions(
+    chunks: Iterable[DoorChunk], max_transition_time: dt.timedelta
+) -> Iterator[DoorChunk]:
+    """
+    Where the position changed after more than max_transition_time, add a row
+    holding the old position until max_transition_time before the change
+    """
+    max_transition_us: int = max_transition_time // dt.timedelta(microseconds=1)
+    last_row: Optional[tuple[int, int]] = None
+    for door_name, timestamps, codes in chunks:
+        if not len(timestamps):
+            continue
+        if last_row is None:
+            previous_timestamps = np.concatenate([[timestamps[0]], timestamps[:-1]])
+            previous_codes = np.concatenate([[codes[0]], codes[:-1]])
+        else:
+            previous_timestamps = np.concatenate([[last_row[0]], timestamps[:-1]])
+            previous_codes = np.concatenate([[last_row[1]], codes[:-1]])
+        hold_rows = (timestamps - previous_timestamps > max_transition_us) & (
+            codes != previous_codes
+        )
+        # Each added row goes just before the row it was made for
+        original_at = np.arange(len(timestamps)) + np.cumsum(hold_rows)
+        added_at = original_at[hold_rows] - 1
+        new_timestamps = np.empty(len(timestamps) + len(added_at), dtype=np.int64)
+        new_codes = np.empty(len(new_timestamps), dtype=codes.dtype)
+        new_timestamps[original_at], new_codes[original_at] = timestamps, codes
+        new_timestamps[added_at] = timestamps[hold_rows] - max_transition_us
+        new_codes[added_at] = previous_codes[hold_rows]
+        last_row = (int(timestamps[-1]), int(codes[-1]))
+        yield door_name, new_timestamps, new_codes
+
+
+def to_frames(
+    chunks: Iterable[DoorChunk], positions: list[str], chunk_rows: int = CHUNK_ROWS
+) -> Iterator[tuple[str, pd.DataFrame]]:
+    """Door chunks of at most chunk_rows rows as datetime/position/position_value"""
+    for door_name, timestamps, codes in chunks:
+        position_names = np.array(positions, dtype=object)
+        for start in range(0, len(timestamps), chunk_rows):
+            chunk_positions = position_names[codes[start : start + chunk_rows]]
+            yield door_name, pd.DataFrame(
+                {
+                    "datetime": timestamps[start : start + chunk_rows].view(
+                        "datetime64[us]"
+                    ),
+                    "position": chunk_positions,
+                    "position_value": pd.Series(chunk_positions).map(POSITION_VALUE),
+                }
+            )
+
+
+def stream_garage_door_history(
+    history_filepaths: list[str],
+    max_transition_time: dt.timedelta,
+    chunk_rows: int = CHUNK_ROWS,
+    block_bytes: int = BLOCK_BYTES,
+) -> Iterator[tuple[str, pd.DataFrame]]:
+    """
+    The same rows as clean_garage_door_history(load_garage_door_history()),
+    door by door in chunks of at most chunk_rows rows. Both sort stably, so
+    of the rows logged at the same time the first logged is kept. Parsed rows
+    are spilled to a temporary folder, so memory use depends on chunk_rows
+    and block_bytes rather than on the size of the history.
+    """
+    positions: list[str] = []
+    with tempfile.TemporaryDirectory(prefix="garage_door_history_") as folder:
+        sorted_runs = SortedRuns(folder=folder)
+        for history_filepath in history_filepaths:
+            for door_name, timestamps, codes in parse_line_blocks(
+                read_line_blocks(history_filepath, block_bytes=block_bytes),
+                positions=positions,
+            ):
+                sorted_runs.add(door_name, timestamps, codes)
+
+        for door_name in sorted_runs.runs:
+            yield from to_frames(
+                insert_transitions(
+                    dedupe(sorted_runs.merged(door_name, chunk_rows=chunk_rows)),
+                    max_transition_time=max_transition_time,
+                ),
+                positions=positions,
+                chunk_rows=chunk_rows,
+            )
+
+
+def collect_garage_door_history(
+    chunks: Iterable[tuple[str, pd.DataFrame]]
+) -> dict[str, pd.DataFrame]:
+    """Put streamed chunks back together, one DataFrame per door"""
+    door_frames: dict[str, list[pd.DataFrame]] = {}
+    for door_name, chunk in chunks:
+        door_frames.setdefault(door_name, []).append(chunk)
+    return {
+        door_name: pd.concat(frames, ignore_index=True)
+        for door_name, frames in door_frames.items()
+    }
+
+
+def summarize_garage_door_history(
+    chunks: Iterable[tuple[str, pd.DataFrame]]
+) -> dict[str, dict]:
+    """Rows, first and last datetime and rows per position of each door"""
+    summary: dict[str, dict] = {}
+    for door_name, chunk in chunks:
+        if not len(chunk):
+            continue
+        door_summary = summary.setdefault(
+            door_name,
+            {"rows": 0, "first": chunk["datetime"].iloc[0], "positions": {}},
+        )
+        door_summary["rows"] += len(chunk)
+        door_summary["last"] = chunk["datetime"].iloc[-1]
+        for position, count in chunk["position"].value_counts().items():
+            door_summary["positions"][position] = (
+                door_summary["positions"].get(position, 0) + count
+            )
+    return summary
+
+
+if __name__ == "__main__":
+    cfg: Box = load_config()
+    for door_name, door_summary in summarize_garage_door_history(
+        stream_garage_door_history(
+            history_filepaths=history_filepaths(),
+            max_transition_time=dt.timedelta(seconds=cfg.GRAPHING.MAX_TRANSITION_TIME),
+        )
+    ).items():
+        print(f"{door_name}: {door_summary}")
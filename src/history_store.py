@@ -0,0 +1,204 @@
+""" SQLite store of garage door transitions with indexed time-range queries """
+
+import datetime as dt
+from functools import partial
+import sqlite3
+import threading
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from src.clock import ClockProto, SystemClock
+
+EPOCH: dt.datetime = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+ONE_MICROSECOND: dt.timedelta = dt.timedelta(microseconds=1)
+
+
+class SQLiteHistoryStore:
+    """
+    Door transitions in an SQLite database, as (door, epoch microseconds UTC,
+    state) rows indexed on (door, timestamp). The state is the action written
+    to the history log ("opened", "closed", "unknown"). record() buffers transitions and
+    writes them in one transaction when batch_size are waiting or
+    flush_interval seconds (on clock) after the first of them, whichever is
+    first.
+
+    Naive datetimes passed in are taken as time_zone, and returned datetimes
+    are naive in time_zone, like the timestamps of the history log.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        time_zone: str,
+        batch_size: int = 50,
+        flush_interval: float = 5.0,
+        clock: ClockProto = SystemClock(),
+    ) -> None:
+        self.db_path = db_path
+        self.TIME_ZONE = pytz.timezone(zone=time_zone)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._pending: list[tuple[str, int, str]] = []
+        self._batch: int = 0  # flushes so far, so a timer only flushes its batch
+        # Transitions can be recorded from worker threads (async runtime)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                " id INTEGER PRIMARY KEY,"
+                " door TEXT NOT NULL,"
+                " timestamp INTEGER NOT NULL,"
+                " state TEXT NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS events_door_timestamp"
+                " ON events (door, timestamp)"
+            )
+
+    def record(self, door: str, action: str, timestamp: dt.datetime) -> None:
+        """A GarageDoor event sink: buffer one transition"""
+        with self._lock:
+            self._pending.append((door, self._to_epoch_us(timestamp), action))
+            if len(self._pending) < self.batch_size:
+                if len(self._pending) == 1:
+                    self.clock.call_later(
+                        self.flush_interval, partial(self._flush_batch, self._batch)
+                    )
+                return
+        self.flush()
+
+    def record_many(self, door: str, door_history: pd.DataFrame) -> None:
+        """Bulk load a datetime/position history, e.g. parsed from the log"""
+        epoch_us = (
+            door_history["datetime"]
+            .dt.tz_localize(
+                self.TIME_ZONE,
+                ambiguous=np.zeros(len(door_history), dtype=bool),
+                nonexistent="shift_forward",
+            )
+            .dt.tz_convert("UTC")
+            .dt.tz_localize(None)
+            .astype("datetime64[us]")
+            .astype(np.int64)
+        )
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO events (door, timestamp, state) VALUES (?, ?, ?)",
+                zip(
+                    [door] * len(door_history),
+                    epoch_us.tolist(),
+                    door_history["position"].tolist(),
+                ),
+            )
+
+    def flush(self) -> None:
+        with self._lock:
+            self._batch += 1
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+            with self._connection:  # one transaction per batch
+                self._connection.executemany(
+                    "INSERT INTO events (door, timestamp, state) VALUES (?, ?, ?)",
+                    pending,
+                )
+
+    def _flush_batch(self, batch: int) -> None:
+        """The flush_interval timer of batch, already flushed if it's not the latest"""
+        if batch == self._batch:
+            self.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._connection.close()
+
+    def events_between(
+        self,
+        door: str,
+        start: Optional[dt.datetime] = None,
+        end: Optional[dt.datetime] = None,
+    ) -> pd.DataFrame:
+        """A door's transitions with start <= datetime < end as datetime/position"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT timestamp, state FROM events"
+                " WHERE door = ? AND timestamp >= ? AND timestamp < ?"
+                " ORDER BY timestamp, id",
+                (door, *self._time_range(start, end)),
+            ).fetchall()
+        timestamps, positions = zip(*rows) if rows else ((), ())
+        return pd.DataFrame(
+            {
+                "datetime": self._from_epoch_us(list(timestamps)),
+                "position": pd.Series(positions, dtype=object),
+            }
+        )
+
+    def latest_state(self, door: str) -> Optional[tuple[dt.datetime, str]]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT timestamp, state FROM events WHERE door = ?"
+                " ORDER BY timestamp DESC, id DESC LIMIT 1",
+                (door,),
+            ).fetchone()
+        if row is None:
+            return None
+        return self._from_epoch_us([row[0]])[0].to_pydatetime(), row[1]
+
+    def count_by_state(
+        self,
+        door: str,
+        start: Optional[dt.datetime] = None,
+        end: Optional[dt.datetime] = None,
+    ) -> dict[str, int]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT state, COUNT(*) FROM events"
+                " WHERE door = ? AND timestamp >= ? AND timestamp < ?"
+                " GROUP BY state",
+                (door, *self._time_range(start, end)),
+            ).fetchall()
+        return dict(rows)
+
+    def doors(self) -> list[str]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT DISTINCT door FROM events ORDER BY door"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def _time_range(
+        self, start: Optional[dt.datetime], end: Optional[dt.datetime]
+    ) -> tuple[int, int]:
+        return (
+            self._to_epoch_us(start) if start else -(2**63),
+            self._to_epoch_us(end) if end else 2**63 - 1,
+        )
+
+    def _to_epoch_us(self, timestamp: dt.datetime) -> int:
+        return to_epoch_us(timestamp, self.TIME_ZONE)
+
+    def _from_epoch_us(self, timestamps: list[int]) -> pd.DatetimeIndex:
+        return from_epoch_us(timestamps, self.TIME_ZONE)
+
+
+def to_epoch_us(timestamp: dt.datetime, time_zone: pytz.BaseTzInfo) -> int:
+    """Microseconds since the epoch (UTC), a naive timestamp taken as time_zone"""
+    if timestamp.tzinfo is None:
+        timestamp = time_zone.localize(timestamp)
+    return (timestamp - EPOCH) // ONE_MICROSECOND
+
+
+def from_epoch_us(timestamps: Any, time_zone: pytz.BaseTzInfo) -> pd.DatetimeIndex:
+    """Naive datetimes in time_zone, like those of the history log"""
+    return (
+        pd.to_datetime(timestamps, unit="us", utc=True)
+        .tz_convert(time_zone)
+        .tz_localize(None)
+        .as_unit("us")
+    )
@@ -0,0 +1,266 @@
+""" In-process metrics, served as Prometheus text from a local HTTP endpoint """
+
+import bisect
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import math
+import threading
+from typing import Callable, Optional
+
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+    30.0,
+)  # seconds
+CONTENT_TYPE: str = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Metric:
+    """
+    A metric and its children, one for each combination of label values.
+    An unlabelled metric is its own only child.
+    """
+
+    TYPE: str = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._children: dict[tuple[str, ...], "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *label_values: str) -> "_Metric":
+        """The child for label_values, in the order of the metric's labels"""
+        child = self._children.get(label_values)
+        if child is None:
+            if len(label_values) != len(self.label_names):
+                raise ValueError(f"{self.name} has labels {self.label_names}")
+            with self._lock:
+                child = self._children.setdefault(label_values, self._new_child())
+        return child
+
+    def _new_child(self) -> "_Metric":
+        return type(self)(name=self.name, help=self.help)
+
+    def _samples(self) -> list[tuple[str, str, float]]:
+        """(name suffix, extra labels, value) of an unlabelled metric"""
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.TYPE}"]
+        children = self._children.items() if self.label_names else [((), self)]
+        for label_values, child in sorted(children):
+            labels = [
+                f'{label_name}="{_escape(label_value)}"'
+                for label_name, label_value in zip(self.label_names, label_values)
+            ]
+            for suffix, extra_label, value in child._samples():
+                all_labels = ",".join(labels + ([extra_label] if extra_label else []))
+                label_text = f"{{{all_labels}}}" if all_labels else ""
+                lines.append(f"{self.name}{suffix}{label_text} {_format(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name=name, help=help, labels=labels)
+        self.value: float = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def _samples(self) -> list[tuple[str, str, float]]:
+        return [("", "", self.value)]
+
+
+class Gauge(_Metric):
+    TYPE = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name=name, help=help, labels=labels)
+        self.value: float = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def set_function(self, function: Optional[Callable[[], float]]) -> None:
+        """Read the value from function whenever the metrics are rendered"""
+        self._function = function
+
+    def _samples(self) -> list[tuple[str, str, float]]:
+        return [("", "", self._function() if self._function else self.value)]
+
+
+class Histogram(_Metric):
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name=name, help=help, labels=labels)
+        self.buckets = buckets
+        self.bucket_counts: list[int] = [0] * (len(buckets) + 1)  # last is +Inf
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(name=self.name, help=self.help, buckets=self.buckets)
+
+    def observe(self, value: float) -> None:
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.bucket_counts[bucket] += 1
+            self.sum += value
+            self.count += 1
+
+    def _samples(self) -> list[tuple[str, str, float]]:
+        with self._lock:
+            bucket_counts, total, count = list(self.bucket_counts), self.sum, self.count
+        samples: list[tuple[str, str, float]] = []
+        cumulative: int = 0
+        for upper_bound, bucket_count in zip(self.buckets + (math.inf,), bucket_counts):
+            cumulative += bucket_count
+            samples.append(("_bucket", f'le="{_format(upper_bound)}"', cumulative))
+        return samples + [("_sum", "", total), ("_count", "", count)]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name=name, help=help, labels=labels))
+
+    def gauge(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name=name, help=help, labels=labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(
+            Histogram(name=name, help=help, labels=labels, buckets=buckets)
+        )
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines: list[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(label_value: str) -> str:
+    return (
+        str(label_value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # scraped every few seconds, not worth a log line
+
+
+def start_metrics_server(
+    registry: MetricsRegistry, host: str, port: int
+) -> ThreadingHTTPServer:
+    """Serve registry at http://host:port/metrics from a daemon thread"""
+    handler = type(
+        "MetricsRequestHandler", (_MetricsRequestHandler,), {"registry": registry}
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name="metrics-server", daemon=True
+    ).start()
+    return server
+
+
+def stop_metrics_server(server: ThreadingHTTPServer) -> None:
+    server.shutdown()
+    server.server_close()
+
+
+registry: MetricsRegistry = MetricsRegistry()
+
+LOOP_DURATION: Histogram = registry.histogram(
+    "garage_door_monitor_loop_seconds",
+    "Time spent checking the doors in one monitor loop",
+    labels=("door",),  # "all" for the sync runtime's loops over every door
+)
+STATE_EVALUATION: Histogram = registry.histogram(
+    "garage_door_state_evaluation_seconds",
+    "Time to read a door's sensors and evaluate its state",
+    labels=("door",),
+)
+TRANSITIONS: Counter = registry.counter(
+    "garage_door_transitions_total", "Door state changes", labels=("door", "state")
+)
+ALARMS: Counter = registry.counter(
+    "garage_door_alarms_total", "Door open too long alarms raised", labels=("door",)
+)
+NOTIFICATIONS: Counter = registry.counter(
+    "garage_door_notifications_total",
+    "Notifications by result: sent, failed, dropped (queue full) or retried",
+    labels=("result",),
+)
+NOTIFICATION_LATENCY: Histogram = registry.histogram(
+    "garage_door_notification_latency_seconds",
+    "Time from queueing a notification to its delivery",
+)
+NOTIFICATION_QUEUE_DEPTH: Gauge = registry.gauge(
+    "garage_door_notification_queue_depth", "Notifications waiting to be sent"
+)
+CONFIG_LOADS: Counter = registry.counter(
+    "garage_door_config_loads_total", "load_config() calls"
+)
+CONFIG_RELOADS: Counter = registry.counter(
+    "garage_door_config_reloads_total", "Times the configuration file was parsed"
+)
@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+import queue
+import threading
+import time
+from typing import Optional, Protocol
+
+import requests
+
+from src import metrics
+
+
+class LoggerProto(Protocol):
+    def debug(self, msg: str) -> None:
+        ...
+
+    def info(self, msg: str) -> None:
+        ...
+
+    def error(self, msg: str) -> None:
+        ...
+
+
+@dataclass
+class NotificationStats:
+    sent: int = 0
+    failed: int = 0  # gave up after all retries
+    dropped: int = 0  # queue full
+    retries: int = 0
+    last_latency: Optional[float] = None  # seconds, submit to delivered
+    max_latency: float = 0.0
+
+
+class NotificationDispatcher:
+    """
+    Posts notifications from a background thread so callers only enqueue.
+    Uses one keep-alive requests.Session, a timeout on every request and
+    retries failed posts with exponential backoff (backoff, 2*backoff, ...).
+    """
+
+    _STOP_POLL: float = 0.1  # seconds, how often an idle thread looks for stop
+
+    def __init__(
+        self,
+        address: str,
+        msg_var: str,
+        logger: LoggerProto,
+        queue_size: int = 100,
+        timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+    ) -> None:
+        self.address = address
+        self.msg_var = msg_var
+        self.logger = logger
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.stats = NotificationStats()
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._session = requests.Session()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="notification-dispatcher", daemon=True
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> "NotificationDispatcher":
+        self._thread.start()
+        return self
+
+    def submit(self, msg: str) -> bool:
+        """Queue msg for sending, False if the queue is full and msg was dropped"""
+        try:
+            self._queue.put_nowait((msg, time.monotonic()))
+        except queue.Full:
+            self.stats.dropped += 1
+            metrics.NOTIFICATIONS.labels("dropped").inc()
+            self.logger.error(msg=f"Notification queue full, dropped: {msg}")
+            return False
+        return True
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        Send what is already queued, then stop the dispatcher thread, waiting
+        up to timeout seconds for it. The session is closed once it has
+        stopped; a thread still sending is left to die with the process.
+        """
+        self._stopping.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            self.logger.error(
+                msg=f"Notification dispatcher still sending after {timeout} seconds,"
+                f" {self.queue_depth} queued"
+            )
+            return
+        self._session.close()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                msg, submit_time = self._queue.get(timeout=self._STOP_POLL)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+            self._send(msg=msg, submit_time=submit_time)
+
+    def _send(self, msg: str, submit_time: float) -> None:
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats.retries += 1
+                metrics.NOTIFICATIONS.labels("retried").inc()
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                response = self._session.post(
+                    self.address, data={self.msg_var: msg}, timeout=self.timeout
+                )
+                response.raise_for_status()
+            except requests.RequestException as err:
+                self.logger.debug(
+                    msg=f"Notification attempt {attempt + 1} failed: {err!r}"
+                )
+                continue
+            latency = time.monotonic() - submit_time
+            self.stats.sent += 1
+            self.stats.last_latency = latency
+            self.stats.max_latency = max(self.stats.max_latency, latency)
+            metrics.NOTIFICATIONS.labels("sent").inc()
+            metrics.NOTIFICATION_LATENCY.observe(latency)
+            self.logger.debug(msg=f"{self.msg_var}: {msg} ({latency:.3f} seconds)")
+            return
+        self.stats.failed += 1
+        metrics.NOTIFICATIONS.labels("failed").inc()
+        self.logger.error(
+            msg=f"Notification failed after {self.max_retries + 1} attempts: {msg}"
+        )
@@ -1,6 +1,6 @@
 import datetime as dt
 import os
-from typing import Protocol
+from typing import Optional, Protocol
 
 from box import Box
 import matplotlib
@@ -15,8 +15,12 @@ import pandas as pd
 import tkinter as tk
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
-from src.config.config_logging import log_cfg, logger
+from src.config.config_logging import logger
 from src.config.config_main import load_config
+from src.history_cache import load_cached_history
+from src.history_journal import JournalReader
+from src.history_parser import POSITION_VALUE, history_filepaths
+from src.history_store import SQLiteHistoryStore
 from src.tk_plot import tk_xy_plot
 
 
@@ -31,127 +35,87 @@ class LoggerProto(Protocol):
         ...
 
 
-DOORS: list[str] = ["ONE_CAR", "TWO_CAR"]
-EXCLUDED_ACTIONS: list[str] = ["created"]
-POSITION_VALUE: dict[str, float] = {
-    "closed": 0,
-    "unknown": 0.5,
-    "Unknown": 0.5,
-    "un_open": 0.5,
-    "un_closed": 0.5,
-    "open": 1,
-    "opened": 1,
-}
-
-
 def load_garage_door_history() -> dict[str, pd.DataFrame]:
-    config_filename_base: str = log_cfg.handler.history.filename.split(".")[0]
-    history_filenames: list[str] = [
-        fn
-        for fn in os.listdir(log_cfg.handler.history.folder)
-        if (fn.startswith(config_filename_base) and "example" not in fn)
-    ]
-
-    door_status_history: dict[str, pd.DataFrame] = {}  # a dict for each door
-    door_name: str
-    line_list: list[str]
-    timestamp: dt.datetime
-    new_status: pd.DataFrame
-
-    for history_filename in history_filenames:
-        history_filepath = os.path.join(
-            log_cfg.handler.history.folder, history_filename
+    cfg: Box = load_config()
+    if cfg.HISTORY.PLOT_SOURCE == "sqlite":
+        return load_garage_door_history_from_store(db_path=cfg.HISTORY.SQLITE.PATH)
+    if cfg.HISTORY.PLOT_SOURCE == "journal":
+        return JournalReader(journal_path=cfg.HISTORY.JOURNAL.PATH).door_status_history(
+            time_zone=cfg.APP.TIME_ZONE
         )
-        with open(file=history_filepath) as file:
-            for a_line in file:
-                if a_line.endswith("\n"):
-                    a_line = a_line[:-1]
-                line_list = a_line.split(":")
-                if (
-                    len(line_list) < 7
-                    or line_list[5] not in DOORS
-                    or line_list[6] in EXCLUDED_ACTIONS
-                ):
-                    continue
-                # logger.debug(msg=f"{line_list=}")
-
-                door_name = line_list[5]
-                if door_name not in door_status_history:
-                    door_status_history[door_name] = pd.DataFrame(
-                        columns=["datetime", "position"]
-                    )
-                try:
-                    timestamp = dt.datetime.strptime(
-                        ":".join(line_list[:3]), "%Y-%m-%d %H:%M:%S,%f"
-                    )
-                except ValueError:  # invalid date time
-                    logger.debug(f"Invalid Timestamp: {line_list=}")
-                    continue
-                new_status = pd.DataFrame(
-                    {"datetime": [timestamp], "position": [line_list[6]]}
-                )
-
-                # logger.debug(msg=f"{new_status=}")
-
-                door_status_history[door_name] = pd.concat(
-                    [door_status_history[door_name], new_status], ignore_index=True
-                )
-
-    return door_status_history
+    return load_cached_history(
+        history_filepaths=history_filepaths(),
+        cache_folder=cfg.HISTORY.CACHE_FOLDER,
+        workers=cfg.HISTORY.WORKERS or os.cpu_count() or 1,
+    )
+
+
+def load_garage_door_history_from_store(
+    db_path: str,
+    start: Optional[dt.datetime] = None,
+    end: Optional[dt.datetime] = None,
+) -> dict[str, pd.DataFrame]:
+    """Each door's history between start and end from the SQLite store"""
+    history_store = SQLiteHistoryStore(
+        db_path=db_path, time_zone=load_config().APP.TIME_ZONE
+    )
+    try:
+        return {
+            door: history_store.events_between(door=door, start=start, end=end)
+            for door in history_store.doors()
+        }
+    finally:
+        history_store.close()
 
 
 def clean_garage_door_history(
     door_status_history: dict[str, pd.DataFrame]
 ) -> dict[str, pd.DataFrame]:
-    new_dsh: pd.DataFrame
-    temp_door_status: pd.DataFrame
-    added_timestamp: dt.datetime
+    """
+    Sort and de-duplicate each door's history, keeping the first logged row
+    of each time. Where the door changed position
+    after more than GRAPHING.MAX_TRANSITION_TIME, add a point holding the old
+    position until MAX_TRANSITION_TIME before the change, so the plot shows a
+    transition rather than a long slope.
+    """
     cfg: Box = load_config()
+    max_transition_time = dt.timedelta(seconds=cfg.GRAPHING.MAX_TRANSITION_TIME)
     clean_gdh: dict[str, pd.DataFrame] = {}
-    transition_time: float
-
-    # logger.debug(msg=f"{door_status_history=}")
 
     for a_door, a_door_status_history in door_status_history.items():
-        a_door_status_history.sort_values(by="datetime", inplace=True)
+        a_door_status_history.sort_values(by="datetime", kind="stable", inplace=True)
         a_door_status_history.drop_duplicates(
             subset="datetime", inplace=True, ignore_index=True
         )
-        a_door_status_history.reset_index()
-
-        # logger.debug(msg=f"{a_door=}")
-        # logger.debug(msg=f"{a_door_status_history=}")
-        # logger.debug(msg=f"{a_door_status_history.shape=}")
-
-        new_dsh = a_door_status_history.iloc[:1]
-
-        for _, row in a_door_status_history.iloc[1:].iterrows():
-            # logger.debug(msg=f"{a_door=}:{new_dsh=}:{new_dsh.iloc[-1]=}")
-            transition_time = (
-                row["datetime"] - new_dsh.iloc[-1]["datetime"]
-            ).total_seconds()
-            # logger.debug(msg=f"{transition_time=}, {cfg.GRAPHING.MAX_TRANSITION_TIME=}")
-
-            if (
-                transition_time > cfg.GRAPHING.MAX_TRANSITION_TIME
-                and row["position"] != new_dsh.iloc[-1]["position"]
-            ):
-                added_timestamp = row["datetime"] - dt.timedelta(
-                    seconds=cfg.GRAPHING.MAX_TRANSITION_TIME
-                )
-                temp_door_status = pd.DataFrame(
-                    {
-                        "datetime": [added_timestamp],
-                        "position": [new_dsh.iloc[-1]["position"]],
-                    }
-                )
-                # Add added row, if necessary
-                new_dsh = pd.concat([new_dsh, temp_door_status], ignore_index=True)
-            # Add next original row
-            new_dsh = pd.concat([new_dsh, row.to_frame().T], ignore_index=True)
 
+        datetimes: pd.Series = a_door_status_history["datetime"]
+        positions: pd.Series = a_door_status_history["position"]
+        previous_positions: pd.Series = positions.shift()
+        hold_rows = (datetimes.diff() > max_transition_time) & (
+            positions != previous_positions
+        )
+        added_rows = pd.DataFrame(
+            {
+                "datetime": datetimes[hold_rows] - max_transition_time,
+                "position": previous_positions[hold_rows],
+            }
+        )
+
+        # Each added row goes just before the original row it was made for
+        new_dsh = pd.concat(
+            [
+                a_door_status_history.assign(
+                    _order=2 * a_door_status_history.index + 1
+                ),
+                added_rows.assign(_order=2 * added_rows.index),
+            ]
+        )
+        new_dsh = (
+            new_dsh.sort_values(by="_order")
+            .drop(columns="_order")
+            .reset_index(drop=True)
+        )
         new_dsh["position_value"] = new_dsh["position"].map(POSITION_VALUE)
-        new_dsh.reset_index()
 
         clean_gdh[a_door] = new_dsh
 
@@ -252,4 +216,19 @@ def plot_garage_door_status() -> None:
 
 
 if __name__ == "__main__":
-    plot_garage_door_status()
+    import argparse
+
+    from src.profiling import add_profile_argument, profile_mode, profiled
+
+    parser = argparse.ArgumentParser(description="Plot the garage door history")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    cfg: Box = load_config()
+    with profiled(
+        name="plot_garage_door_status",
+        output_folder=cfg.PROFILE.FOLDER,
+        mode=profile_mode(args.profile),
+        sample_interval=cfg.PROFILE.SAMPLE_INTERVAL,
+        logger=logger,
+    ):
+        plot_garage_door_status()
@@ -0,0 +1,249 @@
+""" Profile the entry points: per-function stats and flame graph ready stacks """
+
+import argparse
+from collections import Counter
+from contextlib import contextmanager
+import cProfile
+import datetime as dt
+import io
+import os
+import pstats
+import signal
+import sys
+import threading
+from types import FrameType
+from typing import Iterator, Optional, Protocol
+
+PROFILE_ENV: str = "GARAGE_DOOR_PROFILE"  # "sample" or "cprofile", as --profile
+PROFILE_MODES: tuple[str, ...] = ("sample", "cprofile")
+TOGGLE_SIGNAL: str = "SIGUSR2"  # starts or stops profiling a running process
+
+
+class LoggerProto(Protocol):
+    def info(self, msg: str) -> None:
+        ...
+
+
+class Profiler:
+    """
+    Profiles between start() and stop(), which writes to output_folder:
+      <name>-<stamp>.collapsed  stacks sampled every sample_interval seconds
+                                from every thread, one "frame;frame;... count"
+                                line per stack, for flamegraph.pl or speedscope
+      <name>-<stamp>.stats.txt  per-function stats
+      <name>-<stamp>.prof       "cprofile" mode only, for pstats or snakeviz
+    "sample" mode only looks at the stacks, so it is cheap enough for a live
+    monitor. "cprofile" mode also counts every call and its time, exactly,
+    on the thread that started it (the main thread for a signal).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        output_folder: str,
+        mode: str = "sample",
+        sample_interval: float = 0.005,
+    ) -> None:
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Profile mode must be one of {PROFILE_MODES}: {mode}")
+        self.name = name
+        self.output_folder = output_folder
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_sampling = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._sampler is not None
+
+    def start(self) -> "Profiler":
+        if self.running:
+            return self
+        self.stacks = Counter()
+        self._stop_sampling.clear()
+        self._sampler = threading.Thread(
+            target=self._sample, name=f"profile-{self.name}", daemon=True
+        )
+        self._sampler.start()
+        if self.mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    def stop(self) -> list[str]:
+        """Stop profiling and return the paths of the files written"""
+        if not self.running:
+            return []
+        if self._profile is not None:
+            self._profile.disable()
+        self._stop_sampling.set()
+        self._sampler.join()  # type: ignore[union-attr]
+        self._sampler = None
+        filepaths = self._write()
+        self._profile = None
+        return filepaths
+
+    def toggle(self) -> list[str]:
+        if self.running:
+            return self.stop()
+        self.start()
+        return []
+
+    def _sample(self) -> None:
+        sampler_id: int = threading.get_ident()
+        while not self._stop_sampling.wait(self.sample_interval):
+            thread_names = {
+                thread.ident: thread.name for thread in threading.enumerate()
+            }
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == sampler_id:
+                    continue
+                self.stacks[
+                    (thread_names.get(thread_id, str(thread_id)),) + _frame_stack(frame)
+                ] += 1
+
+    def _write(self) -> list[str]:
+        os.makedirs(self.output_folder, exist_ok=True)
+        stamp: str = dt.datetime.now().strftime("%Y%m%d-%H%M%S")
+        base_path = os.path.join(self.output_folder, f"{self.name}-{stamp}")
+        filepaths: list[str] = [f"{base_path}.collapsed", f"{base_path}.stats.txt"]
+        with open(filepaths[0], "w") as fp:
+            fp.write(collapsed_stacks(self.stacks))
+        with open(filepaths[1], "w") as fp:
+            if self._profile is not None:
+                stats_text = io.StringIO()
+                pstats.Stats(self._profile, stream=stats_text).sort_stats(
+                    pstats.SortKey.CUMULATIVE
+                ).print_stats()
+                fp.write(stats_text.getvalue())
+            else:
+                fp.write(sample_stats(self.stacks))
+        if self._profile is not None:
+            self._profile.dump_stats(f"{base_path}.prof")
+            filepaths.append(f"{base_path}.prof")
+        return filepaths
+
+
+def _frame_stack(frame: Optional[FrameType]) -> tuple[str, ...]:
+    """Frames from the outermost call in, e.g. "update_state (garage_door.py:83)" """
+    stack: list[str] = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(
+            f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+            f"{code.co_firstlineno})"
+        )
+        frame = frame.f_back
+    return tuple(reversed(stack))
+
+
+def collapsed_stacks(stacks: Counter[tuple[str, ...]]) -> str:
+    return "".join(
+        f"{';'.join(stack)} {count}\n" for stack, count in sorted(stacks.items())
+    )
+
+
+def sample_stats(stacks: Counter[tuple[str, ...]]) -> str:
+    """
+    Per function: samples with the function running (self) and with it
+    anywhere on the stack (total), busiest first
+    """
+    n_samples: int = sum(stacks.values())
+    self_samples: Counter[str] = Counter()
+    total_samples: Counter[str] = Counter()
+    for stack, count in stacks.items():
+        self_samples[stack[-1]] += count
+        for function in set(stack[1:]):  # stack[0] is the thread
+            total_samples[function] += count
+    lines: list[str] = [
+        f"{n_samples} samples",
+        f"{'self':>8} {'self %':>7} {'total':>8} {'total %':>7}  function",
+    ]
+    for function, total in sorted(
+        total_samples.items(), key=lambda item: (-self_samples[item[0]], -item[1])
+    ):
+        lines.append(
+            f"{self_samples[function]:>8} "
+            f"{100 * self_samples[function] / n_samples:>7.1f} "
+            f"{total:>8} {100 * total / n_samples:>7.1f}  {function}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def install_toggle_signal(
+    profiler: Profiler, logger: Optional[LoggerProto] = None
+) -> bool:
+    """
+    kill -USR2 <pid> starts profiling, a second one stops it and writes the
+    files. False where there is no such signal (windows).
+    """
+    signum: Optional[int] = getattr(signal, TOGGLE_SIGNAL, None)
+    if signum is None:
+        return False
+
+    def toggle(signum: int, frame: Optional[FrameType]) -> None:
+        filepaths = profiler.toggle()
+        if logger:
+            logger.info(
+                msg=f"Profile written to {', '.join(filepaths)}"
+                if filepaths
+                else f"Profiling {profiler.name} ({profiler.mode})"
+            )
+
+    signal.signal(signum, toggle)
+    return True
+
+
+def add_profile_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="sample",
+        choices=PROFILE_MODES,
+        help=f"profile the whole run, default mode sample (or set {PROFILE_ENV})",
+    )
+
+
+def profile_mode(argument: Optional[str]) -> Optional[str]:
+    """
+    The --profile argument, else the environment switch (any value other
+    than a mode, e.g. "1", is "sample"), else None
+    """
+    if argument:
+        return argument
+    environment_mode: str = os.environ.get(PROFILE_ENV, "")
+    if not environment_mode or environment_mode == "0":
+        return None
+    return environment_mode if environment_mode in PROFILE_MODES else "sample"
+
+
+@contextmanager
+def profiled(
+    name: str,
+    output_folder: str,
+    mode: Optional[str] = None,
+    sample_interval: float = 0.005,
+    logger: Optional[LoggerProto] = None,
+) -> Iterator[Profiler]:
+    """
+    Profile the block if mode is set. Either way the toggle signal can
+    profile part of it.
+    """
+    profiler = Profiler(
+        name=name,
+        output_folder=output_folder,
+        mode=mode or "sample",
+        sample_interval=sample_interval,
+    )
+    install_toggle_signal(profiler=profiler, logger=logger)
+    if mode:
+        profiler.start()
+    try:
+        yield profiler
+    finally:
+        filepaths = profiler.stop()
+        if filepaths and logger:
+            logger.info(msg=f"Profile written to {', '.join(filepaths)}")
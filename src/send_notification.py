@@ -1,6 +1,10 @@
-import requests
-from typing import Protocol
+from functools import partial
+from typing import Optional, Protocol
 
+from src import metrics
+from src.config.config_main import load_config
+from src.exit_handler import register_exit_callback
+from src.notification_dispatcher import NotificationDispatcher
 from security.keys import IFTTT_EVENT, IFTTT_KEY, IFTTT_MSG_VAR
 
 
@@ -11,10 +15,44 @@ class LoggerProto(Protocol):
     def info(self, msg: str) -> None:
         ...
 
+    def error(self, msg: str) -> None:
+        ...
+
 
 address: str = f"https://maker.ifttt.com/trigger/{IFTTT_EVENT}/with/key/{IFTTT_KEY}"
 
+dispatcher: Optional[NotificationDispatcher] = None
+
+
+def get_dispatcher(logger: LoggerProto) -> NotificationDispatcher:
+    global dispatcher
+    if dispatcher is None:
+        notification_cfg = load_config().NOTIFICATION
+        dispatcher = NotificationDispatcher(
+            address=address,
+            msg_var=IFTTT_MSG_VAR,
+            logger=logger,
+            queue_size=notification_cfg.QUEUE_SIZE,
+            timeout=notification_cfg.TIMEOUT,
+            max_retries=notification_cfg.MAX_RETRIES,
+            backoff=notification_cfg.BACKOFF,
+        ).start()
+        metrics.NOTIFICATION_QUEUE_DEPTH.set_function(lambda: dispatcher.queue_depth)
+        register_exit_callback(
+            partial(stop_dispatcher, timeout=notification_cfg.TIMEOUT)
+        )
+    return dispatcher
+
+
+def stop_dispatcher(timeout: float = 10.0) -> None:
+    global dispatcher
+    if dispatcher is not None:
+        dispatcher.stop(timeout=timeout)
+        dispatcher = None
+        metrics.NOTIFICATION_QUEUE_DEPTH.set_function(None)
+
 
 def send_notification(*, msg: str = "Test notification", logger: LoggerProto):
-    requests.post(address, data={f"{IFTTT_MSG_VAR}": f"{msg}"})
-    logger.debug(msg=f"{IFTTT_MSG_VAR}: {msg}")
+    # Only queues the message, the dispatcher thread posts it
+    get_dispatcher(logger=logger).submit(msg)
+    logger.debug(msg=f"{IFTTT_MSG_VAR} queued: {msg}")
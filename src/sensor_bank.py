@@ -0,0 +1,136 @@
+""" All the door sensor pins read at once, as a point-in-time bitmask """
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+import mmap
+import struct
+import threading
+from typing import Callable, Iterator, Optional, Protocol
+
+from src.clock import ClockProto
+
+GPIOMEM_PATH: str = "/dev/gpiomem"
+GPLEV0: int = 0x34  # pin level register of BCM pins 0-31
+# SoCs with the GPLEV0 register at that offset (Raspberry Pi 1-4)
+BCM_SOCS: tuple[bytes, ...] = (b"bcm2835", b"bcm2836", b"bcm2837", b"bcm2711")
+DEVICE_TREE_COMPATIBLE: str = "/proc/device-tree/compatible"
+
+
+class DoorSensorProto(Protocol):
+    value: bool
+
+
+class LoggerProto(Protocol):
+    def debug(self, msg: str) -> None:
+        ...
+
+
+@dataclass(frozen=True)
+class BankSnapshot:
+    active: int  # bit n set while BCM pin n is active
+    at_time: float  # monotonic seconds of the read
+
+    def is_active(self, pin: int) -> bool:
+        return bool(self.active >> pin & 1)
+
+
+class GpioMemReader:
+    """
+    Every pin's level in one read of the GPLEV0 register, through
+    /dev/gpiomem. The pins must already be set up as inputs, with their
+    pulls, e.g. by gpiozero. A pulled up pin is active low, as gpiozero's.
+    """
+
+    def __init__(self, pull_ups: dict[int, bool]) -> None:
+        if any(not 0 <= pin < 32 for pin in pull_ups):
+            raise ValueError(f"GPLEV0 only holds BCM pins 0-31, not {pull_ups}")
+        if not _bcm_soc():
+            raise OSError("No GPLEV0 register on this board")
+        with open(GPIOMEM_PATH, "r+b") as gpiomem:
+            self._mem = mmap.mmap(gpiomem.fileno(), mmap.PAGESIZE)
+        self._mask: int = sum(1 << pin for pin in pull_ups)
+        self._active_low: int = sum(1 << pin for pin, up in pull_ups.items() if up)
+
+    def __call__(self) -> int:
+        (levels,) = struct.unpack_from("<I", self._mem, GPLEV0)
+        return (levels ^ self._active_low) & self._mask
+
+
+def _bcm_soc() -> bool:
+    try:
+        with open(DEVICE_TREE_COMPATIBLE, "rb") as compatible:
+            return any(soc in compatible.read() for soc in BCM_SOCS)
+    except OSError:
+        return False
+
+
+class DeviceReader:
+    """
+    Every pin read through its device, e.g. gpiozero's, one after the other,
+    where GpioMemReader can't be used
+    """
+
+    def __init__(self, devices: dict[int, DoorSensorProto]) -> None:
+        self._devices: list[tuple[int, DoorSensorProto]] = list(devices.items())
+
+    def __call__(self) -> int:
+        active: int = 0
+        for pin, device in self._devices:
+            if device.value:
+                active |= 1 << pin
+        return active
+
+
+class SensorBank:
+    """
+    The sensor pins as one snapshot, so a door's two sensors are never read
+    at different times. While held, every snapshot shares one read, e.g. for
+    all the doors checked in a tick; otherwise each is read fresh.
+    """
+
+    def __init__(self, read_active: Callable[[], int], clock: ClockProto) -> None:
+        self.read_active = read_active
+        self.clock = clock
+        self._held: Optional[BankSnapshot] = None
+        self._holds: int = 0
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> BankSnapshot:
+        with self._lock:
+            if self._held is not None:
+                return self._held
+            snapshot = BankSnapshot(
+                active=self.read_active(), at_time=self.clock.monotonic()
+            )
+            if self._holds:
+                self._held = snapshot
+            return snapshot
+
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        with self._lock:
+            self._holds += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._holds -= 1
+                if not self._holds:
+                    self._held = None
+
+
+def open_sensor_bank(
+    devices: dict[int, DoorSensorProto],
+    pull_ups: dict[int, bool],
+    clock: ClockProto,
+    logger: LoggerProto,
+) -> SensorBank:
+    """A bank reading GPLEV0 where there is one, else reading the devices"""
+    read_active: Callable[[], int]
+    try:
+        read_active = GpioMemReader(pull_ups=pull_ups)
+        logger.debug(msg=f"Reading sensor pins {sorted(pull_ups)} from GPLEV0")
+    except (OSError, ValueError) as err:
+        logger.debug(msg=f"Reading sensor pins through their devices: {err!r}")
+        read_active = DeviceReader(devices=devices)
+    return SensorBank(read_active=read_active, clock=clock)
@@ -0,0 +1,144 @@
+""" Oversampling of the door sensors, filtered to ride out noisy reed switches """
+
+import threading
+from typing import Callable, Optional, Protocol
+
+from src.clock import ClockProto
+
+FILTERS: tuple[str, ...] = ("majority", "debounce")
+
+
+class DoorSensorProto(Protocol):
+    value: bool
+
+
+class SampleRing:
+    """
+    The last size samples of one pin, (monotonic seconds, value), the oldest
+    overwritten. The number active is kept as samples come and go.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.times: list[float] = [0.0] * size
+        self.values: list[bool] = [False] * size
+        self.count: int = 0  # samples ever appended
+        self.active: int = 0  # of the samples held
+
+    def __len__(self) -> int:
+        return min(self.count, self.size)
+
+    def append(self, at_time: float, value: bool) -> None:
+        index = self.count % self.size
+        if self.count >= self.size and self.values[index]:
+            self.active -= 1
+        self.times[index] = at_time
+        self.values[index] = value
+        self.active += value
+        self.count += 1
+
+    def samples(self) -> list[tuple[float, bool]]:
+        """Oldest first"""
+        start = self.count - len(self)
+        return [
+            (self.times[i % self.size], self.values[i % self.size])
+            for i in range(start, self.count)
+        ]
+
+
+class FilteredSensor:
+    """
+    A sensor whose value is filtered from its samples, for GarageDoor in place
+    of the raw sensor. changed_at is when (clock.monotonic() seconds) the
+    filtered value last changed, and when_activated/when_deactivated fire on
+    each change, as gpiozero's do.
+
+    "majority": the value most of the last window samples agree on, a tie
+    keeping the value. "debounce": the value changes once window samples in
+    a row agree, changed_at being the first of them.
+    """
+
+    def __init__(
+        self, sensor: DoorSensorProto, window: int, filter_: str, at_time: float
+    ) -> None:
+        if filter_ not in FILTERS:
+            raise ValueError(f"Unknown sensor filter {filter_!r}, not one of {FILTERS}")
+        self.sensor = sensor
+        self.window = window
+        self.filter = filter_
+        self.ring = SampleRing(size=window)
+        self.value: bool = bool(sensor.value)
+        self.changed_at: float = at_time
+        self.when_activated: Optional[Callable[[], None]] = None
+        self.when_deactivated: Optional[Callable[[], None]] = None
+        self._run_value: bool = self.value  # the latest run of equal samples
+        self._run_length: int = 0
+        self._run_start: float = at_time
+
+    def sample(self, at_time: float) -> None:
+        raw_value = bool(self.sensor.value)
+        self.ring.append(at_time, raw_value)
+        if raw_value == self._run_value:
+            self._run_length += 1
+        else:
+            self._run_value, self._run_length, self._run_start = raw_value, 1, at_time
+
+        if self.filter == "majority":
+            held = len(self.ring)
+            if 2 * self.ring.active == held:
+                return
+            value, changed_at = 2 * self.ring.active > held, at_time
+        elif self._run_length >= self.window:
+            value, changed_at = self._run_value, self._run_start
+        else:
+            return
+        if value != self.value:
+            self.value, self.changed_at = value, changed_at
+            callback = self.when_activated if value else self.when_deactivated
+            if callback is not None:
+                callback()
+
+
+class SensorSampler:
+    """
+    Samples every sensor added, rate times a second on the clock, into a
+    FilteredSensor each
+    """
+
+    def __init__(
+        self, rate: float, window: int, filter_: str, clock: ClockProto
+    ) -> None:
+        self.interval: float = 1 / rate
+        self.window = window
+        self.filter = filter_
+        self.clock = clock
+        self.sensors: list[FilteredSensor] = []
+        self._lock = threading.Lock()
+        self._stop: Optional[Callable[[], None]] = None
+
+    def add(self, sensor: DoorSensorProto) -> FilteredSensor:
+        filtered_sensor = FilteredSensor(
+            sensor=sensor,
+            window=self.window,
+            filter_=self.filter,
+            at_time=self.clock.monotonic(),
+        )
+        with self._lock:
+            self.sensors.append(filtered_sensor)
+        return filtered_sensor
+
+    def sample(self) -> None:
+        """Take one sample of every sensor, all stamped with the same time"""
+        at_time = self.clock.monotonic()
+        with self._lock:
+            for filtered_sensor in self.sensors:
+                filtered_sensor.sample(at_time)
+
+    def start(self) -> None:
+        if self._stop is None:
+            self._stop = self.clock.call_every(self.interval, self.sample)
+
+    def stop(self) -> None:
+        if self._stop is not None:
+            self._stop()
+            self._stop = None
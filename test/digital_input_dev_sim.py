@@ -1,14 +1,82 @@
-from dataclasses import dataclass
-import datetime as dt
-from typing import Any, Optional
+from dataclasses import dataclass, field
+from functools import lru_cache
+import os
+import random
+from typing import Any, Callable, Optional
 
 from box import Box
+import numpy as np
 import pandas as pd
 
+from src.clock import ClockProto, SystemClock
 from src.config.config_main import cfg
 from test.config.config_test_main import test_cfg
 
 
+@dataclass(frozen=True)
+class Scenario:
+    """
+    A digital input scenario, one array per column, shared by every sensor
+    reading it. Rows are in seconds_from_start order, so the row in force at
+    a time is a binary search away.
+    """
+
+    seconds_from_start: np.ndarray
+    columns: dict[str, np.ndarray]  # e.g. "TWO_CAR_OPEN"
+
+    def row_at(self, seconds: float) -> int:
+        row = int(np.searchsorted(self.seconds_from_start, seconds, side="right")) - 1
+        if row < 0:
+            raise IndexError(f"{seconds} s is before the scenario starts")
+        return row
+
+    def value_at(self, column: str, seconds: float) -> float:
+        return float(self.columns[column][self.row_at(seconds)])
+
+    def edges(self, column: str) -> list[tuple[float, bool]]:
+        """(seconds_from_start, active) of each row where column changes"""
+        values = self.columns[column]
+        changed = np.flatnonzero(values[1:] != values[:-1]) + 1
+        return list(
+            zip(
+                self.seconds_from_start[changed].astype(float).tolist(),
+                values[changed].astype(bool).tolist(),
+            )
+        )
+
+
+def load_scenario(scenario_path: str) -> Scenario:
+    """The scenario at scenario_path, read once while the file is unchanged"""
+    return _read_scenario(
+        os.path.abspath(scenario_path), os.stat(scenario_path).st_mtime_ns
+    )
+
+
+@lru_cache(maxsize=8)
+def _read_scenario(scenario_path: str, mtime_ns: int) -> Scenario:
+    scenario: pd.DataFrame = pd.read_csv(
+        filepath_or_buffer=scenario_path, skipinitialspace=True
+    ).sort_values(by="seconds_from_start", kind="stable")
+    arrays: dict[str, np.ndarray] = {
+        column: scenario[column].to_numpy(copy=True) for column in scenario.columns
+    }
+    for array in arrays.values():
+        array.flags.writeable = False  # shared by every sensor
+    seconds_from_start = arrays.pop("seconds_from_start")
+    return Scenario(seconds_from_start=seconds_from_start, columns=arrays)
+
+
+@lru_cache(maxsize=1)
+def _pin_columns() -> dict[int, str]:
+    """Scenario column of each sensor pin in the DOORS config"""
+    garage_door_config: Box = cfg.DOORS
+    return {
+        garage_door_config[garage_door][sensor]["NUMBER"]: f"{garage_door}_{sensor}"
+        for garage_door in garage_door_config.keys()
+        for sensor in ("OPEN", "CLOSED")
+    }
+
+
 @dataclass
 class DoorSensorSim:
     pin: int
@@ -16,35 +84,77 @@ class DoorSensorSim:
     bounce_time: float
     active_state: Optional[bool] = None  # ignore for now
     pin_factory: Optional[Any] = None  # ignore
+    when_activated: Optional[Callable[[], None]] = None
+    when_deactivated: Optional[Callable[[], None]] = None
+    clock: ClockProto = field(default_factory=SystemClock)
+    column: Optional[str] = None  # scenario column, default the pin's door/sensor
+    noise: float = 0.0  # chance each read is flipped, like a chattering reed switch
+    seed: Optional[int] = None
 
     def __post_init__(self) -> None:
-        _time_elapsed: int  # seconds
-        input_file = test_cfg.TEST.DIGITAL_INPUT_DATE_PATH
-        self.door_input_history: pd.DataFrame = pd.read_csv(
-            filepath_or_buffer=input_file
-        )
-        self.start_time: dt.datetime = dt.datetime.now()
-        garage_door_config: Box = cfg.DOORS
-        pin_index_sensors: dict[int, dict[str, str]] = {}
-        for garage_door in garage_door_config.keys():
-            for sensor in garage_door_config[garage_door].keys():
-                pin_index_sensors[garage_door_config[garage_door][sensor]["NUMBER"]] = {
-                    "door": garage_door,
-                    "sensor": sensor,
-                }
-        self._sensor_door = pin_index_sensors[self.pin]["door"]
-        self._sensor_sensor = pin_index_sensors[self.pin]["sensor"]
+        self.scenario: Scenario = load_scenario(test_cfg.TEST.DIGITAL_INPUT_DATE_PATH)
+        self.start_time: float = self.clock.monotonic()
+        if self.column is None:
+            self.column = _pin_columns()[self.pin]
+        self._noise = random.Random(self.seed)
+        self._schedule_edges()
 
     @property
     def _time_elapsed(self) -> int:
-        return int(round((dt.datetime.now() - self.start_time).total_seconds(), 0))
+        return int(round(self.clock.monotonic() - self.start_time, 0))
 
-    # TODO
     @property
     def value(self) -> float:
-        # get value from door_input_history based on time elapsed and self.sensor_door
-        return float(
-            self.door_input_history[
-                self.door_input_history.seconds_from_start <= self._time_elapsed
-            ].iloc[-1, :][f"{self._sensor_door}_{self._sensor_sensor}"]
-        )
+        value = self.scenario.value_at(self.column, self._time_elapsed)  # type: ignore
+        if self.noise and self._noise.random() < self.noise:
+            return 1.0 - value
+        return value
+
+    def _schedule_edges(self) -> None:
+        """
+        Have the clock fire when_activated/when_deactivated, like a gpiozero
+        device, at every scenario row where this sensor changes value. Only
+        the next edge is scheduled at a time, so the clock holds one timer
+        per sensor however long the scenario.
+        """
+        self._edges = self.scenario.edges(self.column)  # type: ignore[arg-type]
+        self._next_edge: int = 0
+        self._schedule_next_edge()
+
+    def _schedule_next_edge(self) -> None:
+        if self._next_edge < len(self._edges):
+            seconds_from_start = self._edges[self._next_edge][0]
+            self.clock.call_later(
+                seconds_from_start - (self.clock.monotonic() - self.start_time),
+                self._fire_edge,
+            )
+
+    def _fire_edge(self) -> None:
+        active = self._edges[self._next_edge][1]
+        self._next_edge += 1
+        self._schedule_next_edge()
+        callback = self.when_activated if active else self.when_deactivated
+        if callback is not None:
+            callback()
+
+
+class ScenarioReader:
+    """
+    A SensorBank's read of every sensor pin in the DOORS config, all from the
+    same scenario row
+    """
+
+    def __init__(self, clock: ClockProto) -> None:
+        self.scenario: Scenario = load_scenario(test_cfg.TEST.DIGITAL_INPUT_DATE_PATH)
+        self.clock = clock
+        self.start_time: float = clock.monotonic()
+        self.reads: int = 0
+
+    def __call__(self) -> int:
+        self.reads += 1
+        row = self.scenario.row_at(round(self.clock.monotonic() - self.start_time))
+        active: int = 0
+        for pin, column in _pin_columns().items():
+            if self.scenario.columns[column][row]:
+                active |= 1 << pin
+        return active
@@ -0,0 +1,125 @@
+""" Test doubles and data shared by the tests and benchmarks """
+
+import datetime as dt
+import random
+import time
+from typing import Any
+
+from box import Box
+import pandas as pd
+
+from src.clock import ClockProto, SystemClock
+from src.config.config_main import load_config
+from src.garage_door import GarageDoor
+from src.history_parser import DOORS
+
+
+class NullLogger:
+    def debug(self, msg: str) -> None:
+        pass
+
+    def info(self, msg: str) -> None:
+        pass
+
+    def warning(self, msg: str) -> None:
+        pass
+
+    def error(self, msg: str) -> None:
+        pass
+
+    def exception(self, msg: str) -> None:
+        pass
+
+
+class ListLogger:
+    """Keeps (time.monotonic(), msg) of every message, whatever the level"""
+
+    def __init__(self) -> None:
+        self.records: list[tuple[float, str]] = []
+
+    @property
+    def messages(self) -> list[str]:
+        return [msg for _, msg in self.records]
+
+    def debug(self, msg: str) -> None:
+        self.records.append((time.monotonic(), msg))
+
+    def info(self, msg: str) -> None:
+        self.records.append((time.monotonic(), msg))
+
+    def error(self, msg: str) -> None:
+        self.records.append((time.monotonic(), msg))
+
+    def exception(self, msg: str) -> None:
+        self.records.append((time.monotonic(), msg))
+
+
+class SensorStub:
+    def __init__(self, value: bool) -> None:
+        self.value = value
+
+
+def make_door(
+    open_value: bool,
+    closed_value: bool,
+    clock: ClockProto = SystemClock(),
+    Logger: type = ListLogger,
+) -> tuple[GarageDoor, Any]:
+    """TWO_CAR on stub sensors, and its history logger (a Logger)"""
+    history_logger = Logger()
+    door = GarageDoor(
+        name="TWO_CAR",
+        open_sensor=SensorStub(open_value),
+        closed_sensor=SensorStub(closed_value),
+        load_config=load_config,
+        debug_logger=Logger(),
+        history_logger=history_logger,
+        clock=clock,
+    )
+    return door, history_logger
+
+
+def event_mode_config() -> Box:
+    """
+    The config in "event" mode, every loop delay so long that only a sensor
+    edge can wake a door in time
+    """
+    cfg = Box(load_config().to_dict(), default_box=True, default_box_attr=None)
+    cfg.APP.MONITOR_MODE = "event"
+    cfg.APP.LOOP_DELAY = 30
+    cfg.APP.FALLBACK_LOOP_DELAY = 30
+    return cfg
+
+
+def write_history(path, n_events: int, seed: int = 1) -> None:
+    """Synthetic history in the history logger's format, with some noise lines"""
+    rng = random.Random(seed)
+    timestamp = dt.datetime(2023, 8, 9, 11, 49, 12)
+    lines: list[str] = []
+    for _ in range(n_events):
+        timestamp += dt.timedelta(seconds=rng.randint(1, 3600), milliseconds=17)
+        stamp = f"{timestamp:%Y-%m-%d %H:%M:%S},{timestamp.microsecond // 1000:03d}"
+        door = rng.choice(DOORS + ["one_car"])
+        action = rng.choice(["opened", "closed", "unknown", "created"])
+        lines.append(f"{stamp}:INFO:DOOR:{door}:{action}")
+        match rng.randrange(10):
+            case 0:
+                lines.append(f"{stamp}:INFO:Starting Garage Door Monitor")
+            case 1:
+                lines.append(f"2023-13-45 99:00:00,000:INFO:DOOR:{door}:{action}")
+            case 2:
+                lines.append(f"{stamp}:INFO:DOOR:{door}:{action}:extra:fields")
+            case 3:
+                lines.append("")
+    path.write_text("\n".join(lines) + "\n")
+
+
+def assert_same_history(
+    actual: dict[str, pd.DataFrame], expected: dict[str, pd.DataFrame]
+) -> None:
+    assert list(actual) == list(expected)
+    for door_name, expected_frame in expected.items():
+        expected_frame = expected_frame.astype({"datetime": "datetime64[us]"})
+        pd.testing.assert_frame_equal(
+            actual[door_name], expected_frame, check_dtype=False
+        )
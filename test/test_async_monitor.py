@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+from box import Box
+
+from src.config.config_main import load_config
+import src.garage_door_status_monitor
+from test.config.config_test_main import test_cfg
+from test.digital_input_dev_sim import DoorSensorSim as DoorSensor
+from test.doubles import ListLogger, event_mode_config
+
+
+def fast_load_config() -> Box:
+    cfg = event_mode_config()
+    cfg.DOORS.ONE_CAR.LOOP_DELAY = 0.1
+    cfg.DOORS.ONE_CAR.OPEN.TIME_LIMIT = -1  # alarm on the first check
+    cfg.DOORS.ONE_CAR.OPEN.ALARM_INC_ADD = 3600  # and only that one
+    return cfg
+
+
+class FlakyDoorSensor(DoorSensor):
+    """ONE_CAR's closed sensor raises OSError on its first reads"""
+
+    failures: int = 0
+
+    @property
+    def value(self) -> float:
+        if self.pin == load_config().DOORS.ONE_CAR.CLOSED.NUMBER and (
+            FlakyDoorSensor.failures > 0
+        ):
+            FlakyDoorSensor.failures -= 1
+            raise OSError("GPIO read failed")
+        return super().value
+
+
+def test_async_monitor_doors_run_independently(tmp_path, monkeypatch) -> None:
+    scenario = tmp_path / "digital_input_async.csv"
+    scenario.write_text(
+        "seconds_from_start,ONE_CAR_CLOSED,ONE_CAR_OPEN,TWO_CAR_CLOSED,TWO_CAR_OPEN\n"
+        "0, 0, 1, 1, 0\n"
+        "1, 0, 1, 0, 1\n"
+    )
+    monkeypatch.setitem(test_cfg.TEST, "DIGITAL_INPUT_DATE_PATH", str(scenario))
+    monkeypatch.setattr(src.garage_door_status_monitor, "load_config", fast_load_config)
+    notifications: list[str] = []
+
+    def slow_send_notification(*, msg: str, logger: ListLogger) -> None:
+        time.sleep(1.5)  # an unreachable notification service
+        notifications.append(msg)
+
+    history_logger = ListLogger()
+    asyncio.run(
+        src.garage_door_status_monitor.async_garage_door_status_monitor(
+            DoorSensor=DoorSensor,
+            send_notification=slow_send_notification,
+            logger=ListLogger(),
+            history_logger=history_logger,
+            max_run_time=2,
+        )
+    )
+
+    messages = [msg for _, msg in history_logger.records]
+    created = [t for t, msg in history_logger.records if msg == "DOOR:TWO_CAR:created"]
+    opened = [t for t, msg in history_logger.records if msg == "DOOR:TWO_CAR:opened"]
+    assert len(opened) == 1
+    assert 0.9 <= opened[0] - created[0] < 1.3
+    assert notifications == ["ONE_CAR open for 0 minutes"]
+    assert messages[-1] == "Stopping Garage Door Monitor"
+
+
+def test_async_monitor_keeps_watching_a_failing_door(tmp_path, monkeypatch) -> None:
+    scenario = tmp_path / "digital_input_async.csv"
+    scenario.write_text(
+        "seconds_from_start,ONE_CAR_CLOSED,ONE_CAR_OPEN,TWO_CAR_CLOSED,TWO_CAR_OPEN\n"
+        "0, 0, 1, 1, 0\n"
+    )
+    monkeypatch.setitem(test_cfg.TEST, "DIGITAL_INPUT_DATE_PATH", str(scenario))
+    monkeypatch.setattr(src.garage_door_status_monitor, "load_config", fast_load_config)
+    FlakyDoorSensor.failures = 3
+    notifications: list[str] = []
+
+    def record_notification(*, msg: str, logger: ListLogger) -> None:
+        notifications.append(msg)
+
+    logger = ListLogger()
+    asyncio.run(
+        src.garage_door_status_monitor.async_garage_door_status_monitor(
+            DoorSensor=FlakyDoorSensor,
+            send_notification=record_notification,
+            logger=logger,
+            history_logger=ListLogger(),
+            max_run_time=1,
+        )
+    )
+
+    assert logger.messages.count("DOOR:ONE_CAR:check failed, retrying") == 3
+    assert notifications == ["ONE_CAR open for 0 minutes"]  # once reads recover
@@ -0,0 +1,78 @@
+from benchmarks.__main__ import main, run_benchmarks
+from benchmarks.harness import benchmark_result, compare_results, read_results
+from benchmarks.history_data import write_history
+from src.history_parser import parse_history_file
+
+
+def test_generated_history_parses(tmp_path) -> None:
+    history_filepath = tmp_path / "garage_door_status_history_2500.log"
+    write_history(str(history_filepath), n_events=2500)
+    door_status_history = parse_history_file(str(history_filepath))
+    assert sum(len(door_history) for door_history in door_status_history.values()) == (
+        2500
+    )
+    for door_history in door_status_history.values():
+        assert door_history["datetime"].is_monotonic_increasing
+
+
+def test_compare_flags_regressions() -> None:
+    baseline = {
+        result.key: result
+        for result in (
+            benchmark_result("fast", None, 100, [1e-6, 1.1e-6, 1.2e-6]),
+            benchmark_result("slow", 1000, 1, [0.5, 0.6, 0.7]),
+        )
+    }
+    current = {
+        result.key: result
+        for result in (
+            benchmark_result("fast", None, 100, [1.05e-6, 1.15e-6, 1.2e-6]),
+            benchmark_result("slow", 1000, 1, [0.7, 0.8, 0.9]),
+            benchmark_result("new", None, 1, [0.1]),
+        )
+    }
+    lines, regressions = compare_results(baseline, current, threshold=0.1)
+    assert regressions == ["slow[1000]"]
+    assert lines[-1].split() == ["new", "new"]
+
+
+def test_run_and_compare(tmp_path, capsys) -> None:
+    results_filepath = str(tmp_path / "run.json")
+    assert (
+        main(
+            [
+                "run",
+                "--filter",
+                "color_as_hex_string",
+                "--min-time",
+                "0.001",
+                "--repeat",
+                "2",
+                "--output",
+                results_filepath,
+            ]
+        )
+        == 0
+    )
+    results = read_results(results_filepath)
+    assert "color_as_hex_string.name" in results
+    assert main(["compare", results_filepath, results_filepath]) == 0
+
+    history_results = run_benchmarks(
+        history_sizes=(1000,),
+        data_folder=str(tmp_path / "data"),
+        name_filter="clean_garage_door_history",
+        min_time=0.001,
+        repeat=1,
+    )
+    assert [result.key for result in history_results] == [
+        "history.clean_garage_door_history[1000]"
+    ]
+    journal_results = run_benchmarks(
+        history_sizes=(1000,),
+        data_folder=str(tmp_path / "data"),
+        name_filter="history_journal.scan",
+        min_time=0.001,
+        repeat=1,
+    )
+    assert [result.key for result in journal_results] == ["history_journal.scan[1000]"]
@@ -0,0 +1,45 @@
+import datetime as dt
+import queue
+
+import pytest
+import pytz
+
+from src.clock import SimulatedClock
+
+
+def test_simulated_clock_jumps_to_each_event() -> None:
+    start = dt.datetime(2023, 8, 9, 15, 0, tzinfo=dt.timezone.utc)
+    clock = SimulatedClock(start=start)
+    events: queue.SimpleQueue = queue.SimpleQueue()
+    fired: list[float] = []
+    for delay in (120, 30, 30):
+        clock.call_later(
+            delay, lambda: (fired.append(clock.monotonic()), events.put(1))
+        )
+
+    assert clock.get(events, timeout=60) == 1
+    assert clock.monotonic() == 30
+    assert clock.get(events, timeout=0) == 1  # due at the same time
+    with pytest.raises(queue.Empty):
+        clock.get(events, timeout=60)
+    assert clock.monotonic() == 90
+
+    clock.sleep(100)
+    assert fired == [30, 30, 120]
+    assert clock.monotonic() == 190
+    assert events.get_nowait() == 1
+    detroit = pytz.timezone("America/Detroit")
+    assert clock.now(detroit) == start + dt.timedelta(seconds=190)
+    assert clock.now(detroit).utcoffset() == dt.timedelta(hours=-4)
+    with pytest.raises(RuntimeError):
+        clock.get(events, timeout=None)
+
+
+def test_simulated_clock_call_every() -> None:
+    clock = SimulatedClock()
+    ticks: list[float] = []
+    stop = clock.call_every(0.25, lambda: ticks.append(clock.monotonic()))
+    clock.sleep(1)
+    stop()
+    clock.sleep(1)
+    assert ticks == [0.25, 0.5, 0.75, 1.0]
@@ -0,0 +1,61 @@
+import os
+import signal
+
+from box import BoxError
+import pytest
+
+from src.config.config_main import ConfigCache
+
+CONFIG_YAML = """
+base:
+    APP:
+        LOOP_DELAY: {loop_delay}
+dev:
+    BLANK: 0
+"""
+
+
+def write_config(path, loop_delay: int, mtime_ns: int) -> None:
+    path.write_text(CONFIG_YAML.format(loop_delay=loop_delay))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_config_cache_reparses_only_on_change(tmp_path) -> None:
+    config_loc = tmp_path / "config.yaml"
+    write_config(config_loc, loop_delay=15, mtime_ns=1_000_000_000)
+    config_cache = ConfigCache(config_loc=str(config_loc))
+    reloads: list[int] = []
+    config_cache.subscribe(lambda cfg: reloads.append(cfg.APP.LOOP_DELAY))
+
+    first = config_cache.get()
+    assert config_cache.get() is first
+    assert first.APP.LOOP_DELAY == 15
+    assert first.APP.MISSING is None
+    with pytest.raises(BoxError):
+        first.APP.LOOP_DELAY = 1
+
+    write_config(config_loc, loop_delay=5, mtime_ns=2_000_000_000)
+    second = config_cache.get()
+    assert second is not first
+    assert second.APP.LOOP_DELAY == 5
+    assert config_cache.get() is second
+    assert reloads == [5]
+
+
+def test_config_cache_reloads_on_sighup(tmp_path) -> None:
+    config_loc = tmp_path / "config.yaml"
+    write_config(config_loc, loop_delay=15, mtime_ns=1_000_000_000)
+    config_cache = ConfigCache(config_loc=str(config_loc))
+    first = config_cache.get()
+
+    # Same size and mtime, so only the SIGHUP can reveal the change
+    write_config(config_loc, loop_delay=16, mtime_ns=1_000_000_000)
+    assert config_cache.get() is first
+
+    previous_handler = signal.getsignal(signal.SIGHUP)
+    try:
+        config_cache.install_sighup_handler()
+        os.kill(os.getpid(), signal.SIGHUP)
+        assert config_cache.get().APP.LOOP_DELAY == 16
+    finally:
+        signal.signal(signal.SIGHUP, previous_handler)
@@ -0,0 +1,40 @@
+import time
+
+from src.deadline_scheduler import DeadlineScheduler
+
+
+def test_due_in_deadline_order() -> None:
+    scheduler = DeadlineScheduler()
+    scheduler.schedule("ONE_CAR", 30)
+    scheduler.schedule("TWO_CAR", 10)
+    scheduler.schedule("SHED", 20)
+    assert scheduler.next_deadline() == 10
+    assert scheduler.pop_due(5) == []
+    assert scheduler.pop_due(20) == ["TWO_CAR", "SHED"]
+    assert scheduler.next_deadline() == 30
+    assert len(scheduler) == 1
+
+
+def test_reschedule_and_cancel() -> None:
+    scheduler = DeadlineScheduler()
+    scheduler.schedule("ONE_CAR", 10)
+    scheduler.schedule("TWO_CAR", 20)
+    scheduler.schedule("ONE_CAR", 40)  # door checked early, alarm later
+    scheduler.schedule("TWO_CAR", None)  # door closed
+    assert scheduler.next_deadline() == 40
+    assert scheduler.pop_due(30) == []
+    assert scheduler.pop_due(40) == ["ONE_CAR"]
+    assert scheduler.next_deadline() is None
+    assert len(scheduler) == 0
+
+
+def test_many_doors() -> None:
+    scheduler = DeadlineScheduler()
+    start_time = time.perf_counter()
+    for round_ in range(10):
+        for door in range(10_000):
+            scheduler.schedule(f"DOOR_{door}", (door * 7919 + round_) % 3600)
+    due = scheduler.pop_due(3600)
+    assert time.perf_counter() - start_time < 2
+    assert len(due) == 10_000
+    assert len(scheduler._heap) == 0  # superseded entries compacted or skipped
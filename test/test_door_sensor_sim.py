@@ -0,0 +1,66 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.clock import SimulatedClock
+from test.config.config_test_main import test_cfg
+from test.digital_input_dev_sim import DoorSensorSim, load_scenario
+
+N_ROWS = 100_000
+N_COLUMNS = 20
+N_SENSORS = 200  # 10 on each column
+
+
+def write_scenario(scenario_path, n_rows: int, n_sensors: int) -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    scenario = pd.DataFrame(
+        {"seconds_from_start": np.cumsum(rng.integers(0, 5, size=n_rows))}
+        | {
+            # Each sensor changes in about 1 row in 100
+            f"DOOR_{sensor:03d}": np.cumsum(rng.random(size=n_rows) < 0.01) % 2
+            for sensor in range(n_sensors)
+        }
+    )
+    scenario.iloc[0, 0] = 0
+    scenario.to_csv(scenario_path, index=False)
+    return scenario
+
+
+def test_large_scenario_reads(tmp_path, monkeypatch) -> None:
+    scenario_path = tmp_path / "digital_input_large.csv"
+    scenario = write_scenario(scenario_path, n_rows=N_ROWS, n_sensors=N_COLUMNS)
+    monkeypatch.setitem(test_cfg.TEST, "DIGITAL_INPUT_DATE_PATH", str(scenario_path))
+    clock = SimulatedClock()
+    sensors = [
+        DoorSensorSim(
+            pin=0,
+            pull_up=True,
+            bounce_time=1.0,
+            clock=clock,
+            column=f"DOOR_{sensor % N_COLUMNS:03d}",
+        )
+        for sensor in range(N_SENSORS)
+    ]
+    assert all(sensor.scenario is sensors[0].scenario for sensor in sensors)
+
+    rng = np.random.default_rng(2)
+    last_second = int(scenario.seconds_from_start.iloc[-1])
+    read_time: float = 0.0
+    for seconds in np.sort(rng.integers(0, last_second, size=100)):
+        clock.sleep(seconds - clock.monotonic())  # fires the edges on the way
+        start_time = time.perf_counter()
+        for sensor in sensors:
+            sensor.value
+        read_time += time.perf_counter() - start_time
+    assert read_time < 1  # 20k reads
+
+    # Same values as filtering the whole DataFrame for each read
+    for seconds in rng.integers(0, last_second, size=20):
+        expected_row = scenario[scenario.seconds_from_start <= seconds].iloc[-1, :]
+        for sensor in sensors[:5]:
+            assert sensor.scenario.value_at(sensor.column, seconds) == float(
+                expected_row[sensor.column]
+            )
+
+    assert load_scenario(str(scenario_path)) is sensors[0].scenario
@@ -1,21 +1,19 @@
-import signal
-from time import sleep
-from typing import Any, Protocol
+import datetime as dt
+from functools import partial
+import time
+from typing import Protocol
 
 from box import Box
+import pytest
 
-# from src.send_notification import send_notification
-# from src.config.config_main import load_config
-# from src.config.config_logging import logger
-# from src.garage_door import GarageDoor
+from src.config.config_main import config_cache, load_config
 import src.garage_door_status_monitor
-from src.exit_handler import exit_handler
+from src.clock import SimulatedClock
 
 from test.config.config_test_logging import history_test_logger as history_logger
 from src.config.config_logging import logger
 from test.config.config_test_main import test_cfg
-from test.send_notification_sim import send_notification
-from test.digital_input_dev_sim import DoorSensorSim as DoorSensor
+from test.digital_input_dev_sim import DoorSensorSim as DoorSensor, load_scenario
 
 
 class LoggerProto(Protocol):
@@ -26,20 +24,153 @@ class LoggerProto(Protocol):
         ...
 
 
-def test_garage_door() -> None:
-    global logger, history_logger, send_notification, DoorSensor
+class CountingDoorSensor(DoorSensor):
+    reads: int = 0
+
+    @property
+    def value(self) -> float:
+        CountingDoorSensor.reads += 1
+        return super().value
+
+
+class TransitionRecorder:
+    """An event sink that keeps each (door, action, timestamp)"""
+
+    def __init__(self) -> None:
+        self.transitions: list[tuple[str, str, dt.datetime]] = []
+
+    def record(self, door: str, action: str, timestamp: dt.datetime) -> None:
+        self.transitions.append((door, action, timestamp))
+
+
+def expected_alarms(max_run_time: int = 2200) -> list[tuple[int, str]]:
+    """
+    (seconds from start, message) of each alarm the scenario should send, at
+    its deadline: TIME_LIMIT after a door opens, then each limit
+    ALARM_INC_MULT times (plus ALARM_INC_ADD) the last, while it stays open
+    """
+    scenario = load_scenario(test_cfg.TEST.DIGITAL_INPUT_DATE_PATH)
+    alarms: list[tuple[int, str]] = []
+    for name, door_cfg in load_config().DOORS.items():
+        edges = scenario.edges(f"{name}_OPEN") + [(max_run_time, False)]
+        for (opened_at, opened), (closed_at, _) in zip(edges, edges[1:]):
+            if not opened:
+                continue
+            time_limit = door_cfg.OPEN.TIME_LIMIT
+            alarm_at = opened_at + time_limit
+            while alarm_at < closed_at:
+                minutes = int(alarm_at - opened_at) // 60
+                alarms.append((int(alarm_at), f"{name} open for {minutes} minutes"))
+                time_limit = (
+                    time_limit * door_cfg.OPEN.ALARM_INC_MULT
+                    + door_cfg.OPEN.ALARM_INC_ADD
+                )
+                alarm_at += time_limit
+    return sorted(alarms)
+
+
+def run_scenario(
+    max_run_time: int = 2200, DoorSensor: type = DoorSensor
+) -> list[tuple[int, str]]:
+    """Run the monitor over the digital input scenario on a simulated clock"""
+    clock = SimulatedClock()
+    alarms: list[tuple[int, str]] = []
+
+    def send_notification(*, msg: str, logger: LoggerProto) -> None:
+        logger.debug(msg=f"send_notification TEST MESSAGE: {msg}")
+        alarms.append((round(clock.monotonic()), msg))
+
     msg: str = f"Starting Garage Door Monitor Test"
     history_logger.info(msg=msg)
     logger.debug(msg=msg)
+    with pytest.raises(SystemExit):  # max_run_time reached
+        src.garage_door_status_monitor.garage_door_status_monitor(
+            DoorSensor=partial(DoorSensor, clock=clock),
+            send_notification=send_notification,
+            logger=logger,
+            history_logger=history_logger,
+            max_run_time=max_run_time,
+            clock=clock,
+        )
+    assert clock.monotonic() >= max_run_time
+    return alarms
 
-    src.garage_door_status_monitor.garage_door_status_monitor(
-        DoorSensor=DoorSensor,
-        send_notification=send_notification,
-        logger=logger,
-        history_logger=history_logger,
-        max_run_time=2200,
-    )
 
+def test_garage_door() -> None:
+    start_time = time.perf_counter()
+    alarms = run_scenario()
+    assert time.perf_counter() - start_time < 1
+    assert alarms == expected_alarms()
+
+
+def test_config_subscription_ends_with_the_monitor() -> None:
+    subscribers = list(config_cache._subscribers)
+    run_scenario(max_run_time=60)
+    run_scenario(max_run_time=60)
+    assert config_cache._subscribers == subscribers
+
+
+def test_adaptive_polling(monkeypatch) -> None:
+    reads: dict[str, int] = {}
+    for mode in ("poll", "adaptive"):
+        cfg = Box(load_config().to_dict())
+        cfg.APP.MONITOR_MODE = mode
+        cfg.APP.LOOP_DELAY = cfg.DOORS.TWO_CAR.POLL.FAST  # as quick to see a change
+        monkeypatch.setattr(src.garage_door_status_monitor, "load_config", lambda: cfg)
+        CountingDoorSensor.reads = 0
+        alarms = run_scenario(DoorSensor=CountingDoorSensor)
+        reads[mode] = CountingDoorSensor.reads
+    # Polling fast around each transition catches the door opening on time
+    assert alarms == expected_alarms()
+    assert reads["adaptive"] < reads["poll"] / 5
+
+
+def test_adaptive_polling_without_poll_config(monkeypatch) -> None:
+    cfg_dict = load_config().to_dict()
+    cfg_dict["APP"]["MONITOR_MODE"] = "adaptive"
+    del cfg_dict["DOORS"]["ONE_CAR"]["POLL"]  # read every APP.LOOP_DELAY
+    cfg = Box(cfg_dict, default_box=True, default_box_attr=None, frozen_box=True)
+    monkeypatch.setattr(src.garage_door_status_monitor, "load_config", lambda: cfg)
+    alarms = run_scenario()
+    expected = expected_alarms()
+    assert [alarm for alarm in alarms if "TWO_CAR" in alarm[1]] == [
+        alarm for alarm in expected if "TWO_CAR" in alarm[1]
+    ]
+    # ONE_CAR is seen opening up to a LOOP_DELAY late
+    one_car_alarm = next(alarm for alarm in alarms if "ONE_CAR" in alarm[1])
+    one_car_expected = next(alarm for alarm in expected if "ONE_CAR" in alarm[1])
+    assert 0 <= one_car_alarm[0] - one_car_expected[0] < cfg.APP.LOOP_DELAY
+
+
+def test_sensor_bank(monkeypatch) -> None:
+    cfg = Box(load_config().to_dict())
+    cfg.SENSOR_BANK.ENABLED = True  # no GPLEV0 here, read through the devices
+    monkeypatch.setattr(src.garage_door_status_monitor, "load_config", lambda: cfg)
+    assert run_scenario() == expected_alarms()
+
+
+def test_event_mode_stamps_debounced_transitions(monkeypatch) -> None:
+    cfg = Box(load_config().to_dict(), default_box=True, default_box_attr=None)
+    cfg.APP.MONITOR_MODE = "event"
+    cfg.SAMPLER.ENABLED = True
+    cfg.SAMPLER.FILTER = "debounce"  # the edge comes WINDOW samples after the change
+    monkeypatch.setattr(src.garage_door_status_monitor, "load_config", lambda: cfg)
+    recorder = TransitionRecorder()
+    monkeypatch.setattr(
+        src.garage_door_status_monitor, "_create_event_sinks", lambda: [recorder]
+    )
+    run_scenario(max_run_time=600)
 
-if __name__ == "__main__":
-    test_garage_door()
+    started_at = recorder.transitions[0][2]  # closed, when the monitor started
+    scenario = load_scenario(test_cfg.TEST.DIGITAL_INPUT_DATE_PATH)
+    for name in cfg.DOORS:
+        opened_at = next(
+            timestamp
+            for door, action, timestamp in recorder.transitions
+            if door == name and action == "opened"
+        )
+        # The sim rounds to whole seconds, so a door opens half a second early
+        changed_at = scenario.edges(f"{name}_OPEN")[0][0] - 0.5
+        stamp_delay = round((opened_at - started_at).total_seconds() - changed_at, 6)
+        # Stamped with the first sample of the new value, not the edge
+        assert 0 <= stamp_delay <= 1 / cfg.SAMPLER.RATE
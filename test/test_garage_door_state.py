@@ -0,0 +1,94 @@
+import datetime as dt
+import time
+
+from src.clock import SimulatedClock
+from src.garage_door import GarageStatus
+from test.doubles import make_door
+
+
+def test_midstate_returns_without_waiting() -> None:
+    door, history_logger = make_door(open_value=False, closed_value=True)
+    assert door.state == GarageStatus.closed
+
+    door.closed_sensor.value = False
+    start_time = time.monotonic()
+    assert door.state == GarageStatus.un_closed
+    assert str(door) == "DOOR:TWO_CAR:un_closed"
+    assert not door.door_open_longer_than_time_limit
+    assert time.monotonic() - start_time < 1
+    assert door.seconds_until_settled is not None
+    assert history_logger.messages[-1] == "DOOR:TWO_CAR:closed"
+
+
+def test_midstate_settles_to_unknown_on_later_tick() -> None:
+    door, history_logger = make_door(open_value=True, closed_value=False)
+    assert door.state == GarageStatus.open
+    door.open_sensor.value = False
+
+    start_time = time.monotonic()
+    assert door.update_state(at_time=start_time) == GarageStatus.un_open
+    later_time = start_time + door.app_cfg.DOOR_MIDSTATE_RE_EVAL_TIME
+    assert door.update_state(at_time=later_time) == GarageStatus.unknown
+    assert door.status_change_monotonic == later_time
+    assert door.seconds_until_settled is None
+    assert history_logger.messages[-1] == "DOOR:TWO_CAR:unknown"
+
+
+def test_midstate_resolves_without_transition() -> None:
+    door, history_logger = make_door(open_value=True, closed_value=False)
+    assert door.state == GarageStatus.open
+    open_time = door.status_change_time
+
+    door.open_sensor.value = False
+    assert door.state == GarageStatus.un_open
+    door.open_sensor.value = True
+    assert door.state == GarageStatus.open
+    assert door.status_change_time == open_time
+    assert door.seconds_until_settled is None
+    assert history_logger.messages[-1] == "DOOR:TWO_CAR:opened"
+
+
+def test_durations_ignore_wall_clock_steps() -> None:
+    clock = SimulatedClock()
+    door, _ = make_door(open_value=True, closed_value=False, clock=clock)
+    assert door.state == GarageStatus.open
+    opened_time = door.status_change_time
+
+    clock.sleep(200)
+    clock.start -= dt.timedelta(hours=1)  # NTP steps the wall clock back
+    assert door.seconds_at_state == 200
+    assert door.status_change_time == opened_time
+    clock.sleep(door.door_cfg.OPEN.TIME_LIMIT - 200)
+    assert door.door_open_longer_than_time_limit
+
+
+def test_no_alarm_deadline_while_leaving_open() -> None:
+    clock = SimulatedClock()
+    door, _ = make_door(open_value=True, closed_value=False, clock=clock)
+    assert door.state == GarageStatus.open
+    clock.sleep(door.door_cfg.OPEN.TIME_LIMIT)
+
+    door.open_sensor.value = False
+    assert door.state == GarageStatus.un_open
+    # Else a loop waking at the alarm deadline would spin until it settles
+    assert door.alarm_deadline is None
+    assert door.next_deadline == clock.monotonic() + (
+        door.app_cfg.DOOR_MIDSTATE_RE_EVAL_TIME
+    )
+    door.open_sensor.value = True
+    assert door.door_open_longer_than_time_limit
+
+
+def test_late_check_sends_one_alarm() -> None:
+    clock = SimulatedClock()
+    door, _ = make_door(open_value=True, closed_value=False, clock=clock)
+    assert door.state == GarageStatus.open
+    time_limit = door.door_cfg.OPEN.TIME_LIMIT
+
+    clock.sleep(5 * time_limit)  # e.g. the monitor was suspended
+    assert door.door_open_longer_than_time_limit
+    assert not door.door_open_longer_than_time_limit
+    # The next alarm one escalated limit after the last limit before now
+    assert door.alarm_deadline == clock.monotonic() - time_limit + (
+        door.open_time_limit
+    )
@@ -0,0 +1,153 @@
+import os
+
+import pytest
+
+from src.history_cache import (
+    ColumnarHistoryCache,
+    IncrementalHistoryLoader,
+    load_cached_history,
+)
+from src.history_parser import merge_door_histories, parse_history_file
+from src.plot_garage_door_status import clean_garage_door_history
+from test.doubles import assert_same_history, write_history
+
+
+def full_parse(history_filepaths: list[str]):
+    return merge_door_histories(
+        [parse_history_file(history_filepath) for history_filepath in history_filepaths]
+    )
+
+
+def test_incremental_loader_parses_only_appended_bytes(tmp_path) -> None:
+    history_filepath = tmp_path / "garage_door_status_history.log"
+    cache_path = str(tmp_path / "cache" / "history_offsets.pkl")
+    write_history(history_filepath, n_events=1000, seed=1)
+    full_size = os.path.getsize(history_filepath)
+
+    first = IncrementalHistoryLoader(cache_path=cache_path)
+    assert_same_history(
+        first.load([str(history_filepath)]), full_parse([str(history_filepath)])
+    )
+    assert first.bytes_parsed == full_size
+
+    appended = "2030-01-01 00:00:00,000:INFO:DOOR:TWO_CAR:opened\n"
+    with open(history_filepath, "a") as fp:
+        fp.write(appended + "2030-01-01 00:01:00,000:INFO:DOOR:TWO_")  # mid-write
+
+    second = IncrementalHistoryLoader(cache_path=cache_path)
+    door_history = second.load([str(history_filepath)])
+    assert second.bytes_parsed == len(appended)
+    assert door_history["TWO_CAR"]["position"].iloc[-1] == "opened"
+
+    with open(history_filepath, "a") as fp:
+        fp.write("CAR:closed\n")
+    third = IncrementalHistoryLoader(cache_path=cache_path)
+    assert_same_history(
+        third.load([str(history_filepath)]), full_parse([str(history_filepath)])
+    )
+    assert third.bytes_parsed == len(
+        "2030-01-01 00:01:00,000:INFO:DOOR:TWO_CAR:closed\n"
+    )
+
+
+def test_incremental_loader_rereads_rotated_files(tmp_path) -> None:
+    history_filepath = tmp_path / "garage_door_status_history.log"
+    archive_filepath = tmp_path / "garage_door_status_history_2023-08.log"
+    cache_path = str(tmp_path / "history_offsets.pkl")
+    write_history(history_filepath, n_events=500, seed=1)
+    IncrementalHistoryLoader(cache_path=cache_path).load([str(history_filepath)])
+
+    # Monthly archive: the log is renamed and a new, shorter one started
+    os.rename(history_filepath, archive_filepath)
+    write_history(history_filepath, n_events=20, seed=2)
+    history_filepaths = [str(archive_filepath), str(history_filepath)]
+
+    loader = IncrementalHistoryLoader(cache_path=cache_path, workers=2)
+    assert_same_history(loader.load(history_filepaths), full_parse(history_filepaths))
+    assert loader.bytes_parsed == sum(map(os.path.getsize, history_filepaths))
+
+    # Truncated and rewritten past the old offset with different content
+    write_history(history_filepath, n_events=600, seed=3)
+    loader = IncrementalHistoryLoader(cache_path=cache_path)
+    assert_same_history(loader.load(history_filepaths), full_parse(history_filepaths))
+    assert loader.bytes_parsed == os.path.getsize(history_filepath)
+
+
+def test_columnar_cache_serves_unchanged_files(tmp_path, monkeypatch) -> None:
+    history_filepath = tmp_path / "garage_door_status_history.log"
+    write_history(history_filepath, n_events=1000, seed=4)
+    history_filepaths = [str(history_filepath)]
+    cache_folder = str(tmp_path / "cache")
+
+    cold = load_cached_history(history_filepaths, cache_folder=cache_folder)
+    assert_same_history(cold, full_parse(history_filepaths))
+
+    def no_parsing(*args, **kwargs):
+        raise AssertionError("warm load parsed the history")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(IncrementalHistoryLoader, "load", no_parsing)
+        patch.setattr(IncrementalHistoryLoader, "update", no_parsing)
+        warm = load_cached_history(history_filepaths, cache_folder=cache_folder)
+    assert_same_history(warm, cold)
+    assert list(clean_garage_door_history(warm)) == list(cold)  # frames are usable
+
+    with open(history_filepath, "a") as fp:
+        fp.write("2030-01-01 00:00:00,000:INFO:DOOR:ONE_CAR:opened\n")
+    updated = load_cached_history(history_filepaths, cache_folder=cache_folder)
+    assert_same_history(updated, full_parse(history_filepaths))
+
+
+def test_columnar_cache_appends_appended_rows(tmp_path, monkeypatch) -> None:
+    history_filepath = tmp_path / "garage_door_status_history.log"
+    write_history(history_filepath, n_events=1000, seed=6)
+    history_filepaths = [str(history_filepath)]
+    cache_folder = str(tmp_path / "cache")
+    load_cached_history(history_filepaths, cache_folder=cache_folder)
+    timestamp_path = os.path.join(cache_folder, "columnar", "rows", "timestamp.bin")
+    cached_size = os.path.getsize(timestamp_path)
+
+    def no_rebuild(*args, **kwargs):
+        raise AssertionError("an append rebuilt the cache")
+
+    appended = (
+        "2030-01-01 00:00:00,000:INFO:DOOR:ONE_CAR:opened\n"
+        "2000-01-01 00:00:00,000:INFO:DOOR:TWO_CAR:closed\n"  # clock was wrong
+    )
+    with open(history_filepath, "a") as fp:
+        fp.write(appended)
+    with monkeypatch.context() as patch:
+        patch.setattr(IncrementalHistoryLoader, "history", no_rebuild)
+        patch.setattr(ColumnarHistoryCache, "write", no_rebuild)
+        updated = load_cached_history(history_filepaths, cache_folder=cache_folder)
+    assert_same_history(updated, full_parse(history_filepaths))
+    assert os.path.getsize(timestamp_path) == cached_size + 2 * 8
+
+    loader = IncrementalHistoryLoader(
+        cache_path=os.path.join(cache_folder, "history_offsets.pkl")
+    )
+    assert_same_history(loader.load(history_filepaths), updated)
+    assert loader.bytes_parsed == 0
+
+
+def test_columnar_cache_exports_arrow_ipc(tmp_path) -> None:
+    pa = pytest.importorskip("pyarrow")
+    history_filepath = tmp_path / "garage_door_status_history.log"
+    write_history(history_filepath, n_events=200, seed=5)
+    cache_folder = str(tmp_path / "cache")
+    door_status_history = load_cached_history(
+        [str(history_filepath)], cache_folder=cache_folder
+    )
+
+    arrow_path = str(tmp_path / "history.arrow")
+    ColumnarHistoryCache(os.path.join(cache_folder, "columnar")).export_arrow_ipc(
+        arrow_path
+    )
+
+    table = pa.ipc.open_file(pa.memory_map(arrow_path)).read_all()
+    assert table.column_names == ["timestamp", "door", "state"]
+    assert table.num_rows == sum(map(len, door_status_history.values()))
+    two_car = table.filter(pa.compute.equal(table["door"].cast(pa.string()), "TWO_CAR"))
+    assert two_car["state"].cast(pa.string()).to_pylist() == (
+        door_status_history["TWO_CAR"]["position"].tolist()
+    )
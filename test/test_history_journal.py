@@ -0,0 +1,113 @@
+import datetime as dt
+
+import numpy as np
+
+from src.garage_door import GarageStatus
+from src.history_journal import (
+    HEADER_BYTES,
+    RECORD_DTYPE,
+    HistoryJournal,
+    JournalReader,
+    _header,
+)
+
+TIME_ZONE: str = "America/Detroit"
+
+
+def test_journal_round_trip(tmp_path) -> None:
+    journal_path = str(tmp_path / "history.journal")
+    journal = HistoryJournal(journal_path=journal_path, time_zone=TIME_ZONE)
+    start = dt.datetime(2023, 8, 9, 15, 3, 3, 116000)
+    journal.record("TWO_CAR", "opened", start)
+    journal.record("ONE_CAR", "closed", start + dt.timedelta(seconds=5))
+    journal.record("TWO_CAR", "unknown", start + dt.timedelta(seconds=9))
+    journal.close()
+
+    reader = JournalReader(journal_path=journal_path)
+    assert reader.door_names == ["TWO_CAR", "ONE_CAR"]
+    assert reader.records["sequence"].tolist() == [0, 1, 2]
+    assert reader.records["status"].tolist() == [
+        GarageStatus.open.value,
+        GarageStatus.closed.value,
+        GarageStatus.unknown.value,
+    ]
+
+    door_status_history = reader.door_status_history(time_zone=TIME_ZONE)
+    assert door_status_history["TWO_CAR"]["position"].tolist() == ["open", "unknown"]
+    assert door_status_history["TWO_CAR"]["datetime"].tolist() == [
+        start,
+        start + dt.timedelta(seconds=9),
+    ]
+    assert door_status_history["ONE_CAR"]["position"].tolist() == ["closed"]
+
+
+def test_partial_last_record_is_ignored_and_overwritten(tmp_path) -> None:
+    journal_path = str(tmp_path / "history.journal")
+    journal = HistoryJournal(journal_path=journal_path, time_zone=TIME_ZONE)
+    journal.record("TWO_CAR", "opened", dt.datetime(2023, 8, 9, 15, 3, 3))
+    journal.close()
+    with open(journal_path, "ab") as fp:
+        fp.write(b"\x01\x02\x03")  # crashed mid-write
+
+    assert len(JournalReader(journal_path=journal_path).records) == 1
+    journal = HistoryJournal(journal_path=journal_path, time_zone=TIME_ZONE)
+    journal.record("TWO_CAR", "closed", dt.datetime(2023, 8, 9, 15, 4, 3))
+    journal.close()
+
+    records = JournalReader(journal_path=journal_path).records
+    assert records["sequence"].tolist() == [0, 1]
+    assert records["status"].tolist() == [
+        GarageStatus.open.value,
+        GarageStatus.closed.value,
+    ]
+
+
+def test_scanning_records(tmp_path) -> None:
+    # How fast a scan of millions is, is the history_journal.scan benchmark's
+    journal_path = tmp_path / "history.journal"
+    n_records = 10_000
+    records = np.zeros(n_records, dtype=RECORD_DTYPE)
+    records["timestamp"] = 1_690_000_000_000_000 + np.arange(n_records) * 60_000_000
+    records["door"] = np.arange(n_records) % 2
+    records["status"] = np.where(np.arange(n_records) % 4 < 2, 1, 5)
+    records["sequence"] = np.arange(n_records)
+    with open(journal_path, "wb") as fp:
+        fp.write(_header())
+        records.tofile(fp)
+    assert journal_path.stat().st_size == HEADER_BYTES + n_records * 16
+
+    reader = JournalReader(journal_path=str(journal_path))
+    counts = np.bincount(reader.records["status"], minlength=7)
+
+    assert counts[1] == counts[5] == n_records // 2
+    assert reader.records["timestamp"].max() == records["timestamp"][-1]
+
+
+def test_between_with_records_out_of_time_order(tmp_path) -> None:
+    journal_path = str(tmp_path / "history.journal")
+    journal = HistoryJournal(journal_path=journal_path, time_zone=TIME_ZONE)
+    start = dt.datetime(2023, 8, 9, 15, 0)
+    for door, action, seconds in (
+        ("TWO_CAR", "opened", 30),
+        ("ONE_CAR", "opened", 10),  # back-dated to its sensor edge
+        ("TWO_CAR", "closed", 50),
+        ("ONE_CAR", "closed", 40),
+        ("TWO_CAR", "unknown", 5),
+    ):
+        journal.record(door, action, start + dt.timedelta(seconds=seconds))
+    journal.close()
+
+    reader = JournalReader(journal_path=journal_path)
+    records = reader.between(
+        start=start + dt.timedelta(seconds=10),
+        end=start + dt.timedelta(seconds=50),
+        time_zone=TIME_ZONE,
+    )
+    assert records["sequence"].tolist() == [1, 0, 3]
+
+    door_status_history = reader.door_status_history(time_zone=TIME_ZONE)
+    assert door_status_history["TWO_CAR"]["position"].tolist() == [
+        "unknown",
+        "open",
+        "closed",
+    ]
@@ -0,0 +1,124 @@
+import datetime as dt
+import gzip
+import os
+
+import pandas as pd
+
+from src.history_parser import (
+    DOORS,
+    EXCLUDED_ACTIONS,
+    _history_file_size,
+    merge_door_histories,
+    parse_history_file,
+    parse_history_ranges,
+    split_history_range,
+)
+from test.doubles import assert_same_history, write_history
+
+
+def load_history_per_line(history_filepaths: list[str]) -> dict[str, pd.DataFrame]:
+    """The original line by line loader, kept as the reference"""
+    door_status_history: dict[str, pd.DataFrame] = {}
+    for history_filepath in history_filepaths:
+        with open(file=history_filepath) as file:
+            for a_line in file:
+                if a_line.endswith("\n"):
+                    a_line = a_line[:-1]
+                line_list = a_line.split(":")
+                if (
+                    len(line_list) < 7
+                    or line_list[5] not in DOORS
+                    or line_list[6] in EXCLUDED_ACTIONS
+                ):
+                    continue
+                door_name = line_list[5]
+                if door_name not in door_status_history:
+                    door_status_history[door_name] = pd.DataFrame(
+                        columns=["datetime", "position"]
+                    )
+                try:
+                    timestamp = dt.datetime.strptime(
+                        ":".join(line_list[:3]), "%Y-%m-%d %H:%M:%S,%f"
+                    )
+                except ValueError:
+                    continue
+                new_status = pd.DataFrame(
+                    {"datetime": [timestamp], "position": [line_list[6]]}
+                )
+                door_status_history[door_name] = pd.concat(
+                    [door_status_history[door_name], new_status], ignore_index=True
+                )
+    return door_status_history
+
+
+def test_parse_history_matches_per_line_loader(tmp_path) -> None:
+    history_filepaths = []
+    for seed in range(3):
+        history_filepath = tmp_path / f"garage_door_status_history_{seed}.log"
+        write_history(history_filepath, n_events=500, seed=seed)
+        history_filepaths.append(str(history_filepath))
+
+    actual = merge_door_histories(
+        [parse_history_file(history_filepath) for history_filepath in history_filepaths]
+    )
+
+    # The files overlap in time, merged in datetime order
+    expected = {
+        door_name: door_frame.sort_values(
+            by="datetime", kind="stable", ignore_index=True
+        )
+        for door_name, door_frame in load_history_per_line(history_filepaths).items()
+    }
+    assert_same_history(actual, expected)
+
+
+def test_parse_history_file_without_extra_fields(tmp_path) -> None:
+    history_filepath = tmp_path / "garage_door_status_history.log"
+    history_filepath.write_text(
+        "2023-08-09 15:00:56,756:INFO:Starting Garage Door Monitor\n"
+        "2023-08-09 15:03:03,116:INFO:DOOR:TWO_CAR:closed\n"
+    )
+    door_history = parse_history_file(str(history_filepath))
+    assert door_history["TWO_CAR"]["position"].tolist() == ["closed"]
+
+    history_filepath.write_text("2023-08-09 15:00:56,756:INFO:Stopping\n")
+    assert parse_history_file(str(history_filepath)) == {}
+
+
+def test_parse_history_ranges_in_worker_processes(tmp_path) -> None:
+    history_filepaths = []
+    for seed in range(3):
+        history_filepath = tmp_path / f"garage_door_status_history_{seed}.log"
+        write_history(history_filepath, n_events=2000, seed=seed)
+        history_filepaths.append(str(history_filepath))
+    history_ranges = [
+        (history_filepath, 0, os.path.getsize(history_filepath))
+        for history_filepath in history_filepaths
+    ]
+
+    parts = split_history_range(*history_ranges[0], range_bytes=10_000)
+    assert len(parts) > 5
+    assert parts[0][0] == 0 and parts[-1][1] == history_ranges[0][2]
+    with open(history_filepaths[0], "rb") as fp:
+        for start, _ in parts[1:]:
+            fp.seek(start - 1)
+            assert fp.read(1) == b"\n"
+
+    door_histories = parse_history_ranges(history_ranges, workers=3, range_bytes=10_000)
+    for history_filepath, door_history in zip(history_filepaths, door_histories):
+        assert_same_history(door_history, parse_history_file(history_filepath))
+
+
+def test_gzipped_history_range_is_parsed_whole(tmp_path) -> None:
+    history_filepath = tmp_path / "garage_door_status_history.log"
+    write_history(history_filepath, n_events=2000)
+    gz_filepath = tmp_path / "garage_door_status_history.log.1.gz"
+    with gzip.open(gz_filepath, "wb") as fp:
+        fp.write(history_filepath.read_bytes())
+
+    size = _history_file_size(str(gz_filepath))
+    assert size == history_filepath.stat().st_size > gz_filepath.stat().st_size
+    assert_same_history(
+        parse_history_ranges([(str(gz_filepath), 0, size)], workers=1)[0],
+        parse_history_file(str(history_filepath)),
+    )
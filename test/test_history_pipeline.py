@@ -0,0 +1,99 @@
+import datetime as dt
+import logging
+import tracemalloc
+
+import pandas as pd
+
+from src.history_parser import merge_door_histories, parse_history_file
+from src.history_pipeline import (
+    collect_garage_door_history,
+    stream_garage_door_history,
+    summarize_garage_door_history,
+)
+from src.plot_garage_door_status import clean_garage_door_history
+from test.doubles import write_history
+
+MAX_TRANSITION_TIME = dt.timedelta(seconds=60)
+
+
+def in_memory_history(history_filepaths: list[str]) -> dict[str, pd.DataFrame]:
+    return clean_garage_door_history(
+        merge_door_histories(
+            [
+                parse_history_file(history_filepath)
+                for history_filepath in history_filepaths
+            ]
+        )
+    )
+
+
+def write_history_files(tmp_path, n_events: int) -> list[str]:
+    history_filepaths = []
+    for seed in range(3):  # overlapping files, one with duplicate lines
+        history_filepath = tmp_path / f"garage_door_status_history_{seed}.log"
+        write_history(history_filepath, n_events=n_events, seed=seed)
+        history_filepaths.append(str(history_filepath))
+    with open(history_filepaths[-1], "a") as fp:
+        head = open(history_filepaths[0]).read()[:5000]
+        fp.write(head[: head.rfind("\n") + 1])
+        # Clock set back, e.g. a reboot before the time was synchronized
+        fp.write("2023-08-01 00:00:00,000:INFO:DOOR:TWO_CAR:closed\n")
+        fp.write("2023-08-01 00:05:00,000:INFO:DOOR:TWO_CAR:opened\n")
+        # Times logged again with different positions: the first logged stays
+        fp.write("2023-08-01 00:05:00,000:INFO:DOOR:TWO_CAR:closed\n")
+        for line in head.splitlines()[::40]:
+            fp.write(line.replace(":opened", ":unknown").replace(":closed", ":opened"))
+            fp.write("\n")
+    return history_filepaths
+
+
+def test_stream_matches_in_memory_path(tmp_path) -> None:
+    history_filepaths = write_history_files(tmp_path, n_events=3000)
+    chunks = list(
+        stream_garage_door_history(
+            history_filepaths=history_filepaths,
+            max_transition_time=MAX_TRANSITION_TIME,
+            chunk_rows=250,
+            block_bytes=10_000,
+        )
+    )
+    assert max(len(chunk) for _, chunk in chunks) <= 250
+
+    streamed = collect_garage_door_history(chunks)
+    expected = in_memory_history(history_filepaths)
+    assert list(streamed) == list(expected)
+    for door_name, expected_frame in expected.items():
+        pd.testing.assert_frame_equal(
+            streamed[door_name], expected_frame, check_dtype=False
+        )
+
+    summary = summarize_garage_door_history(iter(chunks))
+    assert summary["TWO_CAR"]["rows"] == len(expected["TWO_CAR"])
+    assert summary["TWO_CAR"]["first"] == dt.datetime(2023, 8, 1)
+
+
+def peak_memory(history_filepaths: list[str]) -> int:
+    logging.disable(logging.DEBUG)  # pytest keeps every captured record
+    tracemalloc.start()
+    for _ in stream_garage_door_history(
+        history_filepaths=history_filepaths,
+        max_transition_time=MAX_TRANSITION_TIME,
+        chunk_rows=1000,
+        block_bytes=50_000,
+    ):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    logging.disable(logging.NOTSET)
+    return peak
+
+
+def test_peak_memory_does_not_grow_with_history(tmp_path) -> None:
+    small_folder, large_folder = tmp_path / "small", tmp_path / "large"
+    small_folder.mkdir()
+    large_folder.mkdir()
+    small_history_filepaths = write_history_files(small_folder, n_events=5_000)
+    peak_memory(small_history_filepaths)  # lazy imports and caches
+    small_peak = peak_memory(small_history_filepaths)
+    large_peak = peak_memory(write_history_files(large_folder, n_events=40_000))
+    assert large_peak < 1.5 * small_peak
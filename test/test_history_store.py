@@ -0,0 +1,109 @@
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+from src.clock import SimulatedClock
+from src.config.config_main import load_config
+from src.garage_door import GarageDoor, GarageStatus
+from src.history_store import SQLiteHistoryStore
+from test.doubles import ListLogger, SensorStub
+
+TIME_ZONE: str = "America/Detroit"
+
+
+def make_store(tmp_path, **kwargs) -> SQLiteHistoryStore:
+    return SQLiteHistoryStore(
+        db_path=str(tmp_path / "history.sqlite3"), time_zone=TIME_ZONE, **kwargs
+    )
+
+
+def test_records_are_written_in_batches(tmp_path) -> None:
+    store = make_store(tmp_path, batch_size=3, flush_interval=60)
+    start = dt.datetime(2023, 8, 9, 15, 3, 3)
+    store.record("TWO_CAR", "opened", start)
+    store.record("TWO_CAR", "closed", start + dt.timedelta(minutes=1))
+    assert store.latest_state("TWO_CAR") is None  # still buffered
+
+    store.record("ONE_CAR", "opened", start + dt.timedelta(minutes=2))
+    assert store.latest_state("TWO_CAR") == (
+        start + dt.timedelta(minutes=1),
+        "closed",
+    )
+    store.close()
+
+
+def test_buffered_records_are_flushed_after_interval(tmp_path) -> None:
+    clock = SimulatedClock()
+    store = make_store(tmp_path, batch_size=50, flush_interval=5, clock=clock)
+    store.record("TWO_CAR", "opened", dt.datetime(2023, 8, 9, 15, 3, 3))
+    clock.sleep(4)
+    store.record("TWO_CAR", "closed", dt.datetime(2023, 8, 9, 15, 3, 7))
+    assert store.count_by_state("TWO_CAR") == {}
+    clock.sleep(1)  # flush_interval after the first
+    assert store.count_by_state("TWO_CAR") == {"opened": 1, "closed": 1}
+
+    store.record("TWO_CAR", "opened", dt.datetime(2023, 8, 9, 15, 3, 8))
+    clock.sleep(2)
+    store.flush()
+    store.record("TWO_CAR", "closed", dt.datetime(2023, 8, 9, 15, 3, 10))
+    clock.sleep(4)  # the flushed batch's timer leaves this one be
+    assert store.count_by_state("TWO_CAR") == {"opened": 2, "closed": 1}
+    clock.sleep(1)
+    assert store.count_by_state("TWO_CAR") == {"opened": 2, "closed": 2}
+    store.close()
+
+
+def test_range_latest_and_counts(tmp_path) -> None:
+    store = make_store(tmp_path)
+    rng = np.random.default_rng(seed=3)
+    datetimes = pd.Series(
+        pd.Timestamp("2019-01-01")
+        + pd.to_timedelta(np.sort(rng.integers(0, 5 * 365 * 86400, 200_000)), "s")
+    ).astype("datetime64[us]")
+    datetimes = datetimes[datetimes.dt.hour != 2].reset_index(drop=True)  # DST gaps
+    positions = rng.choice(["opened", "closed", "unknown"], size=len(datetimes))
+    history = pd.DataFrame({"datetime": datetimes, "position": positions})
+    store.record_many("TWO_CAR", history)
+    store.record_many("ONE_CAR", history.iloc[:10])
+
+    start, end = dt.datetime(2021, 3, 1), dt.datetime(2022, 3, 1)
+    # How fast the indexed query is, is the history_store.events_between benchmark's
+    in_range = store.events_between("TWO_CAR", start=start, end=end)
+
+    expected = history[(history["datetime"] >= start) & (history["datetime"] < end)]
+    pd.testing.assert_frame_equal(
+        in_range, expected.reset_index(drop=True), check_dtype=False
+    )
+
+    assert store.latest_state("TWO_CAR") == (
+        datetimes.iloc[-1].to_pydatetime(),
+        positions[-1],
+    )
+    assert store.count_by_state("TWO_CAR", start=start, end=end) == (
+        expected["position"].value_counts().to_dict()
+    )
+    assert store.doors() == ["ONE_CAR", "TWO_CAR"]
+    store.close()
+
+
+def test_garage_door_transitions_reach_the_store(tmp_path) -> None:
+    store = make_store(tmp_path, batch_size=1)
+    door = GarageDoor(
+        name="TWO_CAR",
+        open_sensor=SensorStub(False),
+        closed_sensor=SensorStub(True),
+        load_config=load_config,
+        debug_logger=ListLogger(),
+        history_logger=ListLogger(),
+        event_sinks=[store],
+    )
+    assert door.state == GarageStatus.closed
+    door.closed_sensor.value = False
+    door.open_sensor.value = True
+    assert door.state == GarageStatus.open
+
+    history = store.events_between("TWO_CAR")
+    assert history["position"].tolist() == ["closed", "opened"]
+    assert history["datetime"].iloc[-1] == door.status_change_time.replace(tzinfo=None)
+    store.close()
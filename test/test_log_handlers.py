@@ -0,0 +1,193 @@
+import datetime as dt
+import gzip
+import io
+import logging
+import os
+import threading
+import time
+
+from src.config.log_handlers import (
+    BatchFlushStreamHandler,
+    BatchingQueueListener,
+    CompressingRotatingFileHandler,
+)
+from src.history_cache import IncrementalHistoryLoader
+from src.history_parser import merge_door_histories, parse_history_file
+from src.history_pipeline import collect_garage_door_history, stream_garage_door_history
+from test.doubles import assert_same_history, write_history
+
+
+def make_logger(
+    log_filepath: str, max_bytes: int, backup_count: int
+) -> tuple[logging.Logger, CompressingRotatingFileHandler]:
+    handler = CompressingRotatingFileHandler(
+        filename=log_filepath, maxBytes=max_bytes, backupCount=backup_count
+    )
+    handler.setFormatter(logging.Formatter(fmt="{message}", style="{"))
+    logger = logging.getLogger(f"test rotation {log_filepath}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+    return logger, handler
+
+
+def history_files(folder) -> list[str]:
+    return sorted(
+        os.path.join(folder, fn)
+        for fn in os.listdir(folder)
+        if fn.startswith("garage_door_status_history")
+    )
+
+
+def test_rotates_at_max_bytes_and_compresses(tmp_path) -> None:
+    source_filepath = tmp_path / "source.log"
+    write_history(source_filepath, n_events=2000, seed=1)
+    lines = source_filepath.read_text().splitlines()
+    log_filepath = str(tmp_path / "garage_door_status_history.log")
+    logger, handler = make_logger(log_filepath, max_bytes=20_000, backup_count=0)
+    for line in lines:
+        logger.info(line)
+    handler.close()
+
+    archives = [fn for fn in history_files(tmp_path) if fn.endswith(".gz")]
+    assert len(archives) > 3
+    assert not [fn for fn in os.listdir(tmp_path) if fn.startswith(".")]
+    assert os.path.getsize(log_filepath) <= 20_000
+    for archive in archives:
+        with gzip.open(archive) as fp:
+            assert len(fp.read()) <= 20_000
+
+    # Archives and the live log hold every line, in order
+    logged_lines: list[str] = []
+    for history_filepath in archives + [log_filepath]:
+        with gzip.open(history_filepath) if history_filepath.endswith(".gz") else open(
+            history_filepath, "rb"
+        ) as fp:
+            logged_lines.extend(fp.read().decode().splitlines())
+    assert logged_lines == lines
+
+    # The loaders read the archives as they are
+    expected = parse_history_file(str(source_filepath))
+    loaded = IncrementalHistoryLoader(
+        cache_path=str(tmp_path / "cache" / "history_offsets.pkl")
+    ).load(archives + [log_filepath])
+    assert_same_history(loaded, expected)
+    assert_same_history(
+        merge_door_histories(
+            [parse_history_file(history_filepath) for history_filepath in archives]
+            + [parse_history_file(log_filepath)]
+        ),
+        expected,
+    )
+    assert list(
+        collect_garage_door_history(
+            stream_garage_door_history(
+                archives + [log_filepath], max_transition_time=dt.timedelta(minutes=1)
+            )
+        )
+    ) == list(expected)
+
+    # Unchanged archives aren't decompressed again
+    loader = IncrementalHistoryLoader(
+        cache_path=str(tmp_path / "cache" / "history_offsets.pkl")
+    )
+    assert_same_history(loader.load(archives + [log_filepath]), expected)
+    assert loader.bytes_parsed == 0
+
+
+def test_keeps_backup_count_archives(tmp_path) -> None:
+    log_filepath = str(tmp_path / "logfile.log")
+    logger, handler = make_logger(log_filepath, max_bytes=1_000, backup_count=2)
+    for line_number in range(500):
+        logger.info(f"debug line {line_number:05d}")
+    handler.close()
+
+    archives = sorted(fn for fn in os.listdir(tmp_path) if fn.endswith(".gz"))
+    assert len(archives) == 2
+    with gzip.open(tmp_path / archives[-1]) as fp:
+        last_archived = fp.read().decode().splitlines()[-1]
+    with open(log_filepath) as fp:
+        first_live = fp.readline().strip()
+    assert int(first_live.split()[-1]) == int(last_archived.split()[-1]) + 1
+
+
+def test_interrupted_rotation_is_finished_on_start(tmp_path) -> None:
+    log_filepath = str(tmp_path / "logfile.log")
+    rolled_filepath = tmp_path / ".logfile.log.20230809-150303"
+    rolled_filepath.write_text("rolled over, not yet compressed\n")
+    (tmp_path / ".logfile.log.20230809-150303.gz.123.tmp").write_bytes(b"\x1f")
+
+    handler = CompressingRotatingFileHandler(filename=log_filepath, maxBytes=1_000)
+    handler.close()
+
+    assert sorted(os.listdir(tmp_path)) == [
+        "logfile.log",
+        "logfile.log.20230809-150303.gz",
+    ]
+    with gzip.open(tmp_path / "logfile.log.20230809-150303.gz") as fp:
+        assert fp.read() == b"rolled over, not yet compressed\n"
+
+
+class CountingStreamHandler(BatchFlushStreamHandler):
+    def __init__(self, emit_delay: float = 0.0) -> None:
+        super().__init__(stream=io.StringIO())
+        self.emit_delay = emit_delay
+        self.flushes: int = 0
+        self.emit_threads: set[str] = set()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        time.sleep(self.emit_delay)  # e.g. an SD card write stall
+        self.emit_threads.add(threading.current_thread().name)
+        super().emit(record)
+
+    def flush_batch(self) -> None:
+        self.flushes += 1
+        super().flush_batch()
+
+
+def make_queued_logger(
+    name: str, handler: logging.Handler, **kwargs
+) -> tuple[logging.Logger, BatchingQueueListener]:
+    logger = logging.getLogger(f"test queue {name}")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    logger.addHandler(handler)
+    return logger, BatchingQueueListener(logger=logger, **kwargs).start()
+
+
+def test_queued_logging_does_not_wait_for_handlers() -> None:
+    handler = CountingStreamHandler(emit_delay=0.05)
+    logger, log_listener = make_queued_logger(
+        "stall", handler, flush_interval=60, batch_size=1000
+    )
+    start_time = time.monotonic()
+    for record_number in range(20):
+        logger.debug(f"record {record_number}")
+    assert time.monotonic() - start_time < 0.05
+
+    log_listener.stop()
+    assert handler.stream.getvalue().splitlines() == [
+        f"record {record_number}" for record_number in range(20)
+    ]
+    assert handler.emit_threads == {"log-test queue stall"}
+    assert logger.handlers == [handler]  # back to writing directly
+    assert not handler.batch_flush
+
+
+def test_queued_logging_flushes_in_batches() -> None:
+    handler = CountingStreamHandler()
+    handler.setLevel(logging.INFO)
+    logger, log_listener = make_queued_logger(
+        "batches", handler, flush_interval=0.2, batch_size=100
+    )
+    logger.info("first record after a quiet spell")
+    time.sleep(0.1)
+    assert handler.flushes == 1  # written at once
+
+    for record_number in range(250):
+        logger.info(f"record {record_number}")
+    logger.debug("below the handler's level")
+    time.sleep(0.5)  # the last partial batch waits for flush_interval
+    assert handler.flushes == 4  # 1 + 2 full batches + 1 partial
+    assert len(handler.stream.getvalue().splitlines()) == 251
+    log_listener.stop()
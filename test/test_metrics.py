@@ -0,0 +1,97 @@
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src import metrics
+from src.config.config_main import load_config
+from src.garage_door import GarageDoor, GarageStatus
+from src.metrics import MetricsRegistry, start_metrics_server, stop_metrics_server
+from test.doubles import ListLogger, SensorStub
+
+
+def make_registry() -> MetricsRegistry:
+    registry = MetricsRegistry()
+    transitions = registry.counter(
+        "transitions_total", "Door state changes", labels=("door", "state")
+    )
+    transitions.labels("TWO_CAR", "opened").inc()
+    transitions.labels("TWO_CAR", "opened").inc()
+    transitions.labels("ONE_CAR", "closed").inc()
+    registry.gauge("queue_depth", "Waiting").set(3)
+    loop_seconds = registry.histogram("loop_seconds", "Loop", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 2.5):
+        loop_seconds.observe(value)
+    return registry
+
+
+def test_render_prometheus_text() -> None:
+    assert make_registry().render().splitlines() == [
+        "# HELP transitions_total Door state changes",
+        "# TYPE transitions_total counter",
+        'transitions_total{door="ONE_CAR",state="closed"} 1',
+        'transitions_total{door="TWO_CAR",state="opened"} 2',
+        "# HELP queue_depth Waiting",
+        "# TYPE queue_depth gauge",
+        "queue_depth 3",
+        "# HELP loop_seconds Loop",
+        "# TYPE loop_seconds histogram",
+        'loop_seconds_bucket{le="0.1"} 1',
+        'loop_seconds_bucket{le="1"} 2',
+        'loop_seconds_bucket{le="+Inf"} 3',
+        "loop_seconds_sum 3.05",
+        "loop_seconds_count 3",
+    ]
+    with pytest.raises(ValueError):
+        make_registry().counter("transitions_total", "Registered twice")
+
+
+def test_metrics_endpoint() -> None:
+    registry = make_registry()
+    server = start_metrics_server(registry=registry, host="127.0.0.1", port=0)
+    url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        with urllib.request.urlopen(f"{url}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+            assert response.read().decode() == registry.render()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{url}/other", timeout=5)
+    finally:
+        stop_metrics_server(server)
+
+
+def test_recording_costs_microseconds() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter("counter_total", "", labels=("door",))
+    histogram = registry.histogram("seconds", "", labels=("door",))
+    n_records = 20_000
+    start_time = time.perf_counter()
+    for _ in range(n_records):
+        counter.labels("TWO_CAR").inc()
+        histogram.labels("TWO_CAR").observe(0.002)
+    per_record = (time.perf_counter() - start_time) / (2 * n_records)
+    assert per_record < 5e-6
+    assert counter.labels("TWO_CAR").value == n_records
+
+
+def test_door_transitions_are_counted() -> None:
+    transitions = metrics.TRANSITIONS.labels("TWO_CAR", "opened")
+    evaluations = metrics.STATE_EVALUATION.labels("TWO_CAR")
+    door = GarageDoor(
+        name="TWO_CAR",
+        open_sensor=SensorStub(False),
+        closed_sensor=SensorStub(True),
+        load_config=load_config,
+        debug_logger=ListLogger(),
+        history_logger=ListLogger(),
+    )
+    opened_before, evaluations_before = transitions.value, evaluations.count
+    door.closed_sensor.value = False
+    door.open_sensor.value = True
+    assert door.state == GarageStatus.open
+    assert transitions.value == opened_before + 1
+    assert evaluations.count > evaluations_before
+    assert 'garage_door_transitions_total{door="TWO_CAR",state="opened"}' in (
+        metrics.registry.render()
+    )
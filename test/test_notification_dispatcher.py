@@ -0,0 +1,116 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+from urllib.parse import parse_qs
+
+import pytest
+
+from src.notification_dispatcher import NotificationDispatcher
+from test.doubles import ListLogger
+
+
+class IftttStandIn(BaseHTTPRequestHandler):
+    """Fails the first `failures` posts with a 500, then accepts"""
+
+    address: str = ""
+    failures: int = 0
+    delay: float = 0.0
+    received: list[str] = []
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        time.sleep(self.delay)
+        if self.failures > 0:
+            type(self).failures -= 1
+            self.send_response(500)
+        else:
+            self.received.append(parse_qs(body)["value1"][0])
+            self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def ifttt():
+    # A fresh handler class per test, so late requests can't leak between tests
+    handler = type("Handler", (IftttStandIn,), {"received": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    handler.address = f"http://127.0.0.1:{server.server_address[1]}/trigger"
+    yield handler
+    server.shutdown()
+    server.server_close()
+
+
+def test_dispatcher_retries_with_backoff(ifttt) -> None:
+    ifttt.failures = 2
+    dispatcher = NotificationDispatcher(
+        address=ifttt.address, msg_var="value1", logger=ListLogger(), backoff=0.05
+    ).start()
+
+    submit_start = time.perf_counter()
+    assert dispatcher.submit("TWO_CAR open for 5 minutes")
+    assert time.perf_counter() - submit_start < 0.01
+    dispatcher.stop(timeout=5)
+
+    assert ifttt.received == ["TWO_CAR open for 5 minutes"]
+    assert dispatcher.stats.sent == 1
+    assert dispatcher.stats.retries == 2
+    assert dispatcher.stats.last_latency >= 0.05 + 0.1
+    assert dispatcher.queue_depth == 0
+
+
+def test_dispatcher_times_out_and_gives_up(ifttt) -> None:
+    ifttt.delay = 0.5
+    dispatcher = NotificationDispatcher(
+        address=ifttt.address,
+        msg_var="value1",
+        logger=ListLogger(),
+        timeout=0.1,
+        max_retries=1,
+        backoff=0.01,
+    ).start()
+    dispatcher.submit("ONE_CAR open for 10 minutes")
+    dispatcher.stop(timeout=5)
+
+    assert dispatcher.stats.failed == 1
+    assert dispatcher.stats.sent == 0
+
+
+def test_dispatcher_drops_when_queue_full(ifttt) -> None:
+    logger = ListLogger()
+    dispatcher = NotificationDispatcher(
+        address=ifttt.address, msg_var="value1", logger=logger, queue_size=2
+    )  # not started, so nothing leaves the queue
+    assert dispatcher.submit("one")
+    assert dispatcher.submit("two")
+    assert not dispatcher.submit("three")
+    assert dispatcher.queue_depth == 2
+    assert dispatcher.stats.dropped == 1
+
+    dispatcher.start()
+    dispatcher.stop(timeout=5)
+    assert ifttt.received == ["one", "two"]
+
+
+def test_dispatcher_stop_does_not_block_on_full_queue(ifttt) -> None:
+    ifttt.delay = 0.5
+    logger = ListLogger()
+    dispatcher = NotificationDispatcher(
+        address=ifttt.address, msg_var="value1", logger=logger, queue_size=1
+    ).start()
+    dispatcher.submit("one")
+    time.sleep(0.05)  # the thread is sending "one"
+    assert dispatcher.submit("two")
+    assert dispatcher.queue_depth == 1  # full
+
+    stop_start = time.perf_counter()
+    dispatcher.stop(timeout=0.1)
+    assert time.perf_counter() - stop_start < 0.3
+    assert "still sending" in logger.messages[-1]
+
+    dispatcher.stop(timeout=5)  # the session is closed once the queue is sent
+    assert ifttt.received == ["one", "two"]
@@ -0,0 +1,99 @@
+import datetime as dt
+
+from box import Box
+import numpy as np
+import pandas as pd
+
+from src.config.config_main import load_config
+from src.plot_garage_door_status import POSITION_VALUE, clean_garage_door_history
+
+
+def clean_history_iterrows(
+    door_status_history: dict[str, pd.DataFrame]
+) -> dict[str, pd.DataFrame]:
+    """The original row by row clean_garage_door_history, kept as the reference"""
+    cfg: Box = load_config()
+    clean_gdh: dict[str, pd.DataFrame] = {}
+    for a_door, a_door_status_history in door_status_history.items():
+        a_door_status_history.sort_values(by="datetime", kind="stable", inplace=True)
+        a_door_status_history.drop_duplicates(
+            subset="datetime", inplace=True, ignore_index=True
+        )
+        new_dsh = a_door_status_history.iloc[:1]
+        for _, row in a_door_status_history.iloc[1:].iterrows():
+            transition_time = (
+                row["datetime"] - new_dsh.iloc[-1]["datetime"]
+            ).total_seconds()
+            if (
+                transition_time > cfg.GRAPHING.MAX_TRANSITION_TIME
+                and row["position"] != new_dsh.iloc[-1]["position"]
+            ):
+                added_timestamp = row["datetime"] - dt.timedelta(
+                    seconds=cfg.GRAPHING.MAX_TRANSITION_TIME
+                )
+                temp_door_status = pd.DataFrame(
+                    {
+                        "datetime": [added_timestamp],
+                        "position": [new_dsh.iloc[-1]["position"]],
+                    }
+                )
+                new_dsh = pd.concat([new_dsh, temp_door_status], ignore_index=True)
+            new_dsh = pd.concat([new_dsh, row.to_frame().T], ignore_index=True)
+        new_dsh["position_value"] = new_dsh["position"].map(POSITION_VALUE)
+        clean_gdh[a_door] = new_dsh
+    return clean_gdh
+
+
+def synthetic_history(n_events: int, seed: int) -> pd.DataFrame:
+    """Unsorted events, with duplicate timestamps and gaps either side of 60 s"""
+    rng = np.random.default_rng(seed)
+    seconds = np.cumsum(rng.choice([0, 5, 30, 59, 60, 61, 600, 7200], size=n_events))
+    rng.shuffle(seconds)
+    return pd.DataFrame(
+        {
+            "datetime": pd.Timestamp("2023-08-09 11:49:12.018")
+            + pd.to_timedelta(seconds, unit="s"),
+            "position": rng.choice(["opened", "closed", "unknown"], size=n_events),
+        }
+    )
+
+
+def test_clean_garage_door_history_matches_iterrows() -> None:
+    door_status_history = {
+        "ONE_CAR": synthetic_history(n_events=3000, seed=1),
+        "TWO_CAR": synthetic_history(n_events=2000, seed=2),
+        "EMPTY": synthetic_history(n_events=0, seed=3),
+    }
+    expected = clean_history_iterrows(
+        {door: history.copy() for door, history in door_status_history.items()}
+    )
+
+    actual = clean_garage_door_history(door_status_history)
+
+    assert list(actual) == list(expected)
+    for door, expected_history in expected.items():
+        expected_history = expected_history.astype(
+            {"datetime": actual[door]["datetime"].dtype}
+        )
+        pd.testing.assert_frame_equal(actual[door], expected_history, check_dtype=False)
+    assert len(actual["ONE_CAR"]) > len(door_status_history["ONE_CAR"])
+
+
+def test_clean_garage_door_history_keeps_first_logged_of_a_time() -> None:
+    # Logged newest first, each time twice: first opened, then closed
+    seconds = np.repeat(np.arange(200)[::-1] * 60, 2)
+    door_status_history = {
+        "ONE_CAR": pd.DataFrame(
+            {
+                "datetime": pd.Timestamp("2023-08-09 11:49:12.018")
+                + pd.to_timedelta(seconds, unit="s"),
+                "position": np.tile(["opened", "closed"], 200),
+            }
+        )
+    }
+
+    actual = clean_garage_door_history(door_status_history)["ONE_CAR"]
+
+    assert len(actual) == 200
+    assert actual["datetime"].is_monotonic_increasing
+    assert (actual["position"] == "opened").all()
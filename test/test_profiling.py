@@ -0,0 +1,75 @@
+import os
+import signal
+import time
+
+import pytest
+
+from src.profiling import PROFILE_ENV, Profiler, profile_mode, profiled
+
+
+def busy_loop(seconds: float) -> int:
+    end_time = time.perf_counter() + seconds
+    n_loops = 0
+    while time.perf_counter() < end_time:
+        n_loops += 1
+    return n_loops
+
+
+def read_profile(filepaths: list[str]) -> dict[str, str]:
+    profile: dict[str, str] = {}
+    for filepath in filepaths:
+        with open(filepath, "rb" if filepath.endswith(".prof") else "r") as fp:
+            profile[filepath.split(".", 1)[1]] = fp.read()
+    return profile
+
+
+def test_sample_profile_writes_stats_and_collapsed_stacks(tmp_path) -> None:
+    profiler = Profiler(name="test", output_folder=str(tmp_path), mode="sample")
+    profiler.start()
+    busy_loop(0.3)
+    profile = read_profile(profiler.stop())
+
+    assert set(profile) == {"collapsed", "stats.txt"}
+    busy_samples: int = 0
+    for line in profile["collapsed"].splitlines():
+        stack, count = line.rsplit(" ", 1)
+        if "busy_loop" in stack:
+            assert stack.startswith("MainThread;")
+            busy_samples += int(count)
+    assert busy_samples > 20
+    busy_stats = [
+        line for line in profile["stats.txt"].splitlines() if "busy_loop" in line
+    ]
+    assert int(busy_stats[0].split()[0]) > 20  # samples in busy_loop itself
+
+
+def test_cprofile_mode_writes_pstats(tmp_path) -> None:
+    with profiled(name="test", output_folder=str(tmp_path), mode="cprofile"):
+        busy_loop(0.1)
+    profile = read_profile([str(path) for path in tmp_path.iterdir()])
+    assert set(profile) == {"collapsed", "stats.txt", "prof"}
+    assert "busy_loop" in profile["stats.txt"]
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR2"), reason="no SIGUSR2")
+def test_signal_toggles_profiling(tmp_path) -> None:
+    with profiled(name="test", output_folder=str(tmp_path)) as profiler:
+        busy_loop(0.05)
+        assert not profiler.running
+        os.kill(os.getpid(), signal.SIGUSR2)
+        assert profiler.running
+        busy_loop(0.1)
+        os.kill(os.getpid(), signal.SIGUSR2)
+        assert not profiler.running
+        assert len(list(tmp_path.iterdir())) == 2
+    signal.signal(signal.SIGUSR2, signal.SIG_DFL)
+
+
+def test_profile_mode(monkeypatch) -> None:
+    monkeypatch.delenv(PROFILE_ENV, raising=False)
+    assert profile_mode(None) is None
+    assert profile_mode("cprofile") == "cprofile"
+    monkeypatch.setenv(PROFILE_ENV, "1")
+    assert profile_mode(None) == "sample"
+    monkeypatch.setenv(PROFILE_ENV, "cprofile")
+    assert profile_mode(None) == "cprofile"
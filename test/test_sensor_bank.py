@@ -0,0 +1,88 @@
+import struct
+
+import pytest
+
+from src.clock import SimulatedClock
+from src.config.config_main import load_config
+from src.garage_door import GarageDoor, GarageStatus
+import src.sensor_bank
+from src.sensor_bank import DeviceReader, GpioMemReader, SensorBank
+from test.digital_input_dev_sim import DoorSensorSim, ScenarioReader
+from test.doubles import NullLogger
+
+
+class Device:
+    def __init__(self, value: bool) -> None:
+        self.value = value
+
+
+def test_gpiomem_reader(tmp_path, monkeypatch) -> None:
+    gpiomem = tmp_path / "gpiomem"
+    levels = 1 << 6 | 1 << 13  # pins 6 and 13 high
+    gpiomem.write_bytes(bytes(0x34) + struct.pack("<I", levels) + bytes(4096))
+    monkeypatch.setattr(src.sensor_bank, "GPIOMEM_PATH", str(gpiomem))
+    monkeypatch.setattr(src.sensor_bank, "_bcm_soc", lambda: True)
+
+    read_active = GpioMemReader(pull_ups={5: True, 6: True, 13: False, 0: False})
+    assert read_active() == 1 << 5 | 1 << 13  # pulled up pins are active low
+    with pytest.raises(ValueError):
+        GpioMemReader(pull_ups={40: True})
+
+
+def test_device_reader_and_hold() -> None:
+    devices = {5: Device(True), 6: Device(False)}
+    read_active = DeviceReader(devices=devices)
+    reads: list[int] = []
+    bank = SensorBank(
+        read_active=lambda: reads.append(1) or read_active(), clock=SimulatedClock()
+    )
+    assert bank.snapshot().is_active(5) and not bank.snapshot().is_active(6)
+    assert len(reads) == 2
+
+    with bank.hold():
+        snapshot = bank.snapshot()
+        devices[6].value = True
+        assert bank.snapshot() is snapshot  # one read for the tick
+    assert len(reads) == 3
+    assert bank.snapshot().is_active(6)
+
+
+def test_door_reads_bank() -> None:
+    clock = SimulatedClock()
+    read_active = ScenarioReader(clock=clock)
+    door_cfg = load_config().DOORS.TWO_CAR
+    door = GarageDoor(
+        name="TWO_CAR",
+        open_sensor=DoorSensorSim(
+            pin=door_cfg.OPEN.NUMBER, pull_up=True, bounce_time=1, clock=clock
+        ),
+        closed_sensor=DoorSensorSim(
+            pin=door_cfg.CLOSED.NUMBER, pull_up=True, bounce_time=1, clock=clock
+        ),
+        load_config=load_config,
+        debug_logger=NullLogger(),
+        history_logger=NullLogger(),
+        clock=clock,
+        sensor_bank=SensorBank(read_active=read_active, clock=clock),
+        open_pin=door_cfg.OPEN.NUMBER,
+        closed_pin=door_cfg.CLOSED.NUMBER,
+    )
+    states: list[GarageStatus] = []
+    for seconds in (0, 125, 135):
+        clock.sleep(seconds - clock.monotonic())
+        states.append(door.state)
+    assert states == [GarageStatus.closed, GarageStatus.un_closed, GarageStatus.open]
+    assert read_active.reads == 3  # one read of both sensors each time
+
+    with pytest.raises(ValueError, match="closed_pin"):
+        GarageDoor(
+            name="TWO_CAR",
+            open_sensor=Device(False),
+            closed_sensor=Device(True),
+            load_config=load_config,
+            debug_logger=NullLogger(),
+            history_logger=NullLogger(),
+            clock=clock,
+            sensor_bank=SensorBank(read_active=read_active, clock=clock),
+            open_pin=door_cfg.OPEN.NUMBER,
+        )
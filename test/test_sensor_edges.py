@@ -0,0 +1,36 @@
+import pytest
+
+import src.garage_door_status_monitor
+from test.config.config_test_main import test_cfg
+from test.digital_input_dev_sim import DoorSensorSim as DoorSensor
+from test.doubles import ListLogger, event_mode_config
+from test.send_notification_sim import send_notification
+
+
+def test_event_mode_sees_edges_immediately(tmp_path, monkeypatch) -> None:
+    scenario = tmp_path / "digital_input_edges.csv"
+    scenario.write_text(
+        "seconds_from_start,ONE_CAR_CLOSED,ONE_CAR_OPEN,TWO_CAR_CLOSED,TWO_CAR_OPEN\n"
+        "0, 1, 0, 1, 0\n"
+        "1, 1, 0, 0, 1\n"
+        "2, 1, 0, 1, 0\n"
+    )
+    monkeypatch.setitem(test_cfg.TEST, "DIGITAL_INPUT_DATE_PATH", str(scenario))
+    monkeypatch.setattr(
+        src.garage_door_status_monitor, "load_config", event_mode_config
+    )
+    history_logger = ListLogger()
+
+    with pytest.raises(SystemExit):
+        src.garage_door_status_monitor.garage_door_status_monitor(
+            DoorSensor=DoorSensor,
+            send_notification=send_notification,
+            logger=ListLogger(),
+            history_logger=history_logger,
+            max_run_time=2,  # the run now ends on time, after the 1 s edge
+        )
+
+    created = [t for t, msg in history_logger.records if msg == "DOOR:TWO_CAR:created"]
+    opened = [t for t, msg in history_logger.records if msg == "DOOR:TWO_CAR:opened"]
+    assert len(opened) == 1
+    assert 0.9 <= opened[0] - created[0] < 1.3
@@ -0,0 +1,114 @@
+from src.clock import SimulatedClock
+from src.config.config_main import load_config
+from src.garage_door import GarageDoor
+from src.sensor_sampler import FilteredSensor, SampleRing, SensorSampler
+from test.config.config_test_main import test_cfg
+from test.digital_input_dev_sim import DoorSensorSim
+from test.doubles import ListLogger
+
+
+class ScriptedSensor:
+    def __init__(self, values: str) -> None:
+        self.values = [value == "1" for value in values]
+
+    @property
+    def value(self) -> bool:
+        return self.values.pop(0) if len(self.values) > 1 else self.values[0]
+
+
+def filtered_values(values: str, filter_: str, window: int = 3) -> str:
+    sensor = FilteredSensor(
+        sensor=ScriptedSensor(values), window=window, filter_=filter_, at_time=0
+    )
+    filtered = ""
+    for second in range(len(values) - 1):
+        sensor.sample(second)
+        filtered += "1" if sensor.value else "0"
+    return filtered
+
+
+def test_filters() -> None:
+    # The first value primes the sensor, each after it is a sample
+    assert filtered_values("0010011100", "majority") == "000001110"
+    assert filtered_values("0010011100", "debounce") == "000000111"
+
+    edges: list[str] = []
+    sensor = FilteredSensor(
+        sensor=ScriptedSensor("0011101"), window=3, filter_="debounce", at_time=0
+    )
+    sensor.when_activated = lambda: edges.append("activated")
+    for second in range(6):
+        sensor.sample(second)
+    assert edges == ["activated"]
+    assert sensor.changed_at == 1  # first of the run
+
+
+def test_sample_ring() -> None:
+    ring = SampleRing(size=3)
+    for second, value in enumerate((True, False, True, True)):
+        ring.append(second, value)
+    assert ring.samples() == [(1, False), (2, True), (3, True)]
+    assert ring.active == 2
+
+
+def run_noisy_door(tmp_path, monkeypatch, sampled: bool) -> list[str]:
+    scenario = tmp_path / "digital_input_noisy.csv"
+    scenario.write_text(
+        "seconds_from_start,ONE_CAR_CLOSED,ONE_CAR_OPEN,TWO_CAR_CLOSED,TWO_CAR_OPEN\n"
+        "0, 1, 0, 1, 0\n"
+        "10, 1, 0, 0, 0\n"
+        "12, 1, 0, 0, 1\n"
+        "40, 1, 0, 0, 0\n"
+        "42, 1, 0, 1, 0\n"
+    )
+    monkeypatch.setitem(test_cfg.TEST, "DIGITAL_INPUT_DATE_PATH", str(scenario))
+    clock = SimulatedClock()
+    door_cfg = load_config().DOORS.TWO_CAR
+    sensors = {
+        sensor: DoorSensorSim(
+            pin=door_cfg[sensor].NUMBER,
+            pull_up=True,
+            bounce_time=1.0,
+            clock=clock,
+            noise=0.05,
+            seed=pin_seed,
+        )
+        for pin_seed, sensor in enumerate(("OPEN", "CLOSED"))
+    }
+    if sampled:
+        sampler = SensorSampler(rate=20, window=7, filter_="majority", clock=clock)
+        sensors = {sensor: sampler.add(sensors[sensor]) for sensor in sensors}
+        sampler.start()
+    history_logger = ListLogger()
+    door = GarageDoor(
+        name="TWO_CAR",
+        open_sensor=sensors["OPEN"],
+        closed_sensor=sensors["CLOSED"],
+        load_config=load_config,
+        debug_logger=ListLogger(),
+        history_logger=history_logger,
+        clock=clock,
+    )
+    opened_at = None
+    for _ in range(120):
+        door.state
+        if opened_at is None and history_logger.messages[-1] == "DOOR:TWO_CAR:opened":
+            opened_at = door.status_change_monotonic
+        clock.sleep(0.5)
+    if sampled:
+        # Stamped with the sample that saw it (the sim rounds to whole seconds,
+        # so opens at 11.5 s), not the read after
+        assert 11.5 < opened_at < 12
+    return history_logger.messages
+
+
+def test_noisy_sensors(tmp_path, monkeypatch) -> None:
+    raw_history = run_noisy_door(tmp_path, monkeypatch, sampled=False)
+    assert any("both Open and Closed Sensors are Active" in msg for msg in raw_history)
+
+    assert run_noisy_door(tmp_path, monkeypatch, sampled=True) == [
+        "DOOR:TWO_CAR:created",
+        "DOOR:TWO_CAR:closed",
+        "DOOR:TWO_CAR:opened",
+        "DOOR:TWO_CAR:closed",
+    ]